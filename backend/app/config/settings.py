@@ -57,6 +57,208 @@ class Settings(BaseSettings):
         default="gpt-3.5-turbo",
         description="OpenAI模型名称"
     )
+    openai_max_connections: int = Field(
+        default=100,
+        description="OpenAI HTTP连接池最大连接数（即最大并发请求数）"
+    )
+    openai_max_keepalive_connections: int = Field(
+        default=20,
+        description="OpenAI HTTP连接池保持的空闲keep-alive连接数"
+    )
+    openai_keepalive_expiry: float = Field(
+        default=30.0,
+        description="空闲keep-alive连接的保持时间（秒）"
+    )
+    openai_timeout: float = Field(
+        default=120.0,
+        description="OpenAI请求超时时间（秒）"
+    )
+    openai_connect_timeout: float = Field(
+        default=10.0,
+        description="OpenAI建立连接超时时间（秒）"
+    )
+    llm_light_model: str = Field(
+        default="",
+        description="短小、结构简单的简历使用的轻量模型，为空时所有简历都使用 openai_model"
+    )
+    llm_tier_light_max_tokens: int = Field(
+        default=3000,
+        description="使用轻量模型的最大简历token数"
+    )
+    llm_tier_light_max_complexity: int = Field(
+        default=12,
+        description="使用轻量模型的最大结构复杂度（章节数 + 2×经历条数 + 表格行数/5）"
+    )
+    llm_endpoints: str = Field(
+        default="",
+        description='多个OpenAI兼容端点的JSON数组，如 [{"name": "a", "base_url": "...", "api_key": "...", "model": "...", "weight": 1, "requests_per_minute": 60}]，为空时使用上面的单个端点'
+    )
+    llm_circuit_failure_threshold: int = Field(
+        default=3,
+        description="端点连续失败多少次后熔断"
+    )
+    llm_circuit_cooldown: float = Field(
+        default=30.0,
+        description="端点熔断后多久放行探测请求（秒）"
+    )
+    llm_latency_ewma_alpha: float = Field(
+        default=0.3,
+        description="端点延迟EWMA的平滑系数"
+    )
+    
+    # 大模型调度配置
+    llm_max_in_flight: int = Field(
+        default=16,
+        description="全局同时进行中的大模型请求数上限"
+    )
+    llm_adaptive_concurrency: bool = Field(
+        default=True,
+        description="根据延迟和429/5xx/超时自动调整并发上限（AIMD）"
+    )
+    llm_initial_in_flight: int = Field(
+        default=4,
+        description="自适应并发的初始上限"
+    )
+    llm_min_in_flight: int = Field(
+        default=1,
+        description="自适应并发的最小上限"
+    )
+    llm_aimd_decrease_factor: float = Field(
+        default=0.5,
+        description="过载时并发上限的乘数"
+    )
+    llm_latency_tolerance: float = Field(
+        default=2.0,
+        description="请求延迟超过基线的倍数时视为过载"
+    )
+    llm_tokens_per_minute: int = Field(
+        default=0,
+        description="每分钟token预算，0表示不限制"
+    )
+    llm_estimated_completion_tokens: int = Field(
+        default=1500,
+        description="调度时为每次请求预留的输出token数"
+    )
+    llm_streaming: bool = Field(
+        default=False,
+        description="流式接收大模型输出并增量解析JSON，姓名、学校、总分等字段完整后立即写入数据库"
+    )
+    llm_json_mode: bool = Field(
+        default=True,
+        description="请求大模型以JSON对象格式输出（response_format=json_object），服务端不支持时自动关闭"
+    )
+    llm_reask_missing_fields: bool = Field(
+        default=True,
+        description="响应缺少字段或评分维度时，只针对缺失部分重新询问一次"
+    )
+    llm_chunked_extraction: bool = Field(
+        default=True,
+        description="超长简历按章节切分后并行提取信息，再在本地合并结果"
+    )
+    llm_chunk_threshold_tokens: int = Field(
+        default=4000,
+        description="简历内容超过该token数时分段提取"
+    )
+    llm_chunk_max_tokens: int = Field(
+        default=2500,
+        description="分段提取时每个分段的最大token数"
+    )
+    llm_max_tokens: int = Field(
+        default=20000,
+        description="单次请求max_tokens的上限，样本不足时直接使用"
+    )
+    llm_min_max_tokens: int = Field(
+        default=512,
+        description="自动调整后max_tokens的下限"
+    )
+    llm_max_tokens_headroom: float = Field(
+        default=1.5,
+        description="按调用类型输出token数p99乘以该系数作为max_tokens"
+    )
+    llm_max_tokens_min_samples: int = Field(
+        default=20,
+        description="调用类型累计多少次调用后开始自动调整max_tokens"
+    )
+    llm_usage_window: int = Field(
+        default=200,
+        description="每个调用类型用于计算百分位的最近调用数"
+    )
+    llm_usage_tracking: bool = Field(
+        default=True,
+        description="是否把每次调用的token用量按简历和用户写入数据库"
+    )
+    llm_hedging: bool = Field(
+        default=False,
+        description="请求耗时超过该调用类型的延迟百分位时再发送一个相同的请求，先返回有效结果的胜出（仅非流式）"
+    )
+    llm_hedge_percentile: float = Field(
+        default=95,
+        description="触发对冲的延迟百分位"
+    )
+    llm_hedge_min_delay: float = Field(
+        default=1.0,
+        description="发送对冲请求前至少等待的秒数"
+    )
+    llm_hedge_budget: float = Field(
+        default=0.1,
+        description="对冲请求数占调用次数的最大比例"
+    )
+    
+    # 大模型响应缓存配置
+    llm_cache_enabled: bool = Field(
+        default=True,
+        description="是否缓存大模型响应"
+    )
+    llm_cache_path: str = Field(
+        default="cache/llm_cache.sqlite3",
+        description="大模型响应缓存的SQLite文件路径"
+    )
+    llm_cache_ttl: int = Field(
+        default=7 * 24 * 3600,
+        description="缓存有效期（秒），0表示不过期"
+    )
+    llm_cache_max_entries: int = Field(
+        default=10000,
+        description="最大缓存条目数，超出时淘汰最久未使用的条目"
+    )
+    
+    # 评分配置
+    local_rule_scoring: bool = Field(
+        default=True,
+        description="地域、学校、专业维度使用本地规则评分，大模型只评估主观维度"
+    )
+    local_fast_extraction: bool = Field(
+        default=True,
+        description="手机号、邮箱、毕业年份和学校先用正则在本地提取，大模型只提取其余字段"
+    )
+    llm_parallel_scoring: bool = Field(
+        default=True,
+        description="评分使用本地预提取的学校、专业等字段，与大模型信息提取并行进行，提取完成后校正评分"
+    )
+    llm_batch_scoring: bool = Field(
+        default=False,
+        description="Worker将队列中同一用户的多份简历合并为一次批量评分请求（combined模式下不生效，批量模式下不使用并行评分）"
+    )
+    llm_batch_max_size: int = Field(
+        default=8,
+        description="单次批量评分的最大简历数"
+    )
+    llm_batch_token_budget: int = Field(
+        default=24000,
+        description="单次批量评分请求的输入token预算"
+    )
+    incremental_reprocessing: bool = Field(
+        default=True,
+        description="同一用户上传同一候选人（手机号或邮箱相同）的新版本简历时，只重新提取变化的页，评分相关字段未变时沿用上一版评分"
+    )
+    incremental_max_changed_ratio: float = Field(
+        default=0.5,
+        description="变化的页超过该比例时完整处理新版本"
+    )
+    llm_pipeline_mode: str = Field(
+        default="two_call",
+        description="大模型调用模式：two_call（先提取再评分）或 combined（单次调用同时提取和评分，解析失败时回退到two_call）"
+    )
     
     # 文件上传配置
     upload_dir: str = Field(
@@ -75,6 +277,10 @@ class Settings(BaseSettings):
         default=20,
         description="批量上传最大文件数量"
     )
+    upload_chunk_size: int = Field(
+        default=1024 * 1024,  # 1MB
+        description="流式上传时每次读取写入的分块大小（字节）"
+    )
     allowed_file_types: str = Field(
         default="application/pdf,application/vnd.openxmlformats-officedocument.wordprocessingml.document,text/plain",
         description="允许的文件类型，用逗号分隔"
@@ -85,9 +291,94 @@ class Settings(BaseSettings):
         """将逗号分隔的字符串转换为列表"""
         return [file_type.strip() for file_type in self.allowed_file_types.split(",")]
     
+    # PDF解析配置
+    pdf_process_pool_size: int = Field(
+        default=0,
+        description="PDF解析进程池大小，0表示使用CPU核数"
+    )
+    pdf_max_queue_depth: int = Field(
+        default=32,
+        description="每个进程中同时提交到PDF解析进程池的最大任务数，超出时排队等待"
+    )
+    pdf_pages_per_task: int = Field(
+        default=8,
+        description="大文档按页拆分时每个子任务处理的页数"
+    )
+    document_mmap_threshold: int = Field(
+        default=4 * 1024 * 1024,  # 4MB
+        description="解析文档时超过该大小的文件使用内存映射按需读取，否则一次读入内存后解析"
+    )
+    pdf_max_pages: int = Field(
+        default=50,
+        description="允许解析的最大页数，超过时直接判定处理失败，0表示不限制"
+    )
+    pdf_sandbox: bool = Field(
+        default=True,
+        description="限制PDF解析进程池工作进程的地址空间、每个任务的CPU时间和总耗时，超时时终止工作进程并重建进程池"
+    )
+    pdf_sandbox_memory_mb: int = Field(
+        default=1024,
+        description="PDF解析工作进程的地址空间上限（MB），0表示不限制"
+    )
+    pdf_sandbox_cpu_seconds: int = Field(
+        default=20,
+        description="每个PDF解析任务的CPU时间上限（秒），0表示不限制"
+    )
+    pdf_sandbox_timeout: float = Field(
+        default=30.0,
+        description="每个PDF解析任务的总耗时上限（秒）"
+    )
+    markdown_compaction: bool = Field(
+        default=True,
+        description="发送给大模型前压缩Markdown：保留换行，去除重复页眉页脚、页码和模板文字，还原误判的标题；关闭时与原来一样每页合并为一行"
+    )
+    markdown_token_budget: int = Field(
+        default=6000,
+        description="简历内容的token预算，超出时优先裁剪自我评价、获奖等低价值章节；开启分段提取时只用于评分，0表示不限制"
+    )
+    
+    # 任务队列配置
+    task_queue_backend: str = Field(
+        default="memory",
+        description="任务队列类型：redis（独立worker消费）或 memory（API进程内消费，仅用于开发和测试）"
+    )
+    redis_url: str = Field(
+        default="redis://localhost:6379/0",
+        description="Redis连接URL"
+    )
+    task_queue_name: str = Field(
+        default="krinol:resume_tasks",
+        description="简历处理队列名称（Redis键前缀）"
+    )
+    task_visibility_timeout: int = Field(
+        default=600,
+        description="任务租约时长（秒），超时未确认的任务会重新入队"
+    )
+    task_max_attempts: int = Field(
+        default=3,
+        description="任务最大尝试次数"
+    )
+    task_retry_delay: float = Field(
+        default=30.0,
+        description="任务处理失败后第一次重试前的等待时间（秒），之后每次翻倍，0表示立即重试"
+    )
+    task_max_retry_delay: float = Field(
+        default=600.0,
+        description="任务重试等待时间的上限（秒）"
+    )
+    task_batch_linger: float = Field(
+        default=0.5,
+        description="批量评分时取到第一个任务后继续等待凑批的时间（秒）"
+    )
+    worker_concurrency: int = Field(
+        default=4,
+        description="每个worker进程同时处理的任务数"
+    )
+    
     # 日志配置
     log_level: str = Field(default="INFO", description="日志级别")
     log_file: Optional[str] = Field(default=None, description="日志文件路径")
+    metrics_log_interval: int = Field(default=60, description="Worker输出运行指标的间隔（秒），0表示不输出")
     
     # CORS配置
     cors_origins: str = Field(
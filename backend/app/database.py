@@ -2,11 +2,14 @@
 数据库连接和会话管理
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from app.config.settings import get_settings
+from app.utils.logger import get_logger
 
 settings = get_settings()
+logger = get_logger(__name__)
 
 # 创建数据库引擎
 engine = create_engine(
@@ -22,6 +25,11 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # 导入Base（从db_models中）
 from app.models.db_models import Base
 
+# 在已有表上新增的列：create_all 不会修改已存在的表，启动时按此补齐
+ADDED_COLUMNS = {
+    "resume_data": ("content_hash", "page_hashes"),
+}
+
 
 def get_db():
     """
@@ -43,6 +51,33 @@ def create_tables():
     """
     from app.services.user_service import User
     from app.models.invite_models import InviteCode
-    from app.models.db_models import ResumeDB, AnalysisResultDB
+    from app.models.db_models import ResumeDB, AnalysisResultDB, LLMUsageDB
     
     Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+
+
+def add_missing_columns(bind: Engine):
+    """
+    为已存在的表补齐后来新增的列及其索引，可重复执行
+
+    Args:
+        bind: 数据库引擎
+    """
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    with bind.begin() as conn:
+        for table_name, column_names in ADDED_COLUMNS.items():
+            if table_name not in tables:
+                continue
+            table = Base.metadata.tables[table_name]
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            for name in column_names:
+                if name in existing:
+                    continue
+                column_type = table.columns[name].type.compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type} NULL"))
+                for index in table.indexes:
+                    if [column.name for column in index.columns] == [name]:
+                        index.create(bind=conn)
+                logger.info(f"已为表 {table_name} 添加列: {name}")
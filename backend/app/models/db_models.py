@@ -29,6 +29,8 @@ class ResumeDB(Base):
     upload_time = Column(DateTime, default=datetime.utcnow, nullable=False)
     user_id = Column(String(36), nullable=True)
     file_path = Column(String(500), nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True, comment="文件内容SHA-256")
+    page_hashes = Column(JSON, nullable=True, comment="每页文本的SHA-256，用于识别新版本中变化的页")
     processing_status = Column(String(20), default="pending", nullable=False)
     extracted_info = Column(JSON, nullable=True)
     processing_error = Column(Text, nullable=True)
@@ -87,3 +89,19 @@ class AnalysisResultDB(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class LLMUsageDB(Base):
+    """大模型调用用量数据库模型"""
+    __tablename__ = "llm_usage"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    resume_id = Column(String(36), nullable=True, index=True, comment="关联的简历ID，批量评分时为空")
+    user_id = Column(String(36), nullable=True, index=True)
+    call_type = Column(String(50), nullable=False, comment="调用类型（extraction/scoring等）")
+    model = Column(String(100), nullable=False)
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    total_tokens = Column(Integer, default=0, nullable=False)
+    estimated = Column(Integer, default=0, nullable=False, comment="1表示服务端未返回用量，token数为估算值")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
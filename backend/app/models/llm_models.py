@@ -0,0 +1,131 @@
+"""
+大模型输出数据模型
+校验并规范化大模型返回的提取结果和评分结果
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+
+def _to_optional_str(value: Any) -> Optional[str]:
+    """数字等标量转为字符串，空字符串视为未提取到"""
+    if value is None:
+        return None
+    if isinstance(value, (list, dict)):
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _to_score(value: Any) -> int:
+    """把 8、8.0、"8分" 等形式的得分转为整数"""
+    if isinstance(value, bool) or value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.search(r"-?\d+(\.\d+)?", str(value))
+    return int(float(match.group())) if match else 0
+
+
+class ExtractedResumeInfo(BaseModel):
+    """大模型提取的简历信息"""
+    model_config = ConfigDict(extra="allow")
+
+    name: Optional[str] = Field(None, description="姓名")
+    school_name: Optional[str] = Field(None, description="学校名称")
+    school_city: Optional[str] = Field(None, description="学校所在城市")
+    education_level: Optional[str] = Field(None, description="学历层次（本科/硕士/博士等）")
+    major: Optional[str] = Field(None, description="专业")
+    graduation_year: Optional[str] = Field(None, description="毕业年份")
+    phone: Optional[str] = Field(None, description="手机号")
+    email: Optional[str] = Field(None, description="邮箱")
+    position: Optional[str] = Field(None, description="求职岗位")
+    work_experience: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description='工作经历，格式为 [{"company": "公司名称", "position": "职位", "duration": "工作时长", "description": "工作描述"}]'
+    )
+    skills: List[str] = Field(default_factory=list, description="技能列表")
+    projects: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description='项目经历，格式为 [{"name": "项目名称", "description": "项目描述", "technologies": ["技术栈"]}]'
+    )
+    summary: Optional[str] = Field(None, description="个人简介或自我评价")
+
+    @field_validator(
+        "name", "school_name", "school_city", "education_level", "major",
+        "graduation_year", "phone", "email", "position", "summary",
+        mode="before"
+    )
+    @classmethod
+    def _normalize_text(cls, value: Any) -> Optional[str]:
+        return _to_optional_str(value)
+
+    @field_validator("work_experience", "projects", mode="before")
+    @classmethod
+    def _normalize_records(cls, value: Any) -> List[Dict[str, Any]]:
+        if not isinstance(value, list):
+            return []
+        return [item for item in value if isinstance(item, dict)]
+
+    @field_validator("skills", mode="before")
+    @classmethod
+    def _normalize_skills(cls, value: Any) -> List[str]:
+        if isinstance(value, str):
+            value = re.split(r"[,，、;；]", value)
+        if not isinstance(value, list):
+            return []
+        return [skill for skill in (_to_optional_str(item) for item in value) if skill]
+
+
+# 提取结果中必须出现的字段（值可以为null）
+EXTRACTION_FIELDS = tuple(ExtractedResumeInfo.model_fields)
+
+
+class ScoreDetail(BaseModel):
+    """单个维度的得分"""
+    score: int = Field(default=0, description="得分")
+    reason: str = Field(default="", description="评分原因")
+
+    @field_validator("score", mode="before")
+    @classmethod
+    def _normalize_score(cls, value: Any) -> int:
+        return _to_score(value)
+
+    @field_validator("reason", mode="before")
+    @classmethod
+    def _normalize_reason(cls, value: Any) -> str:
+        return "" if value is None else str(value)
+
+
+class ScoringResponse(BaseModel):
+    """大模型返回的评分结果"""
+    total_score: Optional[int] = Field(None, description="总分")
+    score_details: Dict[str, ScoreDetail] = Field(default_factory=dict, description="各维度得分")
+
+    @field_validator("total_score", mode="before")
+    @classmethod
+    def _normalize_total(cls, value: Any) -> Optional[int]:
+        if value is None:
+            return None
+        return _to_score(value)
+
+    @field_validator("score_details", mode="before")
+    @classmethod
+    def _normalize_details(cls, value: Any) -> Dict[str, Any]:
+        if not isinstance(value, dict):
+            return {}
+        details = {}
+        for name, detail in value.items():
+            if isinstance(detail, dict):
+                details[name] = detail
+            elif isinstance(detail, (int, float, str)):
+                # 只给出分数时补全为标准结构
+                details[name] = {"score": detail}
+        return details
+
+
+class CombinedResponse(ScoringResponse):
+    """单次调用同时返回的提取结果和评分结果"""
+    extracted_info: ExtractedResumeInfo = Field(..., description="提取的简历信息")
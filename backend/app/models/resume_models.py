@@ -35,6 +35,8 @@ class ResumeData(BaseModel):
     
     # 新增字段
     file_path: Optional[str] = Field(None, description="文件存储路径")
+    content_hash: Optional[str] = Field(None, description="文件内容SHA-256")
+    page_hashes: Optional[List[str]] = Field(None, description="每页文本的SHA-256")
     processing_status: str = Field(default="pending", description="处理状态")
     extracted_info: Optional[Dict[str, Any]] = Field(None, description="AI提取的信息")
     processing_error: Optional[str] = Field(None, description="处理错误信息")
@@ -3,21 +3,19 @@
 处理简历上传、获取、删除等操作
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, BackgroundTasks, Query
-from typing import List, Optional
-import os
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Query
+from typing import List
 import uuid
-from datetime import datetime
 from sqlalchemy.orm import Session
 
 from ..models.resume_models import ResumeData, ResumeUploadResponse, PaginatedResumeResponse, InterviewEvaluationRequest, InterviewEvaluationResponse
-from ..models.user_models import UserResponse
 from ..services.user_service import User
 from ..services.resume_service import ResumeService
-from ..services.ai_service import AIService
+from ..services.usage_service import UsageService
+from ..services.task_queue import ResumeTask, get_task_queue
 from ..utils.auth import get_current_user
 from ..utils.logger import get_logger
-from ..utils.file_processor import FileProcessor
+from ..utils.file_storage import save_upload_stream, upload_suffix, UploadTooLargeError
 from ..database import get_db
 from ..config.settings import get_settings
 
@@ -29,16 +27,14 @@ router = APIRouter(prefix="/resumes", tags=["简历管理"])
 
 @router.post("/upload", response_model=List[ResumeUploadResponse], status_code=status.HTTP_201_CREATED)
 async def upload_resume(
-    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    上传简历文件并启动异步处理（支持多文件）
+    上传简历文件并投递异步处理任务（支持多文件）
     
     Args:
-        background_tasks: FastAPI后台任务
         files: 上传的文件列表
         current_user: 当前用户
         db: 数据库会话
@@ -73,10 +69,26 @@ async def upload_resume(
                     ))
                     continue
                 
-                # 验证文件大小（限制为配置的最大文件大小）
-                file_content = await file.read()
-                file_size = len(file_content)
-                if file_size > settings.max_file_size:
+                # 生成唯一记录ID
+                file_id = str(uuid.uuid4())
+                
+                # 流式写入磁盘，边读边校验单文件及批量总大小；文件按内容摘要命名，相同内容只存储一份
+                try:
+                    stored_file = await save_upload_stream(
+                        file,
+                        dest_dir="/app/data",
+                        filename=None,
+                        max_file_size=settings.max_file_size,
+                        max_total_size=settings.max_batch_size - total_size,
+                        chunk_size=settings.upload_chunk_size,
+                        suffix=upload_suffix(file.filename, file.content_type)
+                    )
+                except UploadTooLargeError as e:
+                    if e.batch:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"批量上传总大小不能超过 {settings.max_batch_size // (1024*1024)}MB"
+                        )
                     results.append(ResumeUploadResponse(
                         resume_id="",
                         filename=file.filename,
@@ -85,29 +97,31 @@ async def upload_resume(
                     ))
                     continue
                 
-                # 检查批量上传总大小限制
+                file_path = stored_file.path
+                file_size = stored_file.size
                 total_size += file_size
-                if total_size > settings.max_batch_size:
-                    raise HTTPException(
-                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                        detail=f"批量上传总大小不能超过 {settings.max_batch_size // (1024*1024)}MB"
-                    )
                 
-                # 生成唯一文件名
-                file_id = str(uuid.uuid4())
-                file_extension = os.path.splitext(file.filename)[1]
-                safe_filename = f"{file_id}{file_extension}"
-                
-                # 确保数据目录存在
-                data_dir = "/app/data"
-                os.makedirs(data_dir, exist_ok=True)
+                logger.info(f"文件保存成功: {file_path}")
                 
-                # 保存文件到磁盘
-                file_path = os.path.join(data_dir, safe_filename)
-                with open(file_path, "wb") as f:
-                    f.write(file_content)
+                resume_service = ResumeService(db=db)
                 
-                logger.info(f"文件保存成功: {file_path}")
+                # 相同内容已处理过时直接复用解析和评分结果，跳过PDF解析和AI调用
+                processed = resume_service.find_processed_resume_by_hash(stored_file.sha256)
+                if processed:
+                    resume_service.create_resume_from_duplicate(
+                        source=processed,
+                        resume_id=file_id,
+                        filename=file.filename,
+                        user_id=str(current_user.id)
+                    )
+                    results.append(ResumeUploadResponse(
+                        resume_id=file_id,
+                        filename=file.filename,
+                        status="uploaded",
+                        message="文件内容与已处理简历相同，已复用分析结果"
+                    ))
+                    logger.info(f"简历内容重复，复用结果: {file.filename}, 来源ID: {processed.id}, 文件ID: {file_id}")
+                    continue
 
                 # 创建简历记录
                 resume_data = ResumeData(
@@ -116,20 +130,20 @@ async def upload_resume(
                     format="pdf",
                     content="",  # 将在异步任务中填充
                     file_size=file_size,
-                    user_id=str(current_user.id)
+                    user_id=str(current_user.id),
+                    file_path=file_path,
+                    content_hash=stored_file.sha256
                 )
                 
                 # 保存到数据库
-                resume_service = ResumeService(db=db)
                 resume_service.create_resume(resume_data)
                 
-                # 启动异步处理任务
-                background_tasks.add_task(
-                    process_resume_async,
-                    file_id=file_id,
+                # 投递到任务队列，由worker异步处理
+                await get_task_queue().enqueue(ResumeTask(
+                    resume_id=file_id,
                     file_path=file_path,
                     user_id=str(current_user.id)
-                )
+                ))
                 
                 results.append(ResumeUploadResponse(
                     resume_id=file_id,
@@ -140,6 +154,8 @@ async def upload_resume(
                 
                 logger.info(f"简历上传成功: {file.filename}, 用户: {current_user.email}, 文件ID: {file_id}")
                 
+            except HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"处理文件 {file.filename} 时出错: {str(e)}")
                 results.append(ResumeUploadResponse(
@@ -151,97 +167,13 @@ async def upload_resume(
         
         return results
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"简历上传失败: {str(e)}")
         raise HTTPException(status_code=500, detail="简历上传失败")
 
 
-async def process_resume_async(file_id: str, file_path: str, user_id: str):
-    """
-    异步处理简历文件
-    
-    Args:
-        file_id: 文件ID
-        file_path: 文件路径
-        user_id: 用户ID
-    """
-    try:
-        logger.info(f"开始处理简历文件: {file_id}")
-        
-        # 获取数据库会话
-        from ..database import SessionLocal
-        db = SessionLocal()
-        resume_service = ResumeService(db=db)
-        
-        try:
-            # 1. 转换PDF为Markdown
-            file_processor = FileProcessor()
-            markdown_content = await file_processor.pdf_to_markdown(file_path)
-            logger.info(f"PDF转换为Markdown完成: {markdown_content}")
-            
-            # 2. 使用AI提取信息
-            try:
-                ai_service = AIService()
-                extracted_info = await ai_service.extract_resume_info(markdown_content)
-            except Exception as e:
-                logger.warning(f"AI服务调用失败，使用默认信息: {str(e)}")
-                # 使用默认信息
-                extracted_info = {
-                    "name": None,
-                    "school_name": None,
-                    "school_city": None,
-                    "education_level": None,
-                    "major": None,
-                    "graduation_year": None,
-                    "phone": None,
-                    "email": None,
-                    "work_experience": [],
-                    "skills": [],
-                    "projects": [],
-                    "summary": None
-                }
-            
-            # 3. 使用AI进行简历评分
-            try:
-                scoring_result = await ai_service.score_resume(markdown_content, extracted_info)
-                logger.info(f"简历评分完成: {scoring_result}")
-            except Exception as e:
-                logger.warning(f"AI评分失败，使用默认评分: {str(e)}")
-                # 使用默认评分
-                scoring_result = {
-                    "total_score": 0,
-                    "score_details": {
-                        "region_score": {"score": 0, "reason": "评分失败"},
-                        "school_score": {"score": 0, "reason": "评分失败"},
-                        "major_score": {"score": 0, "reason": "评分失败"},
-                        "highlight_score": {"score": 0, "reason": "评分失败"},
-                        "experience_score": {"score": 0, "reason": "评分失败"},
-                        "quality_score": {"score": 0, "reason": "评分失败"}
-                    }
-                }
-            
-            # 4. 更新数据库记录
-            resume_service.update_resume_content(
-                resume_id=file_id,
-                content=markdown_content,
-                extracted_info=extracted_info,
-                score=scoring_result.get("total_score", 0),
-                score_detail=scoring_result.get("score_details", {})
-            )
-            
-            logger.info(f"简历处理完成: {file_id}")
-            
-        except Exception as e:
-            logger.error(f"简历处理失败: {file_id}, 错误: {str(e)}")
-            # 更新状态为失败
-            resume_service.update_resume_status(file_id, "failed", str(e))
-        finally:
-            db.close()
-            
-    except Exception as e:
-        logger.error(f"简历处理失败: {file_id}, 错误: {str(e)}")
-
-
 @router.get("/", response_model=PaginatedResumeResponse)
 async def get_user_resumes(
     page: int = Query(1, ge=1, description="页码，从1开始"),
@@ -324,6 +256,92 @@ async def get_resume(
         raise HTTPException(status_code=500, detail="获取简历失败")
 
 
+@router.get("/{resume_id}/usage")
+async def get_resume_usage(
+    resume_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    获取处理指定简历消耗的大模型token用量
+    
+    Args:
+        resume_id: 简历ID
+        current_user: 当前用户
+        db: 数据库会话
+        
+    Returns:
+        Dict: 总token数和各调用类型的用量
+    """
+    try:
+        resume = ResumeService(db=db).get_resume(resume_id)
+        if not resume:
+            raise HTTPException(status_code=404, detail="简历不存在")
+        
+        if resume.user_id != str(current_user.id):
+            raise HTTPException(status_code=403, detail="无权访问此简历")
+        
+        return UsageService(db).get_resume_usage(resume_id)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取简历用量失败: {str(e)}")
+        raise HTTPException(status_code=500, detail="获取简历用量失败")
+
+
+@router.post("/{resume_id}/reprocess", status_code=status.HTTP_202_ACCEPTED)
+async def reprocess_resume(
+    resume_id: str,
+    force: bool = Query(False, description="是否跳过大模型响应缓存，重新调用大模型并刷新缓存"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    重新处理简历
+    
+    Args:
+        resume_id: 简历ID
+        force: 是否跳过大模型响应缓存
+        current_user: 当前用户
+        db: 数据库会话
+        
+    Returns:
+        dict: 投递结果
+    """
+    try:
+        resume_service = ResumeService(db=db)
+        resume = resume_service.get_resume(resume_id)
+        if not resume:
+            raise HTTPException(status_code=404, detail="简历不存在")
+        
+        if resume.user_id != str(current_user.id):
+            raise HTTPException(status_code=403, detail="无权访问此简历")
+        
+        if resume.processing_status == "pending":
+            raise HTTPException(status_code=409, detail="简历正在处理中")
+        
+        if not resume.file_path:
+            raise HTTPException(status_code=400, detail="简历文件不存在，无法重新处理")
+        
+        resume_service.update_resume_status(resume_id, "pending")
+        await get_task_queue().enqueue(ResumeTask(
+            resume_id=resume_id,
+            file_path=resume.file_path,
+            user_id=str(current_user.id),
+            use_cache=not force
+        ))
+        logger.info(f"简历重新处理任务已投递: {resume_id}, 跳过缓存: {force}")
+        
+        return {"message": "简历已重新投递处理", "resume_id": resume_id}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"重新处理简历失败: {str(e)}")
+        raise HTTPException(status_code=500, detail="重新处理简历失败")
+
+
 @router.delete("/{resume_id}")
 async def delete_resume(
     resume_id: str,
@@ -4,57 +4,245 @@ AI服务
 """
 
 import openai
-import json
 import asyncio
-import os
-from typing import Dict, Any, Optional
+import json
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Callable, Awaitable
+from pydantic import ValidationError
 from ..config.settings import get_settings
+from ..models.llm_models import CombinedResponse, ExtractedResumeInfo, ScoringResponse, EXTRACTION_FIELDS
 from ..utils.logger import get_logger
+from ..utils.json_repair import loads_lenient
+from ..utils.json_stream import IncrementalJSONParser, JSONStreamError
+from ..utils.markdown_compactor import trim_markdown
+from ..utils.tokens import estimate_tokens
+from .llm_cache import get_llm_cache, make_cache_key
+from .llm_hedging import get_hedge_budget, hedged_call
+from .llm_router import Endpoint, get_llm_router, is_overload_error
+from .llm_scheduler import get_llm_scheduler
+from .local_extractor import fast_extract, scoring_fields_differ
+from .model_tiering import TIER_STRONG, get_model_tiering
+from .reference_data import get_reference_data
+from .resume_chunking import chunk_markdown, merge_extractions
+from .scoring_rules import score_objective_dimensions, merge_score_details, SUBJECTIVE_DIMENSIONS
+from .token_accounting import get_token_accountant
+from .usage_service import record_llm_usage
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+# 提示词模板版本，修改对应模板时递增以使旧缓存失效
+PROMPT_VERSIONS = {
+    "extraction": "1",
+    "extraction_reask": "1",
+    "extraction_chunk": "1",
+    "scoring": "1",
+    "subjective_scoring": "1",
+    "scoring_reask": "1",
+    "batch_scoring": "1",
+    "combined": "1",
+    "analysis": "1",
+}
+
+# 流式模式下解析完成即通知调用方的提取字段
+STREAMED_INFO_FIELDS = ("name", "school_name", "school_city", "education_level", "major")
+
+# 流式模式下字段解析完成时的回调，参数为字段名到值的映射
+FieldsCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# 批量评分时当前请求涉及的简历ID，设置后用量按这些简历平均分摊，覆盖实例的 resume_id
+_usage_resume_ids: ContextVar[Optional[Tuple[str, ...]]] = ContextVar("usage_resume_ids", default=None)
+
+# 评分维度名称
+DIMENSION_LABELS = {
+    "region_score": "地域筛选",
+    "school_score": "学校选择",
+    "major_score": "专业匹配",
+    "highlight_score": "个人亮点",
+    "experience_score": "项目经历",
+    "quality_score": "简历质量",
+}
+
+# 信息提取结果的JSON格式
+EXTRACTION_OUTPUT_SCHEMA = """{
+    "name": "姓名",
+    "school_name": "学校名称",
+    "school_city": "学校所在城市",
+    "education_level": "学历层次（本科/硕士/博士等）",
+    "major": "专业",
+    "graduation_year": "毕业年份",
+    "phone": "手机号",
+    "email": "邮箱",
+    "position": "求职岗位",
+    "work_experience": [
+        {
+            "company": "公司名称",
+            "position": "职位",
+            "duration": "工作时长",
+            "description": "工作描述"
+        }
+    ],
+    "skills": ["技能1", "技能2", "技能3"],
+    "projects": [
+        {
+            "name": "项目名称",
+            "description": "项目描述",
+            "technologies": ["技术栈"]
+        }
+    ],
+    "summary": "个人简介或自我评价"
+}"""
+
+# 主观维度评分提示词（地域、学校、专业由本地规则计算）
+SUBJECTIVE_SCORING_PROMPT_PREFIX = """
+请根据以下评分规则对简历进行量化评分：
+
+## 评分规则
+
+### 一、个人亮点（差异化项 | 最高+6分，取单项最高分，不累计）
++6分：ACM等权威编程竞赛获奖
++4分：持有Kubernetes等专业领域权威证书
++3分：拥有活跃的GitHub/Gitee个人项目
++2分：维护有高质量的技术博客（如CSDN）
+
+### 二、项目经历（实践项 | 最高+10分）
++10分：有知名互联网大厂（如字节跳动、腾讯）实习或工作经历
++7分：有其他公司的完整项目实习或工作经历
+
+### 三、简历质量（形式项 | 最高+3分，可累计）
++2分：成果量化（如："性能提升30%"）
++1分：使用主动性动词（如："主导"、"独立完成"）
+"""
+
+SUBJECTIVE_SCORING_OUTPUT_INSTRUCTIONS = """
+请严格按照评分规则进行评分，并以JSON格式返回结果：
+
+{
+    "total_score": 总分,
+    "score_details": {
+        "highlight_score": {
+            "score": 个人亮点得分,
+            "reason": "评分原因"
+        },
+        "experience_score": {
+            "score": 项目经历得分,
+            "reason": "评分原因"
+        },
+        "quality_score": {
+            "score": 简历质量得分,
+            "reason": "评分原因"
+        }
+    }
+}
+
+注意：
+1. 总分应该是各维度得分的总和
+2. 每个维度的得分不能超过其最高分
+3. 个人亮点只取最高的一项得分，不累计
+4. 简历质量可以累计得分
+5. 请确保JSON格式正确
+
+请只返回JSON格式的结果，不要包含其他内容。
+"""
+
+# 评分提示词中位于简历内容之后的固定输出要求
+SCORING_OUTPUT_INSTRUCTIONS = """
+请严格按照评分规则进行评分，并以JSON格式返回结果：
+
+{
+    "total_score": 总分,
+    "score_details": {
+        "region_score": {
+            "score": 地域筛选得分,
+            "reason": "评分原因"
+        },
+        "school_score": {
+            "score": 学校选择得分,
+            "reason": "评分原因"
+        },
+        "major_score": {
+            "score": 专业匹配得分,
+            "reason": "评分原因"
+        },
+        "highlight_score": {
+            "score": 个人亮点得分,
+            "reason": "评分原因"
+        },
+        "experience_score": {
+            "score": 项目经历得分,
+            "reason": "评分原因"
+        },
+        "quality_score": {
+            "score": 简历质量得分,
+            "reason": "评分原因"
+        }
+    }
+}
+
+注意：
+1. 总分应该是各维度得分的总和
+2. 每个维度的得分不能超过其最高分
+3. 个人亮点只取最高的一项得分，不累计
+4. 简历质量可以累计得分
+5. 请确保JSON格式正确
+
+请只返回JSON格式的结果，不要包含其他内容。
+"""
+
+
+class LLMUnavailableError(Exception):
+    """大模型调用失败（网络、超时、限流或服务端错误），稍后重试可能成功"""
+
+
+def _split_tokens(total: int, count: int) -> List[int]:
+    """把token数平均分成 count 份，余数分给前几份，各份之和等于总数"""
+    share, remainder = divmod(total, count)
+    return [share + (1 if index < remainder else 0) for index in range(count)]
+
+
+def _is_json_object(response: str) -> bool:
+    """判断响应本身是否为合法的JSON对象，只缓存这类响应，需要修复的输出不缓存"""
+    try:
+        return isinstance(json.loads(response), dict)
+    except ValueError:
+        return False
+
+
+def _is_valid_completion(response) -> bool:
+    """对冲时判断响应是否可用：未被截断且内容（容忍代码块标记等偏差）能解析为JSON对象"""
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        return False
+    try:
+        return isinstance(loads_lenient(choice.message.content or ""), dict)
+    except ValueError:
+        return False
+
 
 class AIService:
     """AI服务类"""
     
-    def __init__(self):
-        # 配置OpenAI客户端
-        openai.api_key = settings.openai_api_key
-        self.client = openai.OpenAI(
-            api_key=settings.openai_api_key,
-            base_url=settings.openai_base_url,
-        )
-        
-        # 加载评分数据
-        self._load_scoring_data()
-    
-    def _load_scoring_data(self):
-        """加载评分相关数据"""
-        try:
-            # 获取数据文件路径
-            data_dir = os.path.join(os.path.dirname(__file__), "..", "..", "data")
-            
-            # 加载985院校数据
-            with open(os.path.join(data_dir, "985.json"), "r", encoding="utf-8") as f:
-                self.universities_985 = json.load(f)
-            
-            # 加载211院校数据
-            with open(os.path.join(data_dir, "211.json"), "r", encoding="utf-8") as f:
-                self.universities_211 = json.load(f)
-            
-            # 加载专业匹配数据
-            with open(os.path.join(data_dir, "major.json"), "r", encoding="utf-8") as f:
-                self.major_rules = json.load(f)
-            
-            logger.info("评分数据加载成功")
-            
-        except Exception as e:
-            logger.error(f"评分数据加载失败: {str(e)}")
-            # 设置默认数据
-            self.universities_985 = []
-            self.universities_211 = []
-            self.major_rules = {}
+    def __init__(
+        self,
+        user_id: Optional[str] = None,
+        use_cache: bool = True,
+        on_fields: Optional[FieldsCallback] = None,
+        resume_id: Optional[str] = None
+    ):
+        """
+        Args:
+            user_id: 发起请求的用户ID，用于在用户之间公平调度大模型请求
+            use_cache: 是否读取响应缓存，为False时强制重新调用大模型并刷新缓存
+            on_fields: 流式模式下关键字段（姓名、学校、总分等）解析完成时的回调
+            resume_id: 正在处理的简历ID，用于按简历记录token用量
+        """
+        self.user_id = user_id
+        self.resume_id = resume_id
+        self.use_cache = use_cache
+        self.on_fields = on_fields
+        # 评分参考数据（进程内只加载一次）
+        self.reference = get_reference_data()
     
     async def score_resume(self, markdown_content: str, extracted_info: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -66,95 +254,363 @@ class AIService:
             
         Returns:
             Dict[str, Any]: 评分结果
+            
+        Raises:
+            LLMUnavailableError: 大模型调用失败
         """
+        markdown_content = self._scoring_content(markdown_content)
+        if settings.local_rule_scoring:
+            return await self._score_resume_with_rules(markdown_content, extracted_info)
+        
         try:
             logger.info("开始对简历进行评分")
             
             prompt = self._build_scoring_prompt(markdown_content, extracted_info)
+            tier = get_model_tiering().choose(markdown_content)
             
-            response = await self._call_openai(prompt)
+            response = await self._call_openai(prompt, prompt_kind="scoring", tier=tier)
             
             # 解析AI返回的JSON
             scoring_result = self._parse_scoring_response(response)
             
+            dimensions = tuple(DIMENSION_LABELS)
+            score_details = scoring_result["score_details"]
+            if any(name not in score_details for name in dimensions):
+                get_model_tiering().record_incomplete(tier)
+                score_details = await self._reask_missing_dimensions(
+                    markdown_content, score_details, dimensions, self.reference.scoring_prompt_prefix
+                )
+                for name in dimensions:
+                    score_details.setdefault(name, {"score": 0, "reason": "评分失败"})
+                scoring_result = {
+                    "total_score": sum(detail["score"] for detail in score_details.values()),
+                    "score_details": score_details
+                }
+            
             logger.info(f"简历评分完成: {scoring_result}")
             
             return scoring_result
             
+        except LLMUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"简历评分失败: {str(e)}")
             return self._get_default_scoring_result()
     
-    def _build_scoring_prompt(self, content: str, extracted_info: Dict[str, Any]) -> str:
+    async def _score_resume_with_rules(self, markdown_content: str, extracted_info: Dict[str, Any]) -> Dict[str, Any]:
         """
-        构建评分提示词
+        地域、学校、专业按本地规则评分，大模型只评估个人亮点、项目经历和简历质量
         
         Args:
-            content: 简历内容
-            extracted_info: 提取的信息
+            markdown_content: Markdown格式的简历内容
+            extracted_info: AI提取的简历信息
             
         Returns:
-            str: 提示词
+            Dict[str, Any]: 评分结果
         """
-        # 构建985院校列表
-        universities_985_list = [uni["school_name"] for uni in self.universities_985]
-        universities_211_list = [uni["school_name"] for uni in self.universities_211]
+        objective = score_objective_dimensions(extracted_info or {}, self.reference)
+        logger.info(f"客观维度规则评分完成: {objective}")
         
-        # 构建专业匹配规则
-        computer_majors = self.major_rules.get("专业分类规则", {}).get("计算机类专业", {}).get("核心关键词", []) + \
-                         self.major_rules.get("专业分类规则", {}).get("计算机类专业", {}).get("扩展关键词", [])
-        related_majors = self.major_rules.get("专业分类规则", {}).get("相关理工科专业", {}).get("核心关键词", []) + \
-                        self.major_rules.get("专业分类规则", {}).get("相关理工科专业", {}).get("扩展关键词", [])
+        subjective: Dict[str, Any] = {}
+        try:
+            logger.info("开始对简历主观维度进行评分")
+            prompt = self._build_subjective_scoring_prompt(markdown_content)
+            tier = get_model_tiering().choose(markdown_content)
+            response = await self._call_openai(prompt, prompt_kind="subjective_scoring", tier=tier)
+            subjective = self._parse_scoring_response(response)["score_details"]
+            if any(name not in subjective for name in SUBJECTIVE_DIMENSIONS):
+                get_model_tiering().record_incomplete(tier)
+            subjective = await self._reask_missing_dimensions(
+                markdown_content, subjective, SUBJECTIVE_DIMENSIONS, SUBJECTIVE_SCORING_PROMPT_PREFIX
+            )
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"简历主观维度评分失败: {str(e)}")
         
-        prompt = f"""
-请根据以下评分规则对简历进行量化评分：
-
-## 评分规则
-
-### 一、地域筛选（基础项 | 最高+5分）
-+5分：四川省内高校
-+3分：四川省外重点高校
-+0分：其他
-
-### 二、学校选择（核心项 | 最高+10分）
-+10分：985院校
-+8分：211院校
-+5分：普通本科院校
-+2分：专科院校
-
-### 三、专业匹配（分级项 | 最高+8分）
-+8分：计算机科学、软件工程、人工智能等计算机相关专业
-+5分：通信、电气、电子信息等其他理工科专业
-+2分：其他专业
-
-### 四、个人亮点（差异化项 | 最高+6分，取单项最高分，不累计）
-+6分：ACM等权威编程竞赛获奖
-+4分：持有Kubernetes等专业领域权威证书
-+3分：拥有活跃的GitHub/Gitee个人项目
-+2分：维护有高质量的技术博客（如CSDN）
-
-### 五、项目经历（实践项 | 最高+10分）
-+10分：有知名互联网大厂（如字节跳动、腾讯）实习或工作经历
-+7分：有其他公司的完整项目实习或工作经历
-
-### 六、简历质量（形式项 | 最高+3分，可累计）
-+2分：成果量化（如："性能提升30%"）
-+1分：使用主动性动词（如："主导"、"独立完成"）
-
-## 参考数据
+        scoring_result = merge_score_details(objective, subjective)
+        logger.info(f"简历评分完成: {scoring_result}")
+        return scoring_result
+    
+    async def reconcile_scoring(
+        self,
+        markdown_content: str,
+        assumed_info: Dict[str, Any],
+        extracted_info: Dict[str, Any],
+        scoring_result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        评分与信息提取并行时，用大模型提取的信息校正评分
+        
+        本地规则评分时客观维度按提取结果重新计算，主观维度不依赖提取信息而直接保留；
+        否则只在评分依据的学校、专业、学历与提取结果不一致时重新评分
+        
+        Args:
+            markdown_content: Markdown格式的简历内容
+            assumed_info: 评分时使用的本地预提取信息
+            extracted_info: 大模型提取的信息
+            scoring_result: 并行得到的评分结果
+            
+        Returns:
+            Dict[str, Any]: 校正后的评分结果
+        """
+        if settings.local_rule_scoring:
+            objective = score_objective_dimensions(extracted_info or {}, self.reference)
+            return merge_score_details(objective, scoring_result.get("score_details") or {})
+        
+        differences = scoring_fields_differ(assumed_info, extracted_info or {})
+        if not differences:
+            return scoring_result
+        logger.info(f"预提取信息与AI提取结果不一致，重新评分: {differences}")
+        return await self.score_resume(markdown_content, extracted_info)
+    
+    async def score_resumes_batch(
+        self,
+        items: List[Tuple[str, str, Dict[str, Any]]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量评分：在token预算内把多份简历放进同一个请求，评分规则和参考数据只发送一次
+        
+        批量响应中缺失的简历会单独评分。批量请求的用量在本批简历之间平均分摊，单独评分的用量记在对应简历上
+        
+        Args:
+            items: (简历ID, Markdown内容, 提取的信息) 列表
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: 简历ID到评分结果的映射
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        items = [
+            (resume_id, self._scoring_content(content), extracted_info)
+            for resume_id, content, extracted_info in items
+        ]
+        
+        async def score_one(resume_id: str, content: str, extracted_info: Dict[str, Any]) -> Dict[str, Any]:
+            _usage_resume_ids.set((resume_id,))
+            return await self.score_resume(content, extracted_info)
+        
+        async def score_batch(batch: List[Tuple[str, str, Dict[str, Any]]]):
+            if len(batch) == 1:
+                resume_id, content, extracted_info = batch[0]
+                results[resume_id] = await score_one(resume_id, content, extracted_info)
+                return
+            
+            _usage_resume_ids.set(tuple(resume_id for resume_id, _, _ in batch))
+            parsed: Dict[str, Dict[str, Any]] = {}
+            try:
+                logger.info(f"开始批量评分，简历数: {len(batch)}")
+                prompt = self._build_batch_scoring_prompt(batch)
+                response = await self._call_openai(prompt, prompt_kind="batch_scoring")
+                parsed = self._parse_batch_scoring_response(response, len(batch))
+            except Exception as e:
+                logger.error(f"批量评分失败，改为逐份评分: {str(e)}")
+            
+            fallbacks = []
+            for index, (resume_id, content, extracted_info) in enumerate(batch, start=1):
+                score_details = parsed.get(str(index))
+                if score_details is None:
+                    fallbacks.append((resume_id, content, extracted_info))
+                else:
+                    results[resume_id] = self._build_batch_scoring_result(extracted_info, score_details)
+            
+            if fallbacks:
+                logger.warning(f"批量评分结果缺少 {len(fallbacks)} 份简历，逐份重新评分")
+                scores = await asyncio.gather(*(
+                    score_one(resume_id, content, extracted_info) for resume_id, content, extracted_info in fallbacks
+                ))
+                for (resume_id, _, _), scoring_result in zip(fallbacks, scores):
+                    results[resume_id] = scoring_result
+        
+        await asyncio.gather(*(score_batch(batch) for batch in self._pack_scoring_batches(items)))
+        return results
+    
+    def _scoring_content(self, markdown_content: str) -> str:
+        """
+        获取评分使用的简历内容
+        
+        开启分段提取时保存的简历内容不按token预算裁剪，评分不分段，发送前按预算裁剪低价值章节
+        
+        Args:
+            markdown_content: Markdown格式的简历内容
+            
+        Returns:
+            str: 裁剪到 markdown_token_budget 以内的简历内容
+        """
+        if not settings.markdown_compaction:
+            return markdown_content
+        content, trimmed = trim_markdown(markdown_content, settings.markdown_token_budget)
+        if trimmed:
+            logger.info(f"评分内容超出token预算，已裁剪章节: {trimmed}")
+        return content
+    
+    def _pack_scoring_batches(
+        self,
+        items: List[Tuple[str, str, Dict[str, Any]]]
+    ) -> List[List[Tuple[str, str, Dict[str, Any]]]]:
+        """
+        按token预算和数量上限把简历分组
+        
+        Args:
+            items: (简历ID, Markdown内容, 提取的信息) 列表
+            
+        Returns:
+            List[List[Tuple[str, str, Dict[str, Any]]]]: 分组结果
+        """
+        budget = settings.llm_batch_token_budget - estimate_tokens(self._batch_scoring_rules())
+        batches: List[List[Tuple[str, str, Dict[str, Any]]]] = []
+        current: List[Tuple[str, str, Dict[str, Any]]] = []
+        used = 0
+        for item in items:
+            tokens = estimate_tokens(item[1])
+            if current and (used + tokens > budget or len(current) >= settings.llm_batch_max_size):
+                batches.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _batch_scoring_rules(self) -> str:
+        """批量评分使用的评分规则提示词"""
+        if settings.local_rule_scoring:
+            return SUBJECTIVE_SCORING_PROMPT_PREFIX
+        return self.reference.scoring_prompt_prefix
+    
+    def _build_batch_scoring_prompt(self, batch: List[Tuple[str, str, Dict[str, Any]]]) -> str:
+        """
+        构建批量评分提示词，简历按顺序编号
+        
+        Args:
+            batch: (简历ID, Markdown内容, 提取的信息) 列表
+            
+        Returns:
+            str: 提示词
+        """
+        dimensions = SUBJECTIVE_DIMENSIONS if settings.local_rule_scoring else tuple(DIMENSION_LABELS)
+        
+        sections = []
+        for index, (_, content, extracted_info) in enumerate(batch, start=1):
+            info = ""
+            if not settings.local_rule_scoring:
+                info = f"""姓名：{extracted_info.get('name', '未知')}
+学校：{extracted_info.get('school_name', '未知')}
+专业：{extracted_info.get('major', '未知')}
+学历：{extracted_info.get('education_level', '未知')}
 
-### 985院校名单：
-{', '.join(universities_985_list)}
+"""
+            sections.append(f"## 简历 {index}\n{info}{content}")
+        
+        score_details_schema = ",\n".join(
+            f'                "{name}": {{"score": {DIMENSION_LABELS[name]}得分, "reason": "评分原因"}}'
+            for name in dimensions
+        )
+        return self._batch_scoring_rules() + f"""
+以下共有 {len(batch)} 份简历，请分别独立评分，不要相互比较。
 
-### 211院校名单：
-{', '.join(universities_211_list)}
+{chr(10).join(sections)}
 
-### 计算机相关专业关键词：
-{', '.join(computer_majors)}
+请以JSON格式返回结果，每份简历一项，resume_id 为简历编号，格式如下：
+{{
+    "results": [
+        {{
+            "resume_id": "1",
+            "total_score": 总分,
+            "score_details": {{
+{score_details_schema}
+            }}
+        }}
+    ]
+}}
 
-### 其他理工科专业关键词：
-{', '.join(related_majors)}
+注意：
+1. 必须返回全部 {len(batch)} 份简历的结果
+2. 总分应该是各维度得分的总和
+3. 每个维度的得分不能超过其最高分
+4. 个人亮点只取最高的一项得分，不累计
+5. 简历质量可以累计得分
 
+请只返回JSON格式的结果，不要包含其他内容。
+"""
+    
+    def _parse_batch_scoring_response(self, response: str, count: int) -> Dict[str, Dict[str, Any]]:
+        """
+        解析批量评分响应
+        
+        Args:
+            response: AI原始响应
+            count: 本批简历数量
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: 简历编号到维度得分的映射，解析失败的简历不包含在内
+        """
+        data = loads_lenient(response)
+        if isinstance(data, dict):
+            data = data.get("results", [])
+        if not isinstance(data, list):
+            raise ValueError("批量评分响应缺少 results")
+        
+        parsed: Dict[str, Dict[str, Any]] = {}
+        for index, entry in enumerate(data, start=1):
+            if not isinstance(entry, dict):
+                continue
+            resume_index = str(entry.get("resume_id", index)).strip()
+            if not resume_index.isdigit() or not 1 <= int(resume_index) <= count:
+                continue
+            try:
+                scoring = ScoringResponse.model_validate(entry)
+            except ValidationError:
+                continue
+            if scoring.score_details:
+                parsed[str(int(resume_index))] = {
+                    name: detail.model_dump() for name, detail in scoring.score_details.items()
+                }
+        return parsed
+    
+    def _build_batch_scoring_result(self, extracted_info: Dict[str, Any], score_details: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        由批量响应中单份简历的维度得分生成评分结果
+        
+        Args:
+            extracted_info: 提取的信息
+            score_details: 大模型给出的维度得分
+            
+        Returns:
+            Dict[str, Any]: 评分结果
+        """
+        if settings.local_rule_scoring:
+            objective = score_objective_dimensions(extracted_info or {}, self.reference)
+        else:
+            objective = score_details
+        return merge_score_details(objective, score_details)
+    
+    def _build_subjective_scoring_prompt(self, content: str) -> str:
+        """
+        构建只包含主观维度的评分提示词
+        
+        Args:
+            content: 简历内容
+            
+        Returns:
+            str: 提示词
+        """
+        return SUBJECTIVE_SCORING_PROMPT_PREFIX + f"""
+## 简历内容
+{content}
+""" + SUBJECTIVE_SCORING_OUTPUT_INSTRUCTIONS
+    
+    def _build_scoring_prompt(self, content: str, extracted_info: Dict[str, Any]) -> str:
+        """
+        构建评分提示词
+        
+        Args:
+            content: 简历内容
+            extracted_info: 提取的信息
+            
+        Returns:
+            str: 提示词
+        """
+        prompt = self.reference.scoring_prompt_prefix + f"""
 ## 简历信息
 姓名：{extracted_info.get('name', '未知')}
 学校：{extracted_info.get('school_name', '未知')}
@@ -163,107 +619,245 @@ class AIService:
 
 ## 简历内容
 {content}
+""" + SCORING_OUTPUT_INSTRUCTIONS
+        return prompt
+    
+    def _parse_scoring_response(self, response: str) -> Dict[str, Any]:
+        """
+        解析评分响应，容忍代码块标记、多余文字和截断等偏差
+        
+        Args:
+            response: AI原始响应
+            
+        Returns:
+            Dict[str, Any]: 解析后的评分结果，只包含成功解析的维度；完全无法解析时维度为空
+        """
+        try:
+            data = loads_lenient(response)
+            if not isinstance(data, dict):
+                raise ValueError("AI响应不是有效的JSON对象")
+            parsed = ScoringResponse.model_validate(data)
+        except (ValueError, ValidationError) as e:
+            logger.error(f"评分响应解析失败: {str(e)}")
+            logger.error(f"原始响应: {response}")
+            return {"total_score": 0, "score_details": {}}
+        
+        score_details = {name: detail.model_dump() for name, detail in parsed.score_details.items()}
+        total_score = parsed.total_score
+        if total_score is None:
+            total_score = sum(detail["score"] for detail in score_details.values())
+        return {"total_score": total_score, "score_details": score_details}
+    
+    async def _reask_missing_dimensions(
+        self,
+        content: str,
+        score_details: Dict[str, Any],
+        dimensions: Tuple[str, ...],
+        rules: str
+    ) -> Dict[str, Any]:
+        """
+        只针对响应中缺失的评分维度重新询问一次
+        
+        Args:
+            content: 简历内容
+            score_details: 已解析的维度得分
+            dimensions: 需要的维度
+            rules: 评分规则提示词
+            
+        Returns:
+            Dict[str, Any]: 补充后的维度得分，仍缺失的维度不包含在内
+        """
+        missing = [name for name in dimensions if name not in score_details]
+        if not missing or not settings.llm_reask_missing_fields:
+            return score_details
+        
+        logger.warning(f"评分响应缺少维度，重新询问: {missing}")
+        try:
+            prompt = self._build_dimension_reask_prompt(content, missing, rules)
+            response = await self._call_openai(prompt, prompt_kind="scoring_reask")
+            supplement = self._parse_scoring_response(response)["score_details"]
+        except Exception as e:
+            logger.error(f"补充评分维度失败: {str(e)}")
+            return score_details
+        
+        score_details = dict(score_details)
+        score_details.update({name: detail for name, detail in supplement.items() if name in missing})
+        return score_details
+    
+    def _build_dimension_reask_prompt(self, content: str, missing: List[str], rules: str) -> str:
+        """
+        构建只对缺失维度评分的提示词
+        
+        Args:
+            content: 简历内容
+            missing: 缺失的维度
+            rules: 评分规则提示词
+            
+        Returns:
+            str: 提示词
+        """
+        score_details_schema = ",\n".join(
+            f'        "{name}": {{"score": {DIMENSION_LABELS[name]}得分, "reason": "评分原因"}}'
+            for name in missing
+        )
+        return rules + f"""
+## 简历内容
+{content}
 
-请严格按照评分规则进行评分，并以JSON格式返回结果：
+请只对以下维度评分：{"、".join(DIMENSION_LABELS[name] for name in missing)}
 
+请以JSON格式返回结果，格式如下：
 {{
-    "total_score": 总分,
     "score_details": {{
-        "region_score": {{
-            "score": 地域筛选得分,
-            "reason": "评分原因"
-        }},
-        "school_score": {{
-            "score": 学校选择得分,
-            "reason": "评分原因"
-        }},
-        "major_score": {{
-            "score": 专业匹配得分,
-            "reason": "评分原因"
-        }},
-        "highlight_score": {{
-            "score": 个人亮点得分,
-            "reason": "评分原因"
-        }},
-        "experience_score": {{
-            "score": 项目经历得分,
-            "reason": "评分原因"
-        }},
-        "quality_score": {{
-            "score": 简历质量得分,
-            "reason": "评分原因"
-        }}
+{score_details_schema}
+    }}
+}}
+
+请只返回JSON格式的结果，不要包含其他内容。
+"""
+    
+    def _get_default_scoring_result(self) -> Dict[str, Any]:
+        """
+        获取默认评分结果（当AI评分失败时）
+        
+        Returns:
+            Dict[str, Any]: 默认评分结果
+        """
+        return {
+            "total_score": 0,
+            "score_details": {
+                "region_score": {"score": 0, "reason": "评分失败"},
+                "school_score": {"score": 0, "reason": "评分失败"},
+                "major_score": {"score": 0, "reason": "评分失败"},
+                "highlight_score": {"score": 0, "reason": "评分失败"},
+                "experience_score": {"score": 0, "reason": "评分失败"},
+                "quality_score": {"score": 0, "reason": "评分失败"}
+            }
+        }
+    
+    async def extract_and_score(self, markdown_content: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        单次调用大模型同时完成信息提取和评分
+        
+        Args:
+            markdown_content: Markdown格式的简历内容
+            
+        Returns:
+            Optional[Tuple[Dict[str, Any], Dict[str, Any]]]: (提取的信息, 评分结果)，
+                响应无法解析时返回None，由调用方回退到两次调用
+                
+        Raises:
+            LLMUnavailableError: 大模型调用失败
+        """
+        if self._needs_chunking(markdown_content):
+            logger.info("简历较长，跳过单次调用，改为分段提取")
+            return None
+        
+        try:
+            logger.info("开始使用AI单次调用提取信息并评分")
+            
+            prompt = self._build_combined_prompt(markdown_content)
+            tier = get_model_tiering().choose(markdown_content)
+            response = await self._call_openai(prompt, prompt_kind="combined", tier=tier)
+            try:
+                result = self._parse_combined_response(response)
+            except ValueError:
+                get_model_tiering().record_incomplete(tier)
+                raise
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            logger.warning(f"单次调用提取评分失败，将回退到两次调用: {str(e)}")
+            return None
+        
+        extracted_info = result["extracted_info"]
+        score_details = result["score_details"]
+        if settings.local_rule_scoring:
+            objective = score_objective_dimensions(extracted_info, self.reference)
+        else:
+            objective = score_details
+        scoring_result = merge_score_details(objective, score_details)
+        
+        logger.info(f"AI单次调用提取评分完成: {extracted_info}, 评分: {scoring_result}")
+        return extracted_info, scoring_result
+    
+    def _build_combined_prompt(self, content: str) -> str:
+        """
+        构建同时提取信息和评分的提示词
+        
+        Args:
+            content: 简历内容
+            
+        Returns:
+            str: 提示词
+        """
+        if settings.local_rule_scoring:
+            rules = SUBJECTIVE_SCORING_PROMPT_PREFIX
+            dimensions = SUBJECTIVE_DIMENSIONS
+        else:
+            rules = self.reference.scoring_prompt_prefix
+            dimensions = tuple(DIMENSION_LABELS)
+        
+        score_details_schema = ",\n".join(
+            f'        "{name}": {{"score": {DIMENSION_LABELS[name]}得分, "reason": "评分原因"}}'
+            for name in dimensions
+        )
+        extraction_schema = EXTRACTION_OUTPUT_SCHEMA.replace("\n", "\n    ")
+        
+        return f"""
+请完成两项任务：一是从简历中提取关键信息，二是按评分规则对简历进行量化评分。
+{rules}
+## 简历内容
+{content}
+
+请以JSON格式返回结果，格式如下：
+{{
+    "extracted_info": {extraction_schema},
+    "total_score": 总分,
+    "score_details": {{
+{score_details_schema}
     }}
 }}
 
-注意：
+信息提取注意：
+{self._build_extraction_notes()}
+
+评分注意：
 1. 总分应该是各维度得分的总和
 2. 每个维度的得分不能超过其最高分
 3. 个人亮点只取最高的一项得分，不累计
 4. 简历质量可以累计得分
-5. 请确保JSON格式正确
 
 请只返回JSON格式的结果，不要包含其他内容。
 """
-        return prompt
     
-    def _parse_scoring_response(self, response: str) -> Dict[str, Any]:
+    def _parse_combined_response(self, response: str) -> Dict[str, Any]:
         """
-        解析评分响应
+        解析同时包含提取信息和评分的响应
         
         Args:
             response: AI原始响应
             
         Returns:
-            Dict[str, Any]: 解析后的评分结果
-        """
-        try:
-            # 清理响应内容
-            response = response.strip()
-            
-            # 移除可能的markdown代码块标记
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.endswith('```'):
-                response = response[:-3]
-            
-            # 解析JSON
-            scoring_result = json.loads(response)
+            Dict[str, Any]: 包含 extracted_info 和 score_details 的结果
             
-            # 验证必要字段
-            if not isinstance(scoring_result, dict):
-                raise ValueError("AI响应不是有效的JSON对象")
-            
-            if "total_score" not in scoring_result or "score_details" not in scoring_result:
-                raise ValueError("AI响应缺少必要字段")
-            
-            return scoring_result
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"评分响应JSON解析失败: {str(e)}")
-            logger.error(f"原始响应: {response}")
-            return self._get_default_scoring_result()
-        except Exception as e:
-            logger.error(f"评分响应解析失败: {str(e)}")
-            return self._get_default_scoring_result()
-    
-    def _get_default_scoring_result(self) -> Dict[str, Any]:
+        Raises:
+            ValueError: 响应无法解析或缺少必要字段
         """
-        获取默认评分结果（当AI评分失败时）
+        data = loads_lenient(response)
+        if not isinstance(data, dict):
+            raise ValueError("AI响应不是有效的JSON对象")
+        if not isinstance(data.get("extracted_info"), dict) or not isinstance(data.get("score_details"), dict):
+            raise ValueError("AI响应缺少 extracted_info 或 score_details")
         
-        Returns:
-            Dict[str, Any]: 默认评分结果
-        """
+        try:
+            parsed = CombinedResponse.model_validate(data)
+        except ValidationError as e:
+            raise ValueError(f"AI响应格式不正确: {str(e)}")
         return {
-            "total_score": 0,
-            "score_details": {
-                "region_score": {"score": 0, "reason": "评分失败"},
-                "school_score": {"score": 0, "reason": "评分失败"},
-                "major_score": {"score": 0, "reason": "评分失败"},
-                "highlight_score": {"score": 0, "reason": "评分失败"},
-                "experience_score": {"score": 0, "reason": "评分失败"},
-                "quality_score": {"score": 0, "reason": "评分失败"}
-            }
+            "extracted_info": parsed.extracted_info.model_dump(),
+            "total_score": parsed.total_score,
+            "score_details": {name: detail.model_dump() for name, detail in parsed.score_details.items()}
         }
     
     async def extract_resume_info(self, markdown_content: str) -> Dict[str, Any]:
@@ -275,35 +869,146 @@ class AIService:
             
         Returns:
             Dict[str, Any]: 提取的信息
+            
+        Raises:
+            LLMUnavailableError: 大模型调用失败
         """
+        # 手机号、邮箱等格式规整的字段先在本地提取，大模型只提取其余字段
+        prefilled = fast_extract(markdown_content, self.reference) if settings.local_fast_extraction else {}
+        if prefilled:
+            logger.info(f"本地快速提取字段: {prefilled}")
+            early_fields = {name: value for name, value in prefilled.items() if name in STREAMED_INFO_FIELDS}
+            if early_fields:
+                await self._emit_fields(early_fields)
+        
         try:
             logger.info("开始使用AI提取简历信息")
             
-            prompt = self._build_extraction_prompt(markdown_content)
-            
-            response = await self._call_openai(prompt)
+            fields = [name for name in EXTRACTION_FIELDS if name not in prefilled]
+            if self._needs_chunking(markdown_content):
+                extracted_info = await self._extract_in_chunks(markdown_content, fields)
+            else:
+                prompt = self._build_extraction_prompt(markdown_content, fields)
+                tier = get_model_tiering().choose(markdown_content)
+                
+                response = await self._call_openai(prompt, prompt_kind="extraction", tier=tier)
+                
+                # 解析AI返回的JSON
+                extracted_info, missing = self._parse_extraction_response(response, fields)
+                if missing:
+                    get_model_tiering().record_incomplete(tier)
+                if missing and settings.llm_reask_missing_fields:
+                    extracted_info = await self._reask_missing_fields(markdown_content, extracted_info, missing)
             
-            # 解析AI返回的JSON
-            extracted_info = self._parse_ai_response(response)
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"AI信息提取失败: {str(e)}")
+            extracted_info = self._get_default_info()
+        
+        if prefilled:
+            extracted_info.update(prefilled)
+            extracted_info["local_fields"] = sorted(prefilled)
+        logger.info(f"AI信息提取完成: {extracted_info}")
+        return extracted_info
+    
+    def _needs_chunking(self, markdown_content: str) -> bool:
+        """
+        判断简历是否需要分段提取
+        
+        Args:
+            markdown_content: Markdown格式的简历内容
             
-            logger.info(f"AI信息提取完成: {extracted_info}")
+        Returns:
+            bool: 超过分段阈值时返回True
+        """
+        return (
+            settings.llm_chunked_extraction
+            and estimate_tokens(markdown_content) > settings.llm_chunk_threshold_tokens
+        )
+    
+    async def _extract_in_chunks(self, markdown_content: str, fields: Sequence[str]) -> Dict[str, Any]:
+        """
+        按章节切分长简历，并行提取各分段后在本地合并
+        
+        分段中缺少某些字段是正常的，因此不重新询问；部分分段的响应无法解析时用其余分段的结果合并，
+        任一分段的大模型调用失败则整体失败，以免保存缺少部分经历的结果
+        
+        Args:
+            markdown_content: Markdown格式的简历内容
+            fields: 需要大模型提取的字段
             
-            return extracted_info
+        Returns:
+            Dict[str, Any]: 合并后的信息
+        """
+        chunks = chunk_markdown(markdown_content, settings.llm_chunk_max_tokens)
+        logger.info(f"简历较长，分 {len(chunks)} 段并行提取")
+        tiering = get_model_tiering()
+        
+        async def extract(index: int, chunk: str) -> Dict[str, Any]:
+            tier = tiering.choose(chunk)
+            prompt = self._build_chunk_extraction_prompt(chunk, index, len(chunks), fields)
+            response = await self._call_openai(prompt, prompt_kind="extraction_chunk", tier=tier)
+            info, missing = self._parse_extraction_response(response, fields)
+            if len(missing) == len(fields):
+                tiering.record_incomplete(tier)
+            return info
+        
+        results = await asyncio.gather(
+            *[extract(index, chunk) for index, chunk in enumerate(chunks)],
+            return_exceptions=True
+        )
+        succeeded = [result for result in results if not isinstance(result, BaseException)]
+        for index, result in enumerate(results):
+            if isinstance(result, BaseException):
+                logger.error(f"第 {index + 1} 段信息提取失败: {str(result)}")
+        unavailable = [result for result in results if isinstance(result, LLMUnavailableError)]
+        if unavailable:
+            raise unavailable[0]
+        if not succeeded:
+            raise results[0]
+        
+        merged = ExtractedResumeInfo.model_validate(merge_extractions(succeeded, fields)).model_dump()
+        early_fields = {name: merged[name] for name in STREAMED_INFO_FIELDS if name in fields and merged.get(name)}
+        if early_fields:
+            await self._emit_fields(early_fields)
+        return merged
+    
+    def _build_chunk_extraction_prompt(self, content: str, index: int, total: int, fields: Sequence[str]) -> str:
+        """
+        构建分段信息提取的提示词
+        
+        Args:
+            content: 分段内容
+            index: 分段序号（从0开始）
+            total: 分段总数
+            fields: 需要大模型提取的字段
             
-        except Exception as e:
-            logger.error(f"AI信息提取失败: {str(e)}")
-            return self._get_default_info()
+        Returns:
+            str: 提示词
+        """
+        return (
+            f"以下简历内容是一份较长简历的第 {index + 1}/{total} 部分。"
+            "只提取这部分中出现的信息，未出现的字段设置为null，列表字段返回空列表。\n"
+            + self._build_extraction_prompt(content, fields)
+        )
     
-    def _build_extraction_prompt(self, content: str) -> str:
+    def _build_extraction_prompt(self, content: str, fields: Sequence[str] = EXTRACTION_FIELDS) -> str:
         """
         构建AI提取信息的提示词
         
         Args:
             content: 简历内容
+            fields: 需要大模型提取的字段，已在本地提取的字段不再要求输出
             
         Returns:
             str: 提示词
         """
+        schema = EXTRACTION_OUTPUT_SCHEMA
+        if set(fields) != set(EXTRACTION_FIELDS):
+            example = json.loads(EXTRACTION_OUTPUT_SCHEMA)
+            schema = json.dumps({name: example[name] for name in fields}, ensure_ascii=False, indent=4)
+        
         prompt = f"""
 请从以下简历内容中提取关键信息，并以JSON格式返回。请确保提取的信息准确且完整，不要编造信息。
 
@@ -311,80 +1016,526 @@ class AIService:
 {content}
 
 请提取以下信息并以JSON格式返回：
-{{
-    "name": "姓名",
-    "school_name": "学校名称",
-    "school_city": "学校所在城市",
-    "education_level": "学历层次（本科/硕士/博士等）",
-    "major": "专业",
-    "graduation_year": "毕业年份",
-    "phone": "手机号",
-    "email": "邮箱",
-    "position": "求职岗位",
-    "work_experience": [
-        {{
-            "company": "公司名称",
-            "position": "职位",
-            "duration": "工作时长",
-            "description": "工作描述"
-        }}
-    ],
-    "skills": ["技能1", "技能2", "技能3"],
-    "projects": [
-        {{
-            "name": "项目名称",
-            "description": "项目描述",
-            "technologies": ["技术栈"]
-        }}
-    ],
-    "summary": "个人简介或自我评价"
-}}
+{schema}
 
 
 注意：
-1. 如果某些信息在简历中没有找到，请设置为null
+{self._build_extraction_notes()}
+
+请只返回JSON格式的结果，不要包含其他内容。
+"""
+        return prompt
+    
+    def _build_extraction_notes(self) -> str:
+        """
+        构建信息提取的注意事项
+        
+        Returns:
+            str: 注意事项文本
+        """
+        return f"""1. 如果某些信息在简历中没有找到，请设置为null
 2. 确保JSON格式正确
 3. 提取的信息要准确，不要编造
 4. 学校名称要完整，不要缩写
 5. 城市名称要准确,
 6. 城市提取规则如下: 
-- 如果学校名称在 {self.universities_985} 和 {self.universities_211} 中，则提取学校所在城市
+- 如果学校名称在 {self.reference.extraction_school_reference} 中，则提取学校所在城市
 - 如果学校名称中包含城市名称，则提取城市名称.比如: 成都理工大学, 则提取城市为成都
-- 如果上诉规则都未匹配到，则提取城市为null
-
-请只返回JSON格式的结果，不要包含其他内容。
-"""
-        return prompt
+- 如果上诉规则都未匹配到，则提取城市为null"""
     
-    async def _call_openai(self, prompt: str) -> str:
+    async def _call_openai(self, prompt: str, prompt_kind: str = "default", tier: str = TIER_STRONG) -> str:
         """
-        调用OpenAI API
+        调用OpenAI API，相同模型、模板版本和提示词的响应从缓存读取
         
         Args:
             prompt: 提示词
+            prompt_kind: 提示词类型，对应 PROMPT_VERSIONS 中的模板版本
+            tier: 模型级别，重新询问等补救调用使用默认的主模型
             
         Returns:
             str: AI响应
+            
+        Raises:
+            LLMUnavailableError: 大模型调用失败
         """
+        tiering = get_model_tiering()
+        cache = get_llm_cache()
+        prompt_version = f"{prompt_kind}:{PROMPT_VERSIONS.get(prompt_kind, '1')}"
+        if cache is not None and self.use_cache:
+            # 按路由当前会选中的端点上的模型查找缓存
+            model = get_llm_router().preferred().model_for(tier)
+            try:
+                cached = await cache.get(make_cache_key(model, prompt_version, prompt))
+            except Exception as e:
+                logger.warning(f"读取大模型响应缓存失败: {str(e)}")
+                cached = None
+            if cached is not None:
+                logger.info(f"命中大模型响应缓存: {prompt_version}")
+                fields = self._stream_fields(prompt_kind)
+                if fields:
+                    parser = IncrementalJSONParser(fields)
+                    try:
+                        parser.feed(cached)
+                    except JSONStreamError:
+                        pass
+                    if parser.fields:
+                        await self._emit_fields(parser.fields)
+                return cached
+        
+        scheduler = get_llm_scheduler()
+        accountant = get_token_accountant()
+        max_tokens = accountant.max_tokens_for(prompt_kind)
+        estimated_tokens = estimate_tokens(prompt) + min(settings.llm_estimated_completion_tokens, max_tokens)
         try:
-            # 使用 asyncio.to_thread 在单独线程中执行同步调用，避免阻塞事件循环
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
-                model=settings.openai_model,
-                messages=[
-                    {"role": "system", "content": "你是一个专业的简历信息提取助手，能够准确从简历中提取关键信息。"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=20000,
-                temperature=0.1
-            )
-            logger.info(f"llm响应: {response}")
+            async with scheduler.slot(self.user_id, estimated_tokens, prompt_kind) as lease:
+                started = time.monotonic()
+                try:
+                    if settings.llm_streaming:
+                        content, finish_reason, model = await self._stream_completion(
+                            prompt, prompt_kind, max_tokens, tier
+                        )
+                        accountant.record_latency(prompt_kind, time.monotonic() - started)
+                        usage = None
+                    else:
+                        response, model = await self._request_completion(
+                            prompt, prompt_kind, max_tokens, tier, estimated_tokens
+                        )
+                        logger.info(f"llm响应: {response}")
+                        content = response.choices[0].message.content or ""
+                        finish_reason = response.choices[0].finish_reason
+                        usage = response.usage
+                except Exception as e:
+                    tiering.record_call(tier, failed=True)
+                    if is_overload_error(e):
+                        scheduler.record_overload(prompt_kind)
+                    raise
+                tiering.record_call(tier, time.monotonic() - started)
+                
+                # 服务端未返回用量（如流式输出）时按文本估算
+                if usage:
+                    prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+                else:
+                    prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(content)
+                lease.used_tokens = prompt_tokens + completion_tokens
+                scheduler.record_success(lease)
+            
+            truncated = finish_reason == "length"
+            if truncated:
+                logger.warning(f"大模型输出达到max_tokens上限被截断: {prompt_kind}, max_tokens={max_tokens}")
+            accountant.record(prompt_kind, prompt_tokens, completion_tokens, truncated=truncated)
+            await self._record_usage(prompt_kind, model, prompt_tokens, completion_tokens, estimated=usage is None)
 
-            return response.choices[0].message.content.strip()
+            content = content.strip()
+            # 截断的输出不缓存，相同提示词下次调用时可按调大后的max_tokens重新生成
+            if cache is not None and not truncated and _is_json_object(content):
+                try:
+                    await cache.set(make_cache_key(model, prompt_version, prompt), model, prompt_version, content)
+                except Exception as e:
+                    logger.warning(f"写入大模型响应缓存失败: {str(e)}")
+            return content
             
         except Exception as e:
             logger.error(f"OpenAI API调用失败: {str(e)}")
-            raise Exception(f"AI服务调用失败: {str(e)}")
+            raise LLMUnavailableError(f"AI服务调用失败: {str(e)}") from e
+    
+    async def _request_completion(
+        self,
+        prompt: str,
+        prompt_kind: str,
+        max_tokens: int,
+        tier: str = TIER_STRONG,
+        estimated_tokens: int = 0
+    ) -> Tuple[Any, str]:
+        """
+        发送非流式请求并记录耗时
+        
+        开启对冲且该调用类型的延迟样本足够时，请求超过延迟百分位仍未返回就再发送一个相同的请求，
+        先返回有效JSON的请求胜出。对冲请求单独申请调度名额，受并发上限和token预算限制；
+        落败请求（被取消或结果被丢弃）的用量同样计入统计
+        
+        Args:
+            prompt: 提示词
+            prompt_kind: 提示词类型
+            max_tokens: 输出token上限
+            tier: 模型级别
+            estimated_tokens: 对冲请求向调度器预留的token数
+            
+        Returns:
+            Tuple[Any, str]: 聊天补全响应和实际提供服务的端点上的模型名称
+        """
+        accountant = get_token_accountant()
+        
+        async def request():
+            started = time.monotonic()
+            try:
+                result = await self._create_completion(prompt, max_tokens=max_tokens, tier=tier)
+            except asyncio.CancelledError:
+                # 被对冲请求取消时，已等待的时长是实际耗时的下限
+                accountant.record_latency(prompt_kind, time.monotonic() - started)
+                raise
+            accountant.record_latency(prompt_kind, time.monotonic() - started)
+            return result
+        
+        delay = None
+        if settings.llm_hedging:
+            delay = accountant.latency_percentile(prompt_kind, settings.llm_hedge_percentile)
+        if delay is None:
+            return await request()
+        
+        # 已成功返回的（响应, 模型名称），以及已发出和已结束（成功或失败）的请求数
+        results: List[Tuple[Any, str]] = []
+        sent = 0
+        finished = 0
+        
+        async def attempt():
+            nonlocal sent, finished
+            sent += 1
+            try:
+                result = await request()
+            except Exception:
+                finished += 1
+                raise
+            finished += 1
+            results.append(result)
+            return result
+        
+        async def hedge():
+            async with get_llm_scheduler().slot(self.user_id, estimated_tokens, prompt_kind) as lease:
+                result = await attempt()
+                usage = result[0].usage
+                if usage:
+                    lease.used_tokens = usage.prompt_tokens + usage.completion_tokens
+                return result
+        
+        winner = await hedged_call(
+            attempt,
+            max(delay, settings.llm_hedge_min_delay),
+            get_hedge_budget(),
+            is_valid=lambda result: _is_valid_completion(result[0]),
+            hedge=hedge
+        )
+        for response, model in results:
+            if response is not winner[0]:
+                await self._record_discarded(prompt_kind, model, prompt, response)
+        # 胜出时仍未结束的请求已被取消，无法得知其端点，按路由当前会选中的端点记录模型
+        for _ in range(sent - finished):
+            await self._record_discarded(prompt_kind, get_llm_router().preferred().model_for(tier), prompt, None)
+        return winner
+    
+    async def _record_discarded(self, prompt_kind: str, model: str, prompt: str, response):
+        """
+        记录对冲中落败请求的用量
+        
+        Args:
+            prompt_kind: 提示词类型
+            model: 模型名称
+            prompt: 提示词
+            response: 落败请求的响应，请求被取消时为None，只按估算计入输入token
+        """
+        if response is None:
+            prompt_tokens, completion_tokens = estimate_tokens(prompt), 0
+        elif response.usage:
+            prompt_tokens, completion_tokens = response.usage.prompt_tokens, response.usage.completion_tokens
+        else:
+            prompt_tokens = estimate_tokens(prompt)
+            completion_tokens = estimate_tokens(response.choices[0].message.content or "")
+        get_token_accountant().record_discarded(prompt_kind, prompt_tokens, completion_tokens)
+        await self._record_usage(
+            prompt_kind, model, prompt_tokens, completion_tokens, estimated=response is None or not response.usage
+        )
+    
+    async def _record_usage(
+        self,
+        prompt_kind: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        estimated: bool
+    ):
+        """
+        把一次调用的用量写入数据库，写入失败不影响调用结果
+        
+        批量评分的请求涉及多份简历，用量平均分摊后按简历各记一条
+        
+        Args:
+            prompt_kind: 提示词类型
+            model: 模型名称
+            prompt_tokens: 输入token数
+            completion_tokens: 输出token数
+            estimated: token数是否为估算值
+        """
+        resume_ids = _usage_resume_ids.get() or (self.resume_id,)
+        if not settings.llm_usage_tracking or (self.user_id is None and resume_ids == (None,)):
+            return
+        shares = zip(
+            resume_ids,
+            _split_tokens(prompt_tokens, len(resume_ids)),
+            _split_tokens(completion_tokens, len(resume_ids))
+        )
+        try:
+            for resume_id, prompt_share, completion_share in shares:
+                await asyncio.to_thread(
+                    record_llm_usage,
+                    call_type=prompt_kind,
+                    model=model,
+                    prompt_tokens=prompt_share,
+                    completion_tokens=completion_share,
+                    resume_id=resume_id,
+                    user_id=self.user_id,
+                    estimated=estimated
+                )
+        except Exception as e:
+            logger.warning(f"记录大模型用量失败: {str(e)}")
+    
+    async def _create_completion(
+        self,
+        prompt: str,
+        stream: bool = False,
+        max_tokens: Optional[int] = None,
+        tier: str = TIER_STRONG
+    ) -> Tuple[Any, str]:
+        """
+        经端点路由发送聊天补全请求，端点故障时自动换用其他端点
+        
+        Args:
+            prompt: 提示词
+            stream: 是否流式返回
+            max_tokens: 输出token上限，为None时使用配置的最大值
+            tier: 模型级别
+            
+        Returns:
+            Tuple[Any, str]: 聊天补全响应或流，以及实际提供服务的端点上的模型名称
+        """
+        async def request(endpoint: Endpoint):
+            result = await self._create_completion_on(endpoint, prompt, stream, max_tokens, tier)
+            return result, endpoint.model_for(tier)
+        
+        return await get_llm_router().run(request)
+    
+    async def _create_completion_on(
+        self,
+        endpoint: Endpoint,
+        prompt: str,
+        stream: bool = False,
+        max_tokens: Optional[int] = None,
+        tier: str = TIER_STRONG
+    ):
+        """
+        在指定端点上发送聊天补全请求，端点支持时要求以JSON对象格式输出
+        
+        Args:
+            endpoint: 大模型端点
+            prompt: 提示词
+            stream: 是否流式返回
+            max_tokens: 输出token上限
+            tier: 模型级别
+            
+        Returns:
+            聊天补全响应或流
+        """
+        kwargs: Dict[str, Any] = {
+            "model": endpoint.model_for(tier),
+            "messages": [
+                {"role": "system", "content": "你是一个专业的简历信息提取助手，能够准确从简历中提取关键信息。"},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens or settings.llm_max_tokens,
+            "temperature": 0.1
+        }
+        if stream:
+            kwargs["stream"] = True
+        
+        if settings.llm_json_mode and endpoint.json_mode_supported:
+            try:
+                return await endpoint.client().chat.completions.create(
+                    response_format={"type": "json_object"}, **kwargs
+                )
+            except openai.BadRequestError as e:
+                if "response_format" not in str(e):
+                    raise
+                logger.warning(f"大模型端点不支持JSON输出格式，改用普通输出: {endpoint.name}, {str(e)}")
+                endpoint.json_mode_supported = False
+        return await endpoint.client().chat.completions.create(**kwargs)
+    
+    async def _stream_completion(
+        self,
+        prompt: str,
+        prompt_kind: str,
+        max_tokens: Optional[int] = None,
+        tier: str = TIER_STRONG
+    ) -> Tuple[str, Optional[str], str]:
+        """
+        以流式方式调用OpenAI API，边接收边解析JSON
+        
+        关注的字段一完整就通过 on_fields 回调通知，根对象结束后不再接收剩余输出。
+        输出不是严格的JSON（如尾随逗号、Python字面量、较长的前言）时停止增量解析但继续接收，
+        完整文本由调用方按宽松规则解析，仍无法解析时按解析失败处理（重新询问或默认结果）
+        
+        Args:
+            prompt: 提示词
+            prompt_kind: 提示词类型
+            max_tokens: 输出token上限
+            tier: 模型级别
+            
+        Returns:
+            Tuple[str, Optional[str], str]: AI响应、结束原因和实际提供服务的端点上的模型名称
+        """
+        parser: Optional[IncrementalJSONParser] = IncrementalJSONParser(self._stream_fields(prompt_kind))
+        parts = []
+        finish_reason = None
+        stream, model = await self._create_completion(prompt, stream=True, max_tokens=max_tokens, tier=tier)
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                delta = chunk.choices[0].delta.content
+                parts.append(delta)
+                if parser is None:
+                    continue
+                try:
+                    fields = parser.feed(delta)
+                except JSONStreamError as e:
+                    logger.warning(f"流式输出不是严格的JSON，停止增量解析，接收完整输出后宽松解析: {str(e)}")
+                    parser = None
+                    continue
+                if fields:
+                    await self._emit_fields(fields)
+                if parser.finished:
+                    break
+        finally:
+            await stream.response.aclose()
+        
+        content = "".join(parts)
+        logger.info(f"llm流式响应: {content}")
+        return content, finish_reason, model
+    
+    def _stream_fields(self, prompt_kind: str) -> Tuple[str, ...]:
+        """
+        获取流式解析时需要提前通知的字段路径
+        
+        Args:
+            prompt_kind: 提示词类型
+            
+        Returns:
+            Tuple[str, ...]: 字段路径
+        """
+        if self.on_fields is None:
+            return ()
+        if prompt_kind == "extraction":
+            return STREAMED_INFO_FIELDS
+        # 启用本地规则评分时大模型给出的总分只包含主观维度，不能提前写入
+        total_score = () if settings.local_rule_scoring else ("total_score",)
+        if prompt_kind == "scoring":
+            return total_score
+        if prompt_kind == "combined":
+            return tuple(f"extracted_info.{name}" for name in STREAMED_INFO_FIELDS) + total_score
+        return ()
+    
+    async def _emit_fields(self, fields: Dict[str, Any]):
+        """
+        通知调用方已完整解析的字段，回调失败不影响大模型调用
+        
+        Args:
+            fields: 字段路径到值的映射
+        """
+        if self.on_fields is None:
+            return
+        fields = {path.rsplit(".", 1)[-1]: value for path, value in fields.items()}
+        try:
+            await self.on_fields(fields)
+        except Exception as e:
+            logger.warning(f"提前写入字段失败: {str(e)}")
+    
+    def _parse_extraction_response(
+        self,
+        response: str,
+        fields: Sequence[str] = EXTRACTION_FIELDS
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        解析并校验信息提取响应
+        
+        Args:
+            response: AI原始响应
+            fields: 要求大模型输出的字段
+            
+        Returns:
+            Tuple[Dict[str, Any], List[str]]: (规范化后的信息, 响应中缺失的字段)
+        """
+        try:
+            data = loads_lenient(response)
+            if not isinstance(data, dict):
+                raise ValueError("AI响应不是有效的JSON对象")
+        except ValueError as e:
+            logger.error(f"AI响应解析失败: {str(e)}")
+            logger.error(f"原始响应: {response}")
+            return self._get_default_info(), list(fields)
+        
+        missing = [name for name in fields if name not in data]
+        return ExtractedResumeInfo.model_validate(data).model_dump(), missing
+    
+    async def _reask_missing_fields(
+        self,
+        content: str,
+        extracted_info: Dict[str, Any],
+        missing: List[str]
+    ) -> Dict[str, Any]:
+        """
+        只针对响应中缺失的字段重新询问一次
+        
+        Args:
+            content: 简历内容
+            extracted_info: 已提取的信息
+            missing: 缺失的字段
+            
+        Returns:
+            Dict[str, Any]: 补充后的信息
+        """
+        logger.warning(f"AI提取结果缺少字段，重新询问: {missing}")
+        try:
+            prompt = self._build_field_reask_prompt(content, missing)
+            response = await self._call_openai(prompt, prompt_kind="extraction_reask")
+            data = loads_lenient(response)
+            if not isinstance(data, dict):
+                raise ValueError("AI响应不是有效的JSON对象")
+        except Exception as e:
+            logger.error(f"补充提取字段失败: {str(e)}")
+            return extracted_info
+        
+        merged = dict(extracted_info)
+        merged.update({name: value for name, value in data.items() if name in missing})
+        return ExtractedResumeInfo.model_validate(merged).model_dump()
+    
+    def _build_field_reask_prompt(self, content: str, missing: List[str]) -> str:
+        """
+        构建只提取缺失字段的提示词
+        
+        Args:
+            content: 简历内容
+            missing: 缺失的字段
+            
+        Returns:
+            str: 提示词
+        """
+        fields = "\n".join(
+            f"- {name}: {ExtractedResumeInfo.model_fields[name].description}" for name in missing
+        )
+        return f"""
+请从以下简历中提取指定的信息：
+
+{content}
+
+需要提取的字段：
+{fields}
+
+请以JSON格式返回结果，只包含上述字段。
+
+注意：
+{self._build_extraction_notes()}
+
+请只返回JSON格式的结果，不要包含其他内容。
+"""
     
     def _parse_ai_response(self, response: str) -> Dict[str, Any]:
         """
@@ -397,17 +1548,7 @@ class AIService:
             Dict[str, Any]: 解析后的信息
         """
         try:
-            # 清理响应内容
-            response = response.strip()
-            
-            # 移除可能的markdown代码块标记
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.endswith('```'):
-                response = response[:-3]
-            
-            # 解析JSON
-            extracted_info = json.loads(response)
+            extracted_info = loads_lenient(response)
             
             # 验证必要字段
             if not isinstance(extracted_info, dict):
@@ -415,12 +1556,9 @@ class AIService:
             
             return extracted_info
             
-        except json.JSONDecodeError as e:
-            logger.error(f"AI响应JSON解析失败: {str(e)}")
-            logger.error(f"原始响应: {response}")
-            return self._get_default_info()
-        except Exception as e:
+        except ValueError as e:
             logger.error(f"AI响应解析失败: {str(e)}")
+            logger.error(f"原始响应: {response}")
             return self._get_default_info()
     
     def _get_default_info(self) -> Dict[str, Any]:
@@ -478,7 +1616,7 @@ class AIService:
 请只返回JSON格式的结果。
 """
             
-            response = await self._call_openai(prompt)
+            response = await self._call_openai(prompt, prompt_kind="analysis")
             return self._parse_ai_response(response)
             
         except Exception as e:
@@ -490,4 +1628,4 @@ class AIService:
                 "recommendations": [],
                 "match_score": 0,
                 "analysis": "分析失败"
-            }
\ No newline at end of file
+            }
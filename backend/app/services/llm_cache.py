@@ -0,0 +1,219 @@
+"""
+大模型响应缓存
+以 (模型, 提示词模板版本, 提示词) 的哈希为键，将响应持久化到本地SQLite，
+重复处理、重试和重复上传时直接复用，不再调用大模型
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from ..config.settings import get_settings
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 每写入多少条检查一次容量
+PRUNE_EVERY = 50
+
+
+def make_cache_key(model: str, prompt_version: str, prompt: str) -> str:
+    """
+    计算缓存键
+
+    Args:
+        model: 模型名称
+        prompt_version: 提示词模板版本
+        prompt: 完整提示词
+
+    Returns:
+        str: SHA-256十六进制摘要
+    """
+    digest = hashlib.sha256()
+    for part in (model, prompt_version, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """基于SQLite的大模型响应缓存，按TTL过期，超过容量时淘汰最久未使用的条目"""
+
+    def __init__(self, path: str, ttl: int = 7 * 24 * 3600, max_entries: int = 10000):
+        """
+        Args:
+            path: SQLite数据库文件路径
+            ttl: 缓存有效期（秒），0表示不过期
+            max_entries: 最大缓存条目数
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache (accessed_at)"
+            )
+            self._conn.commit()
+
+    @property
+    def hit_ratio(self) -> float:
+        """缓存命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存状态
+
+        Returns:
+            Dict[str, Any]: 命中次数、未命中次数、命中率和条目数
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 4),
+            "entries": entries,
+        }
+
+    def get_sync(self, key: str) -> Optional[str]:
+        """读取缓存，过期或不存在返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl and row[1] + self.ttl <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row:
+                self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def set_sync(self, key: str, model: str, prompt_version: str, response: str):
+        """写入缓存"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, prompt_version, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, response, now, now)
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune_locked(now)
+
+    def clear_sync(self, prompt_version: Optional[str] = None) -> int:
+        """
+        清空缓存，由 clear_llm_cache.py 调用
+
+        Args:
+            prompt_version: 只清除指定模板版本的缓存，为None时清除全部
+
+        Returns:
+            int: 删除的条目数
+        """
+        with self._lock:
+            if prompt_version is None:
+                cursor = self._conn.execute("DELETE FROM llm_cache")
+            else:
+                cursor = self._conn.execute("DELETE FROM llm_cache WHERE prompt_version = ?", (prompt_version,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    async def get(self, key: str) -> Optional[str]:
+        """异步读取缓存"""
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def set(self, key: str, model: str, prompt_version: str, response: str):
+        """异步写入缓存"""
+        await asyncio.to_thread(self.set_sync, key, model, prompt_version, response)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def _prune_locked(self, now: float):
+        """删除过期条目，并按最近访问时间淘汰超出容量的条目"""
+        if self.ttl:
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._conn.commit()
+
+
+# 全局缓存实例
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_unavailable = False
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    获取大模型响应缓存（单例模式）
+
+    Returns:
+        Optional[LLMCache]: 缓存实例，未启用或无法打开时返回None
+    """
+    global _llm_cache, _llm_cache_unavailable
+    settings = get_settings()
+    if not settings.llm_cache_enabled or _llm_cache_unavailable:
+        return None
+    if _llm_cache is None:
+        try:
+            _llm_cache = LLMCache(
+                path=settings.llm_cache_path,
+                ttl=settings.llm_cache_ttl,
+                max_entries=settings.llm_cache_max_entries
+            )
+            logger.info(f"大模型响应缓存已启用: {settings.llm_cache_path}")
+        except Exception as e:
+            logger.error(f"大模型响应缓存初始化失败，将不使用缓存: {str(e)}")
+            _llm_cache_unavailable = True
+            return None
+    return _llm_cache
+
+
+def close_llm_cache():
+    """关闭全局缓存"""
+    global _llm_cache
+    if _llm_cache is not None:
+        _llm_cache.close()
+        _llm_cache = None
@@ -0,0 +1,134 @@
+"""
+大模型请求对冲
+请求耗时超过该调用类型的延迟百分位仍未返回时，再发送一个相同的请求，
+先返回有效结果的请求胜出，另一个被取消；对冲请求数受预算比例限制
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from ..config.settings import get_settings
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class HedgeBudget:
+    """对冲预算：对冲请求数不超过调用次数的固定比例"""
+
+    def __init__(self, ratio: float = 0.1):
+        """
+        Args:
+            ratio: 允许对冲的调用比例
+        """
+        self.ratio = ratio
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+
+    def record_call(self):
+        """记录一次可对冲的调用"""
+        self.calls += 1
+
+    def try_acquire(self) -> bool:
+        """
+        申请发送一个对冲请求
+
+        Returns:
+            bool: 预算内返回True
+        """
+        if self.hedged + 1 > self.ratio * self.calls:
+            self.rejected += 1
+            return False
+        self.hedged += 1
+        return True
+
+    def record_win(self):
+        """记录对冲请求先于原请求返回"""
+        self.hedge_wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        对冲统计
+
+        Returns:
+            Dict[str, Any]: 调用次数、对冲次数、对冲胜出次数和因预算不足放弃的次数
+        """
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "rejected": self.rejected,
+            "hedge_ratio": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+        }
+
+
+async def hedged_call(
+    request: Callable[[], Awaitable[T]],
+    delay: float,
+    budget: HedgeBudget,
+    is_valid: Callable[[T], bool] = lambda result: True,
+    hedge: Optional[Callable[[], Awaitable[T]]] = None
+) -> T:
+    """
+    发送请求，超过 delay 秒未返回时在预算内再发送一个相同的请求
+
+    先返回有效结果的请求胜出；都没有有效结果时返回最先结束的请求的结果或异常
+
+    Args:
+        request: 发送一次请求的函数
+        delay: 发送对冲请求前等待的秒数
+        budget: 对冲预算
+        is_valid: 判断结果是否有效
+        hedge: 发送对冲请求的函数，默认与 request 相同；可在其中为对冲请求单独申请调度名额
+
+    Returns:
+        T: 胜出请求的结果
+    """
+    budget.record_call()
+    primary = asyncio.ensure_future(request())
+    tasks: List[asyncio.Future] = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and budget.try_acquire():
+            logger.info(f"请求超过 {delay:.2f}s 未返回，发送对冲请求")
+            tasks.append(asyncio.ensure_future((hedge or request)()))
+
+        fallback: Optional[asyncio.Future] = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task not in done:
+                    continue
+                if task.exception() is None and is_valid(task.result()):
+                    if task is not primary:
+                        budget.record_win()
+                    return task.result()
+                if fallback is None:
+                    fallback = task
+        return fallback.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+# 全局对冲预算
+_hedge_budget: Optional[HedgeBudget] = None
+
+
+def get_hedge_budget() -> HedgeBudget:
+    """
+    获取对冲预算（单例模式）
+
+    Returns:
+        HedgeBudget: 按配置创建的对冲预算
+    """
+    global _hedge_budget
+    if _hedge_budget is None:
+        _hedge_budget = HedgeBudget(ratio=get_settings().llm_hedge_budget)
+    return _hedge_budget
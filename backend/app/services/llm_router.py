@@ -0,0 +1,478 @@
+"""
+大模型多端点路由
+在多个OpenAI兼容端点之间按延迟负载均衡：优先选择加权EWMA延迟最低、并发最少的端点，
+每个端点有独立的每分钟请求数限制；连续失败的端点由熔断器摘除，冷却后放行一个探测请求，
+成功则恢复。请求因端点故障失败时换用其他端点重试，所有端点都已熔断时立即失败而不等待冷却；
+只配置了一个端点时没有其他端点可换，等待冷却结束后发送探测请求
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple, TypeVar
+
+import httpx
+import openai
+from pydantic import BaseModel, Field
+
+from ..config.settings import get_settings
+from ..utils.logger import get_logger
+from .model_tiering import TIER_LIGHT
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# 熔断器状态
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# 端点都受请求速率限制时两次检查之间的最长等待时间（秒）
+MAX_SELECT_WAIT = 1.0
+
+
+class NoEndpointAvailableError(Exception):
+    """所有大模型端点都已熔断或正在探测，暂时无法接收请求"""
+
+
+def is_overload_error(error: Exception) -> bool:
+    """
+    判断异常是否表示大模型服务过载（429、5xx或超时）
+
+    Args:
+        error: 调用大模型时抛出的异常
+
+    Returns:
+        bool: 是否为过载
+    """
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, httpx.TimeoutException)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+def is_endpoint_failure(error: Exception) -> bool:
+    """
+    判断异常是否应计入端点故障（过载或无法连接），请求本身的错误（如400）不计入
+
+    Args:
+        error: 调用大模型时抛出的异常
+
+    Returns:
+        bool: 是否为端点故障
+    """
+    return is_overload_error(error) or isinstance(error, (openai.APIConnectionError, httpx.TransportError))
+
+
+class EndpointConfig(BaseModel):
+    """OpenAI兼容端点配置，未填写的字段使用 OPENAI_* 配置"""
+    name: str = Field(..., description="端点名称")
+    base_url: str = Field(..., description="API基础地址")
+    api_key: str = Field(default="", description="API密钥")
+    model: str = Field(..., description="模型名称")
+    light_model: Optional[str] = Field(default=None, description="轻量级别使用的模型名称，为空时使用 model")
+    weight: float = Field(default=1.0, gt=0, description="权重，越大分到的请求越多")
+    requests_per_minute: int = Field(default=0, ge=0, description="每分钟请求数上限，0表示不限制")
+
+
+class Endpoint:
+    """端点运行状态：连接、EWMA延迟、请求速率和熔断器"""
+
+    def __init__(
+        self,
+        config: EndpointConfig,
+        client: Optional[openai.AsyncOpenAI] = None,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        ewma_alpha: float = 0.3
+    ):
+        """
+        Args:
+            config: 端点配置
+            client: 预先创建的客户端，为None时按需创建
+            failure_threshold: 连续失败多少次后熔断
+            cooldown: 熔断后多久放行探测请求（秒）
+            ewma_alpha: 延迟EWMA的平滑系数
+        """
+        self.config = config
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.ewma_alpha = ewma_alpha
+        # 服务端是否支持 response_format=json_object，首次被拒绝后不再使用
+        self.json_mode_supported = True
+
+        self.ewma_latency: Optional[float] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CIRCUIT_CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+        self._recent: Deque[float] = deque()
+        self._fixed_client = client
+        self._client: Optional[Tuple[asyncio.AbstractEventLoop, openai.AsyncOpenAI]] = None
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    def client(self) -> openai.AsyncOpenAI:
+        """
+        获取端点的异步客户端，每个事件循环创建一个带连接池的客户端
+
+        客户端不自动重试，失败后由调度器、路由和任务队列决定是否换用端点或延迟重试
+
+        Returns:
+            openai.AsyncOpenAI: 异步客户端
+        """
+        if self._fixed_client is not None:
+            return self._fixed_client
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client[0] is not loop:
+            settings = get_settings()
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.openai_max_connections,
+                    max_keepalive_connections=settings.openai_max_keepalive_connections,
+                    keepalive_expiry=settings.openai_keepalive_expiry
+                ),
+                timeout=httpx.Timeout(settings.openai_timeout, connect=settings.openai_connect_timeout)
+            )
+            client = openai.AsyncOpenAI(
+                api_key=self.config.api_key,
+                base_url=self.config.base_url,
+                http_client=http_client,
+                max_retries=0
+            )
+            self._client = (loop, client)
+            logger.info(f"大模型端点客户端已创建: {self.name} ({self.config.base_url})")
+        return self._client[1]
+
+    def model_for(self, tier: str) -> str:
+        """
+        获取模型级别在该端点上对应的模型名称
+
+        Args:
+            tier: 模型级别
+
+        Returns:
+            str: 模型名称
+        """
+        if tier == TIER_LIGHT and self.config.light_model:
+            return self.config.light_model
+        return self.config.model
+
+    async def close(self):
+        """关闭端点的客户端及其连接池"""
+        if self._client is not None:
+            await self._client[1].close()
+            self._client = None
+
+    def _prune(self, now: float):
+        while self._recent and self._recent[0] <= now - 60:
+            self._recent.popleft()
+
+    def available(self, now: float) -> bool:
+        """
+        熔断器是否放行新请求，熔断冷却结束时转为半开状态
+
+        Args:
+            now: 当前时间（time.monotonic）
+
+        Returns:
+            bool: 熔断冷却中或半开状态下探测请求尚未结束时为False
+        """
+        if self.state == CIRCUIT_OPEN:
+            if now < self.opened_at + self.cooldown:
+                return False
+            self.state = CIRCUIT_HALF_OPEN
+            logger.info(f"大模型端点熔断冷却结束，放行探测请求: {self.name}")
+        return not (self.state == CIRCUIT_HALF_OPEN and self._probing)
+
+    def cooldown_remaining(self, now: float) -> float:
+        """
+        熔断冷却还要多久结束
+
+        Args:
+            now: 当前时间（time.monotonic）
+
+        Returns:
+            float: 剩余的秒数，未熔断时为0
+        """
+        if self.state != CIRCUIT_OPEN:
+            return 0.0
+        return max(self.opened_at + self.cooldown - now, 0.0)
+
+    def wait_time(self, now: float) -> float:
+        """
+        端点受每分钟请求数限制还要多久才能接收新请求
+
+        Args:
+            now: 当前时间（time.monotonic）
+
+        Returns:
+            float: 需要等待的秒数，0表示当前可用
+        """
+        if self.config.requests_per_minute:
+            self._prune(now)
+            if len(self._recent) >= self.config.requests_per_minute:
+                return max(self._recent[0] + 60 - now, 0.0)
+        return 0.0
+
+    def score(self) -> Tuple[float, float]:
+        """路由优先级，越小越优先：加权EWMA延迟乘以并发数，尚无延迟数据的端点优先"""
+        latency = self.ewma_latency or 0.0
+        return latency * (self.in_flight + 1) / self.config.weight, self.in_flight / self.config.weight
+
+    def begin(self, now: float) -> bool:
+        """
+        记录请求开始
+
+        Args:
+            now: 当前时间（time.monotonic）
+
+        Returns:
+            bool: 该请求是否为半开状态下的探测请求，需原样传给 end
+        """
+        self.requests += 1
+        self.in_flight += 1
+        self._recent.append(now)
+        probe = self.state == CIRCUIT_HALF_OPEN and not self._probing
+        if probe:
+            self._probing = True
+        return probe
+
+    def end(self, probe: bool = False):
+        """
+        记录请求结束
+
+        Args:
+            probe: 该请求是否为探测请求，只有探测请求结束时才放行下一个探测请求
+        """
+        self.in_flight -= 1
+        if probe:
+            self._probing = False
+
+    def record_success(self, latency: float):
+        """记录请求成功，更新EWMA延迟并关闭熔断器"""
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += self.ewma_alpha * (latency - self.ewma_latency)
+        self.consecutive_failures = 0
+        if self.state != CIRCUIT_CLOSED:
+            logger.info(f"大模型端点恢复: {self.name}")
+            self.state = CIRCUIT_CLOSED
+
+    def record_failure(self, now: float):
+        """记录端点故障，连续失败达到阈值或探测失败时熔断"""
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == CIRCUIT_HALF_OPEN or (
+            self.state == CIRCUIT_CLOSED and self.consecutive_failures >= self.failure_threshold
+        ):
+            self.state = CIRCUIT_OPEN
+            self.opened_at = now
+            logger.warning(f"大模型端点熔断: {self.name}，连续失败 {self.consecutive_failures} 次")
+
+    def stats(self) -> Dict[str, Any]:
+        """端点状态"""
+        return {
+            "state": self.state,
+            "weight": self.config.weight,
+            "ewma_latency_ms": round(self.ewma_latency * 1000) if self.ewma_latency is not None else None,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class LLMRouter:
+    """在多个端点之间路由大模型请求"""
+
+    def __init__(self, endpoints: List[Endpoint]):
+        """
+        Args:
+            endpoints: 端点列表
+        """
+        if not endpoints:
+            raise ValueError("至少需要配置一个大模型端点")
+        self.endpoints = endpoints
+
+    async def _select(self, exclude: Set[str]) -> Endpoint:
+        """
+        选择可用端点中优先级最高的一个，都受请求速率限制时等待
+
+        熔断冷却可能长达数十秒，调用方此时已占用调度名额，因此所有端点都已熔断时立即失败，
+        由调用方换用其他端点或交给任务队列延迟重试；只配置了一个端点时立即失败只会让排队的请求
+        在冷却期间全部失败，因此等待冷却结束或探测请求完成
+
+        Args:
+            exclude: 本次请求已尝试过的端点名称
+
+        Returns:
+            Endpoint: 选中的端点
+
+        Raises:
+            NoEndpointAvailableError: 有多个端点且所有候选端点都已熔断或正在探测
+        """
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.name not in exclude]
+        while True:
+            now = time.monotonic()
+            waits = [(endpoint.wait_time(now), endpoint) for endpoint in candidates if endpoint.available(now)]
+            if not waits:
+                if len(self.endpoints) > 1 or not candidates:
+                    raise NoEndpointAvailableError("所有大模型端点均已熔断，请稍后重试")
+                # 冷却中时等到冷却结束，半开状态下等待探测请求完成
+                await asyncio.sleep(min(candidates[0].cooldown_remaining(now) or MAX_SELECT_WAIT, MAX_SELECT_WAIT))
+                continue
+            available = [endpoint for wait, endpoint in waits if wait <= 0]
+            if available:
+                return min(available, key=lambda endpoint: endpoint.score())
+            await asyncio.sleep(min(min(wait for wait, _ in waits), MAX_SELECT_WAIT))
+
+    def preferred(self) -> Endpoint:
+        """
+        当前会被选中的端点，不等待也不发送请求，用于按端点上的模型查找缓存
+
+        Returns:
+            Endpoint: 可用端点中优先级最高的一个，都不可用时为优先级最高的端点
+        """
+        now = time.monotonic()
+        return min(
+            self.endpoints,
+            key=lambda endpoint: (not endpoint.available(now), endpoint.wait_time(now) > 0, endpoint.score())
+        )
+
+    async def run(self, request: Callable[[Endpoint], Awaitable[T]]) -> T:
+        """
+        在选出的端点上执行请求，端点故障时换用其他端点重试
+
+        Args:
+            request: 在指定端点上发送请求的函数
+
+        Returns:
+            T: 请求结果
+
+        Raises:
+            NoEndpointAvailableError: 所有端点都已熔断
+        """
+        tried: Set[str] = set()
+        last_error: Optional[Exception] = None
+        while True:
+            try:
+                endpoint = await self._select(tried)
+            except NoEndpointAvailableError:
+                # 其余端点都已熔断时抛出上一个端点的故障
+                if last_error is not None:
+                    raise last_error
+                raise
+            tried.add(endpoint.name)
+            started = time.monotonic()
+            probe = endpoint.begin(started)
+            try:
+                result = await request(endpoint)
+            except Exception as e:
+                if not is_endpoint_failure(e):
+                    raise
+                endpoint.record_failure(time.monotonic())
+                if len(tried) >= len(self.endpoints):
+                    raise
+                logger.warning(f"大模型端点请求失败，换用其他端点: {endpoint.name}, 错误: {str(e)}")
+                last_error = e
+                continue
+            finally:
+                endpoint.end(probe)
+            endpoint.record_success(time.monotonic() - started)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        各端点状态
+
+        Returns:
+            Dict[str, Any]: 端点名称到状态的映射
+        """
+        return {endpoint.name: endpoint.stats() for endpoint in self.endpoints}
+
+    async def close(self):
+        """关闭所有端点的客户端"""
+        for endpoint in self.endpoints:
+            await endpoint.close()
+
+
+def load_endpoint_configs() -> List[EndpointConfig]:
+    """
+    读取端点配置：LLM_ENDPOINTS 为JSON数组，未配置时使用 OPENAI_* 配置的单个端点
+
+    Returns:
+        List[EndpointConfig]: 端点配置
+
+    Raises:
+        ValueError: LLM_ENDPOINTS 格式错误
+    """
+    settings = get_settings()
+    defaults = {
+        "base_url": settings.openai_base_url,
+        "api_key": settings.openai_api_key,
+        "model": settings.openai_model,
+        "light_model": settings.llm_light_model or None,
+    }
+    if not settings.llm_endpoints.strip():
+        return [EndpointConfig(name="default", **defaults)]
+
+    try:
+        items = json.loads(settings.llm_endpoints)
+    except ValueError as e:
+        raise ValueError(f"LLM_ENDPOINTS 不是合法的JSON: {str(e)}")
+    if not isinstance(items, list) or not items:
+        raise ValueError("LLM_ENDPOINTS 必须是非空的JSON数组")
+
+    configs = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"LLM_ENDPOINTS 第 {index + 1} 项必须是对象")
+        configs.append(EndpointConfig(**{"name": f"endpoint-{index + 1}", **defaults, **item}))
+    if len({config.name for config in configs}) != len(configs):
+        raise ValueError("LLM_ENDPOINTS 中的端点名称不能重复")
+    return configs
+
+
+# 全局路由实例
+_llm_router: Optional[LLMRouter] = None
+
+
+def get_llm_router() -> LLMRouter:
+    """
+    获取大模型路由（单例模式）
+
+    Returns:
+        LLMRouter: 按配置创建的路由
+    """
+    global _llm_router
+    if _llm_router is None:
+        settings = get_settings()
+        endpoints = [
+            Endpoint(
+                config,
+                failure_threshold=settings.llm_circuit_failure_threshold,
+                cooldown=settings.llm_circuit_cooldown,
+                ewma_alpha=settings.llm_latency_ewma_alpha
+            )
+            for config in load_endpoint_configs()
+        ]
+        _llm_router = LLMRouter(endpoints)
+        logger.info(f"大模型端点: {[endpoint.name for endpoint in endpoints]}")
+    return _llm_router
+
+
+async def close_llm_router():
+    """关闭全局路由的所有客户端"""
+    global _llm_router
+    if _llm_router is not None:
+        await _llm_router.close()
+        _llm_router = None
@@ -0,0 +1,387 @@
+"""
+大模型请求调度
+在共享的大模型客户端前限制全局并发和每分钟token用量，并在用户之间轮转分配请求名额
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from ..config.settings import get_settings
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 未指定用户的请求归入同一个队列
+ANONYMOUS_USER = "anonymous"
+# 未指定调用类型的请求共用一个延迟基线
+DEFAULT_CALL_KIND = "default"
+
+
+class AIMDLimit:
+    """
+    加性增、乘性减的自适应并发上限
+
+    延迟稳定时每完成约一个窗口（当前上限个数）的请求，上限加 increase_step；
+    遇到429、5xx、超时或延迟明显升高时上限乘以 decrease_factor，每个往返时间内最多下调一次。
+    不同调用类型（信息提取、评分、重新询问等）的正常延迟相差很大，延迟基线按调用类型分别维护
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        increase_step: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        latency_smoothing: float = 0.1
+    ):
+        """
+        Args:
+            initial_limit: 初始上限
+            min_limit: 上限的最小值
+            max_limit: 上限的最大值
+            increase_step: 每个窗口增加的数量
+            decrease_factor: 下调时的乘数
+            latency_tolerance: 延迟超过基线的倍数时视为过载
+            latency_smoothing: 延迟基线的指数平滑系数
+        """
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.latency_smoothing = latency_smoothing
+        # 调用类型 -> 延迟基线
+        self.latency_baselines: Dict[str, float] = {}
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+
+    @property
+    def current(self) -> int:
+        """当前允许的并发数"""
+        return int(self.limit)
+
+    def on_success(self, latency: float, saturated: bool = True, kind: str = DEFAULT_CALL_KIND):
+        """
+        记录一次成功请求
+
+        Args:
+            latency: 请求耗时（秒）
+            saturated: 请求期间并发是否已用满，未用满时不上调上限
+            kind: 调用类型，延迟只与同类型的基线比较
+        """
+        baseline = self.latency_baselines.get(kind)
+        if baseline is None:
+            self.latency_baselines[kind] = latency
+            return
+
+        if latency > baseline * self.latency_tolerance:
+            self.on_overload(kind)
+        elif saturated:
+            before = self.current
+            self.limit = min(self.limit + self.increase_step / self.limit, float(self.max_limit))
+            if self.current > before:
+                self.increases += 1
+        self.latency_baselines[kind] = baseline + self.latency_smoothing * (latency - baseline)
+
+    def on_overload(self, kind: Optional[str] = None):
+        """
+        记录一次限流、服务端错误或超时
+
+        Args:
+            kind: 调用类型，用其延迟基线作为不重复下调的时间窗口；未知时使用最短的基线
+        """
+        now = time.monotonic()
+        baseline = self.latency_baselines.get(kind) if kind else None
+        if baseline is None:
+            baseline = min(self.latency_baselines.values(), default=0.0)
+        # 同一批并发请求的失败只下调一次
+        if now - self._last_decrease < max(baseline, 1.0):
+            return
+        self._last_decrease = now
+        new_limit = max(self.limit * self.decrease_factor, float(self.min_limit))
+        if new_limit < self.limit:
+            self.limit = new_limit
+            self.decreases += 1
+            logger.warning(f"大模型请求过载，并发上限下调为: {self.current}")
+
+
+@dataclass
+class SchedulerLease:
+    """一次已获准的大模型请求"""
+    user_id: str
+    reserved_tokens: int
+    used_tokens: Optional[int] = None
+    kind: str = DEFAULT_CALL_KIND
+    started_at: float = field(default_factory=time.monotonic)
+
+
+class LLMScheduler:
+    """
+    大模型请求调度器
+
+    - 进行中的请求数不超过 max_in_flight，启用自适应并发时不超过 AIMD 动态调整的上限
+    - 按令牌桶控制每分钟token用量，请求完成后按实际用量退还多预留的部分
+    - 每个用户有独立的等待队列，名额按用户轮转分配，单个用户的大批量请求不会饿死其他用户
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        tokens_per_minute: int = 0,
+        adaptive_limit: Optional[AIMDLimit] = None
+    ):
+        """
+        Args:
+            max_in_flight: 同时进行中的请求数上限
+            tokens_per_minute: 每分钟token预算，0表示不限制
+            adaptive_limit: 自适应并发上限，为None时固定使用 max_in_flight
+        """
+        self.max_in_flight = max(max_in_flight, 1)
+        self.tokens_per_minute = max(tokens_per_minute, 0)
+        self.adaptive_limit = adaptive_limit
+        self._in_flight = 0
+        self._tokens = float(self.tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        # 用户ID -> 等待队列，字典顺序即轮转顺序
+        self._waiters: Dict[str, Deque[Tuple[asyncio.Future, int]]] = {}
+        self._refill_handle: Optional[asyncio.TimerHandle] = None
+        self._granted = 0
+
+    @property
+    def in_flight(self) -> int:
+        """进行中的请求数"""
+        return self._in_flight
+
+    @property
+    def limit(self) -> int:
+        """当前允许的并发数"""
+        if self.adaptive_limit is not None:
+            return min(self.adaptive_limit.current, self.max_in_flight)
+        return self.max_in_flight
+
+    @property
+    def queue_length(self) -> int:
+        """等待调度的请求数"""
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        调度器状态
+
+        Returns:
+            Dict[str, Any]: 并发、排队和token预算情况
+        """
+        self._refill()
+        stats = {
+            "in_flight": self._in_flight,
+            "limit": self.limit,
+            "max_in_flight": self.max_in_flight,
+            "queue_length": self.queue_length,
+            "waiting_users": len(self._waiters),
+            "tokens_per_minute": self.tokens_per_minute,
+            "available_tokens": int(self._tokens) if self.tokens_per_minute else None,
+            "granted_total": self._granted,
+        }
+        if self.adaptive_limit is not None:
+            stats.update({
+                "limit_increases": self.adaptive_limit.increases,
+                "limit_decreases": self.adaptive_limit.decreases,
+                "latency_baselines": dict(self.adaptive_limit.latency_baselines),
+            })
+        return stats
+
+    async def acquire(self, user_id: Optional[str], tokens: int, kind: str = DEFAULT_CALL_KIND) -> SchedulerLease:
+        """
+        等待获得一个请求名额
+
+        Args:
+            user_id: 发起请求的用户ID
+            tokens: 本次请求预计消耗的token数
+            kind: 调用类型，用于按类型维护延迟基线
+
+        Returns:
+            SchedulerLease: 请求名额，使用完毕后必须调用 release
+        """
+        user_id = user_id or ANONYMOUS_USER
+        if self.tokens_per_minute:
+            # 单个请求超过整个预算时按预算上限计，避免永远无法调度
+            tokens = min(tokens, self.tokens_per_minute)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, deque()).append((future, tokens))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已获得名额但调用方被取消，归还名额
+                self.release(SchedulerLease(user_id=user_id, reserved_tokens=tokens, used_tokens=0))
+            else:
+                self._remove_waiter(user_id, future)
+            raise
+        return SchedulerLease(user_id=user_id, reserved_tokens=tokens, kind=kind)
+
+    def release(self, lease: SchedulerLease):
+        """
+        归还请求名额
+
+        Args:
+            lease: acquire 返回的请求名额，used_tokens 为实际消耗的token数
+        """
+        self._in_flight -= 1
+        if self.tokens_per_minute and lease.used_tokens is not None:
+            refund = lease.reserved_tokens - lease.used_tokens
+            if refund > 0:
+                self._tokens = min(self._tokens + refund, float(self.tokens_per_minute))
+        self._dispatch()
+
+    def record_success(self, lease: SchedulerLease):
+        """
+        记录请求成功，用于调整自适应并发上限
+
+        Args:
+            lease: 请求名额
+        """
+        if self.adaptive_limit is not None:
+            self.adaptive_limit.on_success(
+                time.monotonic() - lease.started_at,
+                saturated=self._in_flight >= self.limit or bool(self._waiters),
+                kind=lease.kind
+            )
+            self._dispatch()
+
+    def record_overload(self, kind: Optional[str] = None):
+        """
+        记录请求遇到429、5xx或超时，用于下调自适应并发上限
+
+        Args:
+            kind: 调用类型
+        """
+        if self.adaptive_limit is not None:
+            self.adaptive_limit.on_overload(kind)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: Optional[str],
+        tokens: int,
+        kind: str = DEFAULT_CALL_KIND
+    ) -> AsyncIterator[SchedulerLease]:
+        """
+        在上下文中持有一个请求名额
+
+        Args:
+            user_id: 发起请求的用户ID
+            tokens: 本次请求预计消耗的token数
+            kind: 调用类型，用于按类型维护延迟基线
+        """
+        lease = await self.acquire(user_id, tokens, kind)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def _refill(self):
+        """按经过的时间补充令牌"""
+        now = time.monotonic()
+        if self.tokens_per_minute:
+            elapsed = now - self._refilled_at
+            self._tokens = min(
+                self._tokens + elapsed * self.tokens_per_minute / 60.0,
+                float(self.tokens_per_minute)
+            )
+        self._refilled_at = now
+
+    def _dispatch(self):
+        """按用户轮转顺序把空闲名额分配给等待中的请求"""
+        self._refill()
+        while self._in_flight < self.limit and self._waiters:
+            user_id = next(iter(self._waiters))
+            waiters = self._waiters[user_id]
+            future, tokens = waiters[0]
+            if future.done():
+                # 等待方已取消
+                waiters.popleft()
+                if not waiters:
+                    del self._waiters[user_id]
+                continue
+
+            if self.tokens_per_minute and self._tokens < tokens:
+                self._schedule_refill(tokens - self._tokens)
+                return
+
+            waiters.popleft()
+            self._tokens -= tokens if self.tokens_per_minute else 0
+            self._in_flight += 1
+            self._granted += 1
+            future.set_result(None)
+
+            # 当前用户移到轮转队尾
+            del self._waiters[user_id]
+            if waiters:
+                self._waiters[user_id] = waiters
+
+    def _schedule_refill(self, missing_tokens: float):
+        """token不足时，在预算补足后重新调度"""
+        if self._refill_handle is not None and not self._refill_handle.cancelled():
+            return
+        delay = missing_tokens * 60.0 / self.tokens_per_minute
+
+        def _on_refill():
+            self._refill_handle = None
+            self._dispatch()
+
+        self._refill_handle = asyncio.get_running_loop().call_later(delay, _on_refill)
+
+    def _remove_waiter(self, user_id: str, future: asyncio.Future):
+        """移除已取消的等待请求"""
+        waiters = self._waiters.get(user_id)
+        if not waiters:
+            return
+        for item in list(waiters):
+            if item[0] is future:
+                waiters.remove(item)
+                break
+        if not waiters:
+            del self._waiters[user_id]
+        self._dispatch()
+
+
+# 全局调度器实例
+_llm_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """
+    获取大模型请求调度器（单例模式）
+
+    Returns:
+        LLMScheduler: 按配置创建的调度器
+    """
+    global _llm_scheduler
+    if _llm_scheduler is None:
+        settings = get_settings()
+        adaptive_limit = None
+        if settings.llm_adaptive_concurrency:
+            adaptive_limit = AIMDLimit(
+                initial_limit=settings.llm_initial_in_flight,
+                min_limit=settings.llm_min_in_flight,
+                max_limit=settings.llm_max_in_flight,
+                decrease_factor=settings.llm_aimd_decrease_factor,
+                latency_tolerance=settings.llm_latency_tolerance
+            )
+        _llm_scheduler = LLMScheduler(
+            max_in_flight=settings.llm_max_in_flight,
+            tokens_per_minute=settings.llm_tokens_per_minute,
+            adaptive_limit=adaptive_limit
+        )
+    return _llm_scheduler
@@ -0,0 +1,223 @@
+"""
+本地预提取
+用正则和参考数据（院校名单、专业关键词）从Markdown中快速提取字段：
+评分所需的学校、专业等字段使评分调用不必等待大模型完成完整的信息提取；
+手机号、邮箱、毕业年份和学校等格式规整的字段直接填入提取结果，大模型只提取其余字段
+"""
+
+import re
+from typing import Any, Dict, Optional
+
+from .reference_data import ReferenceData, normalize_school_name
+
+# 影响评分结果的字段，与大模型提取结果不一致时需要重新评分
+SCORING_FIELDS = ("school_name", "major", "education_level")
+
+_NAME_PATTERN = re.compile(r"姓\s*名\s*[:：]\s*([一-龥·]{2,6})")
+_HEADING_NAME_PATTERN = re.compile(r"^#{1,3}\s*([一-龥·]{2,4})\s*$", re.MULTILINE)
+_SCHOOL_PATTERN = re.compile(r"([一-龥（）()]{2,20}?(?:大学|学院))")
+_LABELED_SCHOOL_PATTERN = re.compile(r"(?:学\s*校|毕业院校|院\s*校)\s*[:：]\s*([一-龥（）()]{2,30})")
+_LABELED_MAJOR_PATTERN = re.compile(r"专\s*业\s*[:：]\s*([一-龥A-Za-z（）()]{2,20})")
+_MAJOR_PATTERN = re.compile(r"([一-龥]{2,12}(?:工程|科学|技术|管理|专业))")
+# 学历关键词，按从高到低排列
+_EDUCATION_LEVELS = (
+    ("博士", ("博士",)),
+    ("硕士", ("硕士", "研究生")),
+    ("本科", ("本科", "学士")),
+    ("专科", ("专科", "大专", "高职")),
+)
+_PHONE_PATTERN = re.compile(r"(?<![\d+])(?:\+?86[-\s]?)?(1[3-9]\d)[-\s]?(\d{4})[-\s]?(\d{4})(?!\d)")
+_EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+_LABELED_GRADUATION_PATTERN = re.compile(r"毕业(?:时间|年份|日期)\s*[:：]\s*((?:19|20)\d{2})")
+_GRADUATION_SUFFIX_PATTERN = re.compile(r"((?:19|20)\d{2})\s*(?:年\s*)?(?:\d{1,2}\s*月\s*)?(?:届\s*)?毕业")
+_END_YEAR_PATTERN = re.compile(r"(?:-|–|—|~|～|至|到)+\s*((?:19|20)\d{2})")
+# 教育经历所在行的标志词
+_EDUCATION_LINE_KEYWORDS = ("大学", "学院", "学校", "本科", "硕士", "博士", "专科", "研究生")
+# 学校名称中不应出现的词（如"学院路"、"大学生"）
+_SCHOOL_STOPWORDS = ("毕业于", "就读于", "大学生", "学院路")
+# 简历各部分的标题行（可带Markdown标题符号、【】和冒号），教育经历部分从其标题到下一个标题为止
+_SECTION_TITLE_PATTERN = re.compile(r"^\s*(?:#{1,6}\s*)?[【\[]?\s*([一-龥A-Za-z ]{2,12}?)\s*[】\]]?\s*[:：]?\s*$")
+_SECTION_TITLE_KEYWORDS = ("经历", "经验", "背景", "技能", "评价", "信息", "意向", "项目", "荣誉", "证书", "获奖", "爱好")
+_EDUCATION_TITLE_KEYWORDS = ("教育", "学历", "Education")
+
+
+def _find_phone(content: str) -> Optional[str]:
+    match = _PHONE_PATTERN.search(content)
+    return "".join(match.groups()) if match else None
+
+
+def _find_email(content: str) -> Optional[str]:
+    match = _EMAIL_PATTERN.search(content)
+    return match.group(0) if match else None
+
+
+def _find_graduation_year(content: str) -> Optional[str]:
+    """优先使用"毕业时间："等标注，其次取教育经历时间段中最晚的结束年份"""
+    match = _LABELED_GRADUATION_PATTERN.search(content) or _GRADUATION_SUFFIX_PATTERN.search(content)
+    if match:
+        return match.group(1)
+    years = [
+        year
+        for line in content.splitlines()
+        if any(keyword in line for keyword in _EDUCATION_LINE_KEYWORDS)
+        for year in _END_YEAR_PATTERN.findall(line)
+    ]
+    return max(years) if years else None
+
+
+def _find_name(content: str) -> Optional[str]:
+    match = _NAME_PATTERN.search(content) or _HEADING_NAME_PATTERN.search(content)
+    return match.group(1) if match else None
+
+
+def _education_section(content: str) -> str:
+    """取"教育经历"等标题到下一个部分标题之间的内容，没有教育经历标题时返回空字符串"""
+    lines = []
+    inside = False
+    for line in content.splitlines():
+        title = _SECTION_TITLE_PATTERN.match(line)
+        if title and any(keyword in title.group(1) for keyword in _EDUCATION_TITLE_KEYWORDS):
+            inside = True
+            continue
+        if title and any(keyword in title.group(1) for keyword in _SECTION_TITLE_KEYWORDS):
+            if inside:
+                break
+            continue
+        if inside:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _find_reference_school(content: str, reference: ReferenceData) -> Optional[str]:
+    """取最早出现的参考名单院校，同一位置取最长的名称"""
+    positions = []
+    for name in reference.names_985 + reference.names_211:
+        index = content.find(name)
+        if index >= 0:
+            positions.append((index, -len(name), name))
+    return min(positions)[2] if positions else None
+
+
+def _find_confident_school(content: str, reference: ReferenceData) -> Optional[str]:
+    """
+    只取"学校："标注的学校或教育经历部分中的参考名单院校，结果可以直接作为提取结果
+
+    项目、工作经历中提到的院校（如合作单位）不是求职者的学校，不在此识别
+    """
+    match = _LABELED_SCHOOL_PATTERN.search(content)
+    if match:
+        school = _SCHOOL_PATTERN.search(match.group(1))
+        if school:
+            return school.group(1)
+    section = _education_section(content)
+    return _find_reference_school(section, reference) if section else None
+
+
+def _find_school(content: str, reference: ReferenceData) -> Optional[str]:
+    """优先取可靠识别的学校和参考名单中的院校，其次取第一个形如"XX大学/学院"的名称"""
+    school = _find_confident_school(content, reference) or _find_reference_school(content, reference)
+    if school:
+        return school
+    for match in _SCHOOL_PATTERN.finditer(content):
+        school = match.group(1)
+        if not any(word in school for word in _SCHOOL_STOPWORDS):
+            return school
+    return None
+
+
+def _find_major(content: str, school_name: Optional[str], reference: ReferenceData) -> Optional[str]:
+    """优先使用"专业："标注，其次在学校所在行查找专业名称"""
+    match = _LABELED_MAJOR_PATTERN.search(content)
+    if match:
+        return match.group(1)
+    if not school_name:
+        return None
+    for line in content.splitlines():
+        if school_name not in line:
+            continue
+        rest = line.split(school_name, 1)[1]
+        match = _MAJOR_PATTERN.search(rest)
+        if match:
+            return match.group(1)
+        for keyword in reference.computer_major_keywords + reference.related_major_keywords:
+            if keyword and keyword in rest:
+                return keyword
+    return None
+
+
+def _find_education_level(content: str) -> Optional[str]:
+    for level, keywords in _EDUCATION_LEVELS:
+        if any(keyword in content for keyword in keywords):
+            return level
+    return None
+
+
+def pre_extract(markdown_content: str, reference: ReferenceData) -> Dict[str, Any]:
+    """
+    本地提取姓名、学校、学校城市、专业和学历
+
+    Args:
+        markdown_content: Markdown格式的简历内容
+        reference: 评分参考数据
+
+    Returns:
+        Dict[str, Any]: 提取结果，未识别的字段为None
+    """
+    content = markdown_content or ""
+    school_name = _find_school(content, reference)
+    record = reference.lookup_school(school_name) or {}
+    return {
+        "name": _find_name(content),
+        "school_name": school_name,
+        "school_city": record.get("city"),
+        "major": _find_major(content, school_name, reference),
+        "education_level": _find_education_level(content),
+    }
+
+
+def _normalize(field: str, value: Any) -> str:
+    if not value:
+        return ""
+    value = str(value).strip()
+    return normalize_school_name(value) if field == "school_name" else value
+
+
+def scoring_fields_differ(assumed: Dict[str, Any], extracted: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    比较评分时假定的字段与大模型提取的字段
+
+    Args:
+        assumed: 评分时使用的字段
+        extracted: 大模型提取的信息
+
+    Returns:
+        Dict[str, Any]: 不一致的字段及其提取值
+    """
+    return {
+        field: extracted.get(field)
+        for field in SCORING_FIELDS
+        if _normalize(field, assumed.get(field)) != _normalize(field, extracted.get(field))
+    }
+
+
+def fast_extract(markdown_content: str, reference: ReferenceData) -> Dict[str, str]:
+    """
+    用预编译的正则提取手机号、邮箱、毕业年份和学校
+
+    只返回能可靠识别的字段：学校只取"学校："标注的名称或教育经历部分中的参考名单院校
+
+    Args:
+        markdown_content: Markdown格式的简历内容
+        reference: 评分参考数据
+
+    Returns:
+        Dict[str, str]: 识别出的字段，未识别的字段不包含在内
+    """
+    content = markdown_content or ""
+    fields = {
+        "phone": _find_phone(content),
+        "email": _find_email(content),
+        "graduation_year": _find_graduation_year(content),
+        "school_name": _find_confident_school(content, reference),
+    }
+    return {name: value for name, value in fields.items() if value}
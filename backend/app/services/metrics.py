@@ -0,0 +1,44 @@
+"""
+运行指标
+汇总大模型调度、端点路由、模型分级、token用量、请求对冲、Markdown压缩、响应缓存、任务队列等组件的运行状态
+"""
+
+from typing import Any, Dict
+
+from .llm_cache import get_llm_cache
+from .llm_hedging import get_hedge_budget
+from .llm_router import get_llm_router
+from .llm_scheduler import get_llm_scheduler
+from .model_tiering import get_model_tiering
+from .task_queue import get_task_queue
+from .token_accounting import get_token_accountant
+from ..utils.logger import get_logger
+from ..utils.markdown_compactor import get_compaction_stats
+
+logger = get_logger(__name__)
+
+
+async def collect_metrics() -> Dict[str, Any]:
+    """
+    收集当前进程的运行指标
+
+    Returns:
+        Dict[str, Any]: 各组件的指标
+    """
+    metrics: Dict[str, Any] = {
+        "llm_scheduler": get_llm_scheduler().stats(),
+        "llm_tokens": get_token_accountant().stats(),
+        "llm_hedging": get_hedge_budget().stats(),
+        "llm_endpoints": get_llm_router().stats(),
+        "llm_tiers": get_model_tiering().stats(),
+        "markdown_compaction": get_compaction_stats().stats(),
+    }
+    cache = get_llm_cache()
+    if cache is not None:
+        metrics["llm_cache"] = cache.stats()
+    try:
+        metrics["task_queue"] = {"pending": await get_task_queue().qsize()}
+    except Exception as e:
+        logger.warning(f"获取任务队列长度失败: {str(e)}")
+        metrics["task_queue"] = {"pending": None}
+    return metrics
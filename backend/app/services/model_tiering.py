@@ -0,0 +1,208 @@
+"""
+模型分级
+根据简历的token数和结构复杂度选择模型：短小、结构简单的简历使用更便宜更快的轻量模型，
+长篇或结构复杂的简历使用主模型；按级别统计延迟和输出质量
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+from ..config.settings import get_settings
+from ..utils.logger import get_logger
+from ..utils.tokens import estimate_tokens
+from .token_accounting import percentile
+
+logger = get_logger(__name__)
+
+TIER_LIGHT = "light"
+TIER_STRONG = "strong"
+
+# 经历的起止时间，如 2019.09 - 2023.06、2021年3月至今；
+# 旧版文本清理会去掉分隔符，已保存的内容中为 2019.09  2023.06，起止时间都带月份时也计入
+_DATE_RANGE_PATTERN = re.compile(
+    r"(?:19|20)\d{2}(?:\s*[./年-]\s*\d{1,2}\s*月?)?\s*(?:-|–|—|~|～|至|到)+\s*(?:(?:19|20)\d{2}|至今|现在|今)"
+    r"|(?:19|20)\d{2}\s*[./年]\s*\d{1,2}\s*月?\s+(?:(?:19|20)\d{2}\s*[./年]\s*\d{1,2}|至今|现在)"
+)
+
+
+@dataclass
+class ResumeComplexity:
+    """简历复杂度估计"""
+    tokens: int
+    sections: int
+    entries: int
+    table_rows: int
+
+    @property
+    def score(self) -> int:
+        """结构复杂度：章节数 + 2×经历条数 + 表格行数/5"""
+        return self.sections + 2 * self.entries + self.table_rows // 5
+
+
+def estimate_complexity(markdown_content: str) -> ResumeComplexity:
+    """
+    估计简历的token数和结构复杂度
+
+    Args:
+        markdown_content: Markdown格式的简历内容
+
+    Returns:
+        ResumeComplexity: 复杂度估计
+    """
+    lines = [line.strip() for line in markdown_content.splitlines()]
+    return ResumeComplexity(
+        tokens=estimate_tokens(markdown_content),
+        sections=sum(1 for line in lines if line.startswith("#")),
+        entries=len(_DATE_RANGE_PATTERN.findall(markdown_content)),
+        table_rows=sum(1 for line in lines if line.startswith("|"))
+    )
+
+
+class TierStats:
+    """单个模型级别的统计"""
+
+    def __init__(self, window: int = 200):
+        self.selected = 0
+        self.calls = 0
+        self.failures = 0
+        self.incomplete = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def summary(self) -> Dict[str, Any]:
+        """统计摘要"""
+        summary: Dict[str, Any] = {
+            "selected": self.selected,
+            "calls": self.calls,
+            "failures": self.failures,
+            "incomplete": self.incomplete,
+        }
+        for q in (50, 90):
+            latency = percentile(self.latencies, q)
+            summary[f"latency_p{q}"] = round(latency, 3) if latency is not None else None
+        return summary
+
+
+class ModelTiering:
+    """按简历复杂度选择模型级别"""
+
+    def __init__(
+        self,
+        strong_model: str,
+        light_model: str = "",
+        light_max_tokens: int = 3000,
+        light_max_complexity: int = 12
+    ):
+        """
+        Args:
+            strong_model: 主模型
+            light_model: 轻量模型，为空时不分级
+            light_max_tokens: 使用轻量模型的最大简历token数
+            light_max_complexity: 使用轻量模型的最大结构复杂度
+        """
+        self.strong_model = strong_model
+        self.light_model = light_model
+        self.light_max_tokens = light_max_tokens
+        self.light_max_complexity = light_max_complexity
+        self._stats: Dict[str, TierStats] = {TIER_LIGHT: TierStats(), TIER_STRONG: TierStats()}
+
+    @property
+    def enabled(self) -> bool:
+        """是否配置了不同于主模型的轻量模型"""
+        return bool(self.light_model) and self.light_model != self.strong_model
+
+    def choose(self, markdown_content: str) -> str:
+        """
+        为简历选择模型级别
+
+        Args:
+            markdown_content: Markdown格式的简历内容
+
+        Returns:
+            str: 模型级别
+        """
+        if not self.enabled:
+            return TIER_STRONG
+        complexity = estimate_complexity(markdown_content)
+        if complexity.tokens <= self.light_max_tokens and complexity.score <= self.light_max_complexity:
+            tier = TIER_LIGHT
+        else:
+            tier = TIER_STRONG
+        self._stats[tier].selected += 1
+        logger.info(f"简历复杂度: {complexity}, 复杂度得分: {complexity.score}, 使用模型级别: {tier}")
+        return tier
+
+    def model_for(self, tier: str) -> str:
+        """
+        获取模型级别对应的模型名称
+
+        Args:
+            tier: 模型级别
+
+        Returns:
+            str: 模型名称
+        """
+        if tier == TIER_LIGHT and self.enabled:
+            return self.light_model
+        return self.strong_model
+
+    def record_call(self, tier: str, latency: Optional[float] = None, failed: bool = False):
+        """
+        记录一次调用
+
+        Args:
+            tier: 模型级别
+            latency: 耗时（秒）
+            failed: 是否失败
+        """
+        stats = self._stats[tier]
+        stats.calls += 1
+        if failed:
+            stats.failures += 1
+        elif latency is not None:
+            stats.latencies.append(latency)
+
+    def record_incomplete(self, tier: str):
+        """
+        记录一次输出不完整（缺少字段或维度、无法解析），作为该级别的质量指标
+
+        Args:
+            tier: 模型级别
+        """
+        self._stats[tier].incomplete += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        各模型级别的统计
+
+        Returns:
+            Dict[str, Any]: 级别到模型名称和统计摘要的映射
+        """
+        return {
+            tier: {"model": self.model_for(tier), **stats.summary()}
+            for tier, stats in self._stats.items()
+        }
+
+
+# 全局分级实例
+_model_tiering: Optional[ModelTiering] = None
+
+
+def get_model_tiering() -> ModelTiering:
+    """
+    获取模型分级（单例模式）
+
+    Returns:
+        ModelTiering: 按配置创建的模型分级
+    """
+    global _model_tiering
+    if _model_tiering is None:
+        settings = get_settings()
+        _model_tiering = ModelTiering(
+            strong_model=settings.openai_model,
+            light_model=settings.llm_light_model,
+            light_max_tokens=settings.llm_tier_light_max_tokens,
+            light_max_complexity=settings.llm_tier_light_max_complexity
+        )
+    return _model_tiering
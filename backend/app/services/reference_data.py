@@ -0,0 +1,232 @@
+"""
+评分参考数据
+985/211院校名单与专业分类规则，每个进程只加载一次并预先建立索引
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+
+
+def normalize_school_name(name: str) -> str:
+    """
+    规范化学校名称，用于查找索引
+
+    Args:
+        name: 学校名称
+
+    Returns:
+        str: 去除空白、统一括号后的名称
+    """
+    name = re.sub(r"\s+", "", name or "")
+    return name.replace("（", "(").replace("）", ")")
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """不可变的评分参考数据"""
+    universities_985: Tuple[Mapping[str, Any], ...] = ()
+    universities_211: Tuple[Mapping[str, Any], ...] = ()
+    major_rules: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+
+    # 预先计算的名单与索引
+    names_985: Tuple[str, ...] = ()
+    names_211: Tuple[str, ...] = ()
+    name_set_985: FrozenSet[str] = frozenset()
+    name_set_211: FrozenSet[str] = frozenset()
+    school_index: Mapping[str, Mapping[str, Any]] = field(default_factory=lambda: MappingProxyType({}))
+    computer_major_keywords: Tuple[str, ...] = ()
+    related_major_keywords: Tuple[str, ...] = ()
+
+    # 预先渲染的提示词片段
+    scoring_prompt_prefix: str = ""
+    extraction_school_reference: str = ""
+
+    def lookup_school(self, name: Optional[str]) -> Optional[Mapping[str, Any]]:
+        """
+        按名称查找985/211院校记录
+
+        Args:
+            name: 学校名称
+
+        Returns:
+            Mapping[str, Any]: 院校记录，不在名单中返回None
+        """
+        if not name:
+            return None
+        return self.school_index.get(normalize_school_name(name))
+
+    def school_tier(self, name: Optional[str]) -> Optional[str]:
+        """
+        获取学校层次
+
+        Args:
+            name: 学校名称
+
+        Returns:
+            str: "985"、"211"，不在名单中返回None
+        """
+        normalized = normalize_school_name(name) if name else ""
+        if normalized in self.name_set_985:
+            return "985"
+        if normalized in self.name_set_211:
+            return "211"
+        return None
+
+
+def _load_json(filename: str, default):
+    """读取数据目录下的JSON文件，失败时返回默认值"""
+    path = os.path.join(DATA_DIR, filename)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"评分数据加载失败: {path}, 错误: {str(e)}")
+        return default
+
+
+def _major_keywords(major_rules: Dict[str, Any], category: str) -> Tuple[str, ...]:
+    """合并某类专业的核心关键词和扩展关键词"""
+    rules = major_rules.get("专业分类规则", {}).get(category, {})
+    return tuple(rules.get("核心关键词", []) + rules.get("扩展关键词", []))
+
+
+def _freeze_records(records: List[Dict[str, Any]]) -> Tuple[Mapping[str, Any], ...]:
+    return tuple(MappingProxyType(dict(record)) for record in records if isinstance(record, dict))
+
+
+def build_reference_data(
+    universities_985: List[Dict[str, Any]],
+    universities_211: List[Dict[str, Any]],
+    major_rules: Dict[str, Any]
+) -> ReferenceData:
+    """
+    由原始数据构建参考数据及其索引
+
+    Args:
+        universities_985: 985院校记录列表
+        universities_211: 211院校记录列表
+        major_rules: 专业分类规则
+
+    Returns:
+        ReferenceData: 参考数据
+    """
+    records_985 = _freeze_records(universities_985)
+    records_211 = _freeze_records(universities_211)
+
+    names_985 = tuple(record["school_name"] for record in records_985 if record.get("school_name"))
+    names_211 = tuple(record["school_name"] for record in records_211 if record.get("school_name"))
+
+    school_index: Dict[str, Mapping[str, Any]] = {}
+    # 985院校同时也是211院校，后写入985记录以保证其优先
+    for record in records_211 + records_985:
+        if record.get("school_name"):
+            school_index[normalize_school_name(record["school_name"])] = record
+
+    computer_majors = _major_keywords(major_rules, "计算机类专业")
+    related_majors = _major_keywords(major_rules, "相关理工科专业")
+
+    return ReferenceData(
+        universities_985=records_985,
+        universities_211=records_211,
+        major_rules=MappingProxyType(dict(major_rules)),
+        names_985=names_985,
+        names_211=names_211,
+        name_set_985=frozenset(normalize_school_name(name) for name in names_985),
+        name_set_211=frozenset(normalize_school_name(name) for name in names_211),
+        school_index=MappingProxyType(school_index),
+        computer_major_keywords=computer_majors,
+        related_major_keywords=related_majors,
+        scoring_prompt_prefix=_render_scoring_prompt_prefix(names_985, names_211, computer_majors, related_majors),
+        extraction_school_reference=(
+            f"{[dict(record) for record in records_985]} 和 {[dict(record) for record in records_211]}"
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def get_reference_data() -> ReferenceData:
+    """
+    获取评分参考数据（首次调用时加载，进程内只加载一次）
+
+    Returns:
+        ReferenceData: 参考数据
+    """
+    reference = build_reference_data(
+        universities_985=_load_json("985.json", []),
+        universities_211=_load_json("211.json", []),
+        major_rules=_load_json("major.json", {})
+    )
+    logger.info(
+        f"评分数据加载成功: 985院校 {len(reference.names_985)} 所, "
+        f"211院校 {len(reference.names_211)} 所"
+    )
+    return reference
+
+
+def _render_scoring_prompt_prefix(
+    names_985: Tuple[str, ...],
+    names_211: Tuple[str, ...],
+    computer_majors: Tuple[str, ...],
+    related_majors: Tuple[str, ...]
+) -> str:
+    """渲染评分提示词中与具体简历无关的规则和参考数据部分"""
+    return f"""
+请根据以下评分规则对简历进行量化评分：
+
+## 评分规则
+
+### 一、地域筛选（基础项 | 最高+5分）
++5分：四川省内高校
++3分：四川省外重点高校
++0分：其他
+
+### 二、学校选择（核心项 | 最高+10分）
++10分：985院校
++8分：211院校
++5分：普通本科院校
++2分：专科院校
+
+### 三、专业匹配（分级项 | 最高+8分）
++8分：计算机科学、软件工程、人工智能等计算机相关专业
++5分：通信、电气、电子信息等其他理工科专业
++2分：其他专业
+
+### 四、个人亮点（差异化项 | 最高+6分，取单项最高分，不累计）
++6分：ACM等权威编程竞赛获奖
++4分：持有Kubernetes等专业领域权威证书
++3分：拥有活跃的GitHub/Gitee个人项目
++2分：维护有高质量的技术博客（如CSDN）
+
+### 五、项目经历（实践项 | 最高+10分）
++10分：有知名互联网大厂（如字节跳动、腾讯）实习或工作经历
++7分：有其他公司的完整项目实习或工作经历
+
+### 六、简历质量（形式项 | 最高+3分，可累计）
++2分：成果量化（如："性能提升30%"）
++1分：使用主动性动词（如："主导"、"独立完成"）
+
+## 参考数据
+
+### 985院校名单：
+{', '.join(names_985)}
+
+### 211院校名单：
+{', '.join(names_211)}
+
+### 计算机相关专业关键词：
+{', '.join(computer_majors)}
+
+### 其他理工科专业关键词：
+{', '.join(related_majors)}
+"""
@@ -0,0 +1,158 @@
+"""
+长简历分段提取
+按章节把超长简历切分为不超过token上限的分段，分别提取后在本地按固定规则合并：
+标量字段取第一个非空值，工作经历和项目经历按关键字段去重，技能按出现顺序去重
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..utils.tokens import estimate_tokens
+
+# 学校城市需与学校名称来自同一分段
+_SCHOOL_FIELDS = ("school_name", "school_city")
+# 列表字段中用于判断重复条目的键
+_RECORD_KEYS = {
+    "work_experience": ("company", "position", "duration"),
+    "projects": ("name",),
+}
+
+
+def _line_tokens(line: str) -> int:
+    return estimate_tokens(line) + 1
+
+
+def split_sections(markdown_content: str) -> List[List[str]]:
+    """
+    按Markdown标题切分章节
+
+    Args:
+        markdown_content: Markdown格式的简历内容
+
+    Returns:
+        List[List[str]]: 每个章节的行，章节的第一行为标题（第一个标题之前的内容除外）
+    """
+    sections: List[List[str]] = [[]]
+    for line in markdown_content.splitlines():
+        if not line.strip():
+            continue
+        if line.lstrip().startswith("#") and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return [section for section in sections if section]
+
+
+def _split_long_section(section: List[str], max_tokens: int) -> List[List[str]]:
+    """超过上限的章节按行切分，每段重复章节标题以保留上下文"""
+    heading = section[0] if section[0].lstrip().startswith("#") else None
+    body = section[1:] if heading else section
+    budget = max_tokens - (_line_tokens(heading) if heading else 0)
+    pieces: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for line in body:
+        tokens = _line_tokens(line)
+        if current and used + tokens > budget:
+            pieces.append(current)
+            current, used = [], 0
+        current.append(line)
+        used += tokens
+    if current:
+        pieces.append(current)
+    return [([heading] if heading else []) + piece for piece in pieces]
+
+
+def chunk_markdown(markdown_content: str, max_tokens: int) -> List[str]:
+    """
+    把简历切分为不超过 max_tokens 的分段，尽量不拆开章节
+
+    Args:
+        markdown_content: Markdown格式的简历内容
+        max_tokens: 每个分段的最大token数
+
+    Returns:
+        List[str]: 分段内容，按原文顺序排列
+    """
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for section in split_sections(markdown_content):
+        tokens = sum(_line_tokens(line) for line in section)
+        pieces = [section] if tokens <= max_tokens else _split_long_section(section, max_tokens)
+        for piece in pieces:
+            piece_tokens = sum(_line_tokens(line) for line in piece)
+            if current and used + piece_tokens > max_tokens:
+                chunks.append(current)
+                current, used = [], 0
+            current.extend(piece)
+            used += piece_tokens
+    if current:
+        chunks.append(current)
+    return ["\n".join(chunk) for chunk in chunks]
+
+
+def _record_key(record: Dict[str, Any], keys: Sequence[str]) -> Optional[Tuple[str, ...]]:
+    values = tuple(re.sub(r"\s+", "", str(record.get(key) or "")).lower() for key in keys)
+    return values if any(values) else None
+
+
+def _merge_records(results: Sequence[Dict[str, Any]], field: str) -> List[Dict[str, Any]]:
+    """按关键字段去重，重复条目用后出现的非空值补全缺失的键"""
+    merged: List[Dict[str, Any]] = []
+    index: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+    for result in results:
+        for record in result.get(field) or []:
+            key = _record_key(record, _RECORD_KEYS[field])
+            if key is None:
+                continue
+            existing = index.get(key)
+            if existing is None:
+                index[key] = dict(record)
+                merged.append(index[key])
+                continue
+            for name, value in record.items():
+                if value and not existing.get(name):
+                    existing[name] = value
+    return merged
+
+
+def _merge_skills(results: Sequence[Dict[str, Any]]) -> List[str]:
+    skills: List[str] = []
+    seen = set()
+    for result in results:
+        for skill in result.get("skills") or []:
+            key = skill.strip().lower()
+            if key and key not in seen:
+                seen.add(key)
+                skills.append(skill)
+    return skills
+
+
+def merge_extractions(results: Sequence[Dict[str, Any]], fields: Sequence[str]) -> Dict[str, Any]:
+    """
+    合并各分段的提取结果，结果只取决于分段顺序
+
+    Args:
+        results: 各分段规范化后的提取结果，按分段顺序排列
+        fields: 需要合并的字段
+
+    Returns:
+        Dict[str, Any]: 合并后的提取结果
+    """
+    merged: Dict[str, Any] = {}
+    for field in fields:
+        if field in _RECORD_KEYS:
+            merged[field] = _merge_records(results, field)
+        elif field == "skills":
+            merged[field] = _merge_skills(results)
+        elif field not in _SCHOOL_FIELDS:
+            merged[field] = next((result[field] for result in results if result.get(field)), None)
+
+    # 学校城市优先取学校名称所在分段的值
+    school_result = next((result for result in results if result.get("school_name")), {})
+    for field in _SCHOOL_FIELDS:
+        if field in fields:
+            merged[field] = school_result.get(field) or next(
+                (result[field] for result in results if result.get(field)), None
+            )
+    return merged
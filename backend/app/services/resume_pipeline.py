@@ -0,0 +1,478 @@
+"""
+简历处理流水线
+PDF解析、AI信息提取与评分，由任务队列的worker调用
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config.settings import get_settings
+from ..database import SessionLocal
+from ..services.resume_service import ResumeService
+from ..services.ai_service import AIService, FieldsCallback
+from ..services.local_extractor import fast_extract, pre_extract
+from ..services.reference_data import get_reference_data
+from ..services.resume_versions import changed_pages, merge_versions, needs_rescore
+from ..services.resume_worker import PermanentTaskError
+from ..services.task_queue import ResumeTask
+from ..utils.file_processor import FileProcessor
+from ..utils.pdf_sandbox import PdfSandboxError
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+async def process_resume_task(task: ResumeTask):
+    """
+    处理队列中的简历任务
+    
+    Args:
+        task: 简历处理任务
+    """
+    await process_resume_async(
+        file_id=task.resume_id,
+        file_path=task.file_path,
+        user_id=task.user_id,
+        use_cache=task.use_cache
+    )
+
+
+async def mark_resume_task_failed(task: ResumeTask, error: str):
+    """
+    将多次重试仍失败或无法重试的任务对应的简历标记为失败
+    
+    Args:
+        task: 简历处理任务
+        error: 错误信息
+    """
+    db = SessionLocal()
+    try:
+        ResumeService(db=db).update_resume_status(task.resume_id, "failed", error)
+    finally:
+        db.close()
+
+
+async def _convert_pdf(file_processor: FileProcessor, file_path: str) -> List[str]:
+    """
+    将PDF按页转换为Markdown
+    
+    Args:
+        file_processor: 文件处理器
+        file_path: PDF文件路径
+        
+    Returns:
+        List[str]: 每页的Markdown文本
+        
+    Raises:
+        PermanentTaskError: 文件被沙箱拒绝解析，重试也不会成功，由Worker直接标记为失败
+    """
+    try:
+        return await file_processor.pdf_to_pages(file_path)
+    except PdfSandboxError as e:
+        raise PermanentTaskError(f"PDF文件无法解析: {str(e)}") from e
+
+
+def _make_early_writer(resume_service: ResumeService, resume_id: str) -> FieldsCallback:
+    """
+    创建流式解析字段完成时的回调，将关键字段提前写入数据库
+    
+    Args:
+        resume_service: 简历服务
+        resume_id: 简历ID
+        
+    Returns:
+        FieldsCallback: 字段回调
+    """
+    async def write_fields(fields: Dict[str, Any]):
+        columns = dict(fields)
+        if "total_score" in columns:
+            total_score = columns.pop("total_score")
+            if isinstance(total_score, int):
+                columns["score"] = total_score
+        resume_service.update_resume_fields(resume_id, columns)
+    
+    return write_fields
+
+
+async def _extract_info(
+    markdown_content: str,
+    user_id: str,
+    on_fields: Optional[FieldsCallback] = None,
+    resume_id: Optional[str] = None,
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    使用AI提取简历信息
+    
+    Args:
+        markdown_content: Markdown格式的简历内容
+        user_id: 上传用户ID
+        on_fields: 流式模式下关键字段解析完成时的回调
+        resume_id: 简历ID
+        use_cache: 是否读取大模型响应缓存
+        
+    Returns:
+        Dict[str, Any]: 提取的信息
+        
+    Raises:
+        LLMUnavailableError: 大模型调用失败，由任务队列重试
+    """
+    return await AIService(
+        user_id=user_id, use_cache=use_cache, on_fields=on_fields, resume_id=resume_id
+    ).extract_resume_info(markdown_content)
+
+
+async def _score(
+    markdown_content: str,
+    extracted_info: Dict[str, Any],
+    user_id: str,
+    resume_id: Optional[str] = None,
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    使用AI对简历评分
+    
+    Args:
+        markdown_content: Markdown格式的简历内容
+        extracted_info: 提取的信息
+        user_id: 上传用户ID
+        resume_id: 简历ID
+        use_cache: 是否读取大模型响应缓存
+        
+    Returns:
+        Dict[str, Any]: 评分结果
+        
+    Raises:
+        LLMUnavailableError: 大模型调用失败，由任务队列重试
+    """
+    scoring_result = await AIService(
+        user_id=user_id, use_cache=use_cache, resume_id=resume_id
+    ).score_resume(markdown_content, extracted_info)
+    logger.info(f"简历评分完成: {scoring_result}")
+    return scoring_result
+
+
+async def _extract_and_score_separately(
+    markdown_content: str,
+    user_id: str,
+    on_fields: Optional[FieldsCallback] = None,
+    resume_id: Optional[str] = None,
+    use_cache: bool = True
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    分两次调用大模型完成信息提取和评分
+    
+    开启并行评分时，评分使用本地预提取的学校、专业等字段与信息提取同时进行，
+    提取完成后再按提取结果校正评分；否则先提取信息再评分
+    
+    Args:
+        markdown_content: Markdown格式的简历内容
+        user_id: 上传用户ID
+        on_fields: 流式模式下关键字段解析完成时的回调
+        resume_id: 简历ID
+        use_cache: 是否读取大模型响应缓存
+        
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, Any]]: (提取的信息, 评分结果)
+    """
+    if not settings.llm_parallel_scoring:
+        extracted_info = await _extract_info(markdown_content, user_id, on_fields, resume_id, use_cache)
+        scoring_result = await _score(markdown_content, extracted_info, user_id, resume_id, use_cache)
+        return extracted_info, scoring_result
+    
+    assumed_info = pre_extract(markdown_content, get_reference_data())
+    logger.info(f"本地预提取完成: {assumed_info}")
+    extracted_info, scoring_result = await asyncio.gather(
+        _extract_info(markdown_content, user_id, on_fields, resume_id, use_cache),
+        _score(markdown_content, assumed_info, user_id, resume_id, use_cache)
+    )
+    try:
+        scoring_result = await AIService(user_id=user_id, use_cache=use_cache, resume_id=resume_id).reconcile_scoring(
+            markdown_content, assumed_info, extracted_info, scoring_result
+        )
+    except Exception as e:
+        logger.warning(f"评分校正失败，保留并行评分结果: {str(e)}")
+    return extracted_info, scoring_result
+
+
+def _save_result(
+    resume_service: ResumeService,
+    resume_id: str,
+    markdown_content: str,
+    extracted_info: Dict[str, Any],
+    scoring_result: Dict[str, Any],
+    page_hashes: List[str]
+):
+    """
+    保存处理结果并将简历标记为完成
+    
+    Args:
+        resume_service: 简历服务
+        resume_id: 简历ID
+        markdown_content: Markdown格式的简历内容
+        extracted_info: 提取的信息
+        scoring_result: 评分结果
+        page_hashes: 每页文本的摘要
+    """
+    resume_service.update_resume_content(
+        resume_id=resume_id,
+        content=markdown_content,
+        extracted_info=extracted_info,
+        score=scoring_result.get("total_score", 0),
+        score_detail=scoring_result.get("score_details", {}),
+        page_hashes=page_hashes
+    )
+    logger.info(f"简历处理完成: {resume_id}")
+
+
+async def _process_new_version(
+    resume_service: ResumeService,
+    file_processor: FileProcessor,
+    resume_id: str,
+    user_id: str,
+    pages: List[str],
+    page_hashes: List[str],
+    markdown_content: str,
+    use_cache: bool = True
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    简历是同一候选人上一版简历的新版本时，只重新提取变化的页
+    
+    Args:
+        resume_service: 简历服务
+        file_processor: 文件处理器
+        resume_id: 简历ID
+        user_id: 上传用户ID
+        pages: 每页的Markdown文本
+        page_hashes: 每页文本的摘要
+        markdown_content: 完整的Markdown内容
+        use_cache: 是否读取大模型响应缓存
+        
+    Returns:
+        Optional[Tuple[Dict[str, Any], Dict[str, Any]]]: (提取的信息, 评分结果)，
+            找不到上一版或变化的页过多时返回None，由调用方完整处理
+    """
+    reference = get_reference_data()
+    identity = fast_extract(markdown_content, reference)
+    previous = resume_service.find_previous_version(
+        user_id,
+        resume_id,
+        phone=identity.get("phone"),
+        email=identity.get("email"),
+        name=pre_extract(markdown_content, reference).get("name")
+    )
+    if previous is None or not previous.extracted_info:
+        return None
+    
+    changed = changed_pages(page_hashes, previous.page_hashes)
+    if len(changed) > settings.incremental_max_changed_ratio * len(pages):
+        logger.info(f"新版本变化的页过多，完整处理: {resume_id}, 上一版: {previous.id}, 变化页: {len(changed)}/{len(pages)}")
+        return None
+    logger.info(f"识别为新版本简历: {resume_id}, 上一版: {previous.id}, 变化页: {[index + 1 for index in changed]}")
+    
+    if changed:
+        changed_markdown = file_processor.pages_to_markdown(
+            [pages[index] for index in changed], resume_id, record_stats=False
+        )
+        changed_info = await _extract_info(changed_markdown, user_id, resume_id=resume_id, use_cache=use_cache)
+        extracted_info = merge_versions(previous.extracted_info, changed_info, markdown_content)
+    else:
+        extracted_info = dict(previous.extracted_info)
+    
+    if needs_rescore(previous.extracted_info, extracted_info):
+        scoring_result = await _score(markdown_content, extracted_info, user_id, resume_id, use_cache)
+    else:
+        logger.info(f"评分相关字段未变化，沿用上一版评分: {resume_id}")
+        scoring_result = {"total_score": previous.score or 0, "score_details": previous.score_detail or {}}
+    return extracted_info, scoring_result
+
+
+async def process_resume_async(file_id: str, file_path: str, user_id: str, use_cache: bool = True):
+    """
+    异步处理简历文件
+    
+    失败时抛出异常，由任务队列重试，超过最大重试次数后才将简历标记为失败；
+    PDF被沙箱拒绝解析时抛出 PermanentTaskError，不再重试直接标记为失败
+    
+    Args:
+        file_id: 文件ID
+        file_path: 文件路径
+        user_id: 用户ID
+        use_cache: 是否读取大模型响应缓存，强制重新处理时为False
+    """
+    logger.info(f"开始处理简历文件: {file_id}")
+    
+    # 获取数据库会话
+    db = SessionLocal()
+    resume_service = ResumeService(db=db)
+    
+    try:
+        # 1. 转换PDF为Markdown
+        file_processor = FileProcessor()
+        pages = await _convert_pdf(file_processor, file_path)
+        page_hashes = FileProcessor.hash_pages(pages)
+        markdown_content = file_processor.pages_to_markdown(pages, file_path)
+        logger.info(f"PDF转换为Markdown完成: {markdown_content}")
+        
+        # 2. 使用AI提取信息并评分，同一候选人的新版本只处理变化的页
+        on_fields = _make_early_writer(resume_service, file_id) if settings.llm_streaming else None
+        combined_result = None
+        if settings.incremental_reprocessing:
+            combined_result = await _process_new_version(
+                resume_service, file_processor, file_id, user_id, pages, page_hashes, markdown_content, use_cache
+            )
+        if combined_result is None and settings.llm_pipeline_mode == "combined":
+            combined_result = await AIService(
+                user_id=user_id, use_cache=use_cache, on_fields=on_fields, resume_id=file_id
+            ).extract_and_score(markdown_content)
+        
+        if combined_result:
+            extracted_info, scoring_result = combined_result
+        else:
+            extracted_info, scoring_result = await _extract_and_score_separately(
+                markdown_content, user_id, on_fields, file_id, use_cache
+            )
+        
+        # 3. 更新数据库记录
+        _save_result(resume_service, file_id, markdown_content, extracted_info, scoring_result, page_hashes)
+        
+    except Exception as e:
+        logger.error(f"简历处理失败: {file_id}, 错误: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+async def process_resume_batch(tasks: List[ResumeTask]) -> List[Optional[BaseException]]:
+    """
+    批量处理队列中的简历任务
+    
+    任务按上传用户分组，每组的评分合并为批量请求，评分规则只发送一次，
+    大模型请求按该用户调度并记录用量；失败的任务返回对应的异常，由任务队列重试
+    
+    Args:
+        tasks: 简历处理任务列表
+        
+    Returns:
+        List[Optional[BaseException]]: 按任务顺序的处理异常，成功为None
+    """
+    if settings.llm_pipeline_mode == "combined" or not settings.llm_batch_scoring:
+        return await asyncio.gather(*(process_resume_task(task) for task in tasks), return_exceptions=True)
+    
+    logger.info(f"开始批量处理简历: {[task.resume_id for task in tasks]}")
+    groups: Dict[str, List[int]] = {}
+    for index, task in enumerate(tasks):
+        groups.setdefault(task.user_id, []).append(index)
+    
+    errors: List[Optional[BaseException]] = [None] * len(tasks)
+    
+    async def process_group(user_id: str, indexes: List[int]):
+        group_errors = await _process_user_batch(user_id, [tasks[index] for index in indexes])
+        for index, error in zip(indexes, group_errors):
+            errors[index] = error
+    
+    await asyncio.gather(*(process_group(user_id, indexes) for user_id, indexes in groups.items()))
+    return errors
+
+
+async def _process_user_batch(user_id: str, tasks: List[ResumeTask]) -> List[Optional[BaseException]]:
+    """
+    批量处理同一用户的简历任务
+    
+    PDF解析和信息提取逐份并发进行，随后合并为批量评分请求。评分依赖完整的提取结果，
+    因此批量模式不使用并行评分（LLM_PARALLEL_SCORING）；同一候选人的新版本仍按增量处理单独完成。
+    批量评分结果中缺少的简历单独评分，仍失败的返回异常由任务队列重试，不保存默认评分
+    
+    Args:
+        user_id: 上传用户ID
+        tasks: 该用户的简历处理任务
+        
+    Returns:
+        List[Optional[BaseException]]: 按任务顺序的处理异常，成功为None
+    """
+    prepared = await asyncio.gather(*(_convert_and_extract(task) for task in tasks), return_exceptions=True)
+    errors: List[Optional[BaseException]] = [
+        item if isinstance(item, BaseException) else None for item in prepared
+    ]
+    ready = [
+        (task, item) for task, item in zip(tasks, prepared)
+        if item is not None and not isinstance(item, BaseException)
+    ]
+    if not ready:
+        return errors
+    
+    try:
+        use_cache = all(task.use_cache for task, _ in ready)
+        scores = await AIService(user_id=user_id, use_cache=use_cache).score_resumes_batch(
+            [(task.resume_id, markdown_content, extracted_info) for task, (markdown_content, extracted_info, _) in ready]
+        )
+    except Exception as e:
+        logger.error(f"AI批量评分失败: {str(e)}")
+        scored = {task.task_id for task, _ in ready}
+        return [e if task.task_id in scored else error for task, error in zip(tasks, errors)]
+    
+    missing = [(task, item) for task, item in ready if not scores.get(task.resume_id)]
+    if missing:
+        logger.warning(f"批量评分结果缺少简历，单独评分: {[task.resume_id for task, _ in missing]}")
+        rescored = await asyncio.gather(*(
+            _score(markdown_content, extracted_info, user_id, task.resume_id, task.use_cache)
+            for task, (markdown_content, extracted_info, _) in missing
+        ), return_exceptions=True)
+        for (task, _), result in zip(missing, rescored):
+            if isinstance(result, BaseException):
+                errors[tasks.index(task)] = result
+            else:
+                scores[task.resume_id] = result
+    
+    db = SessionLocal()
+    try:
+        resume_service = ResumeService(db=db)
+        for task, (markdown_content, extracted_info, page_hashes) in ready:
+            if scores.get(task.resume_id):
+                _save_result(
+                    resume_service, task.resume_id, markdown_content, extracted_info, scores[task.resume_id], page_hashes
+                )
+    finally:
+        db.close()
+    return errors
+
+
+async def _convert_and_extract(task: ResumeTask) -> Optional[Tuple[str, Dict[str, Any], List[str]]]:
+    """
+    转换PDF并提取信息，同一候选人的新版本直接按增量处理完成
+    
+    Args:
+        task: 简历处理任务
+        
+    Returns:
+        Optional[Tuple[str, Dict[str, Any], List[str]]]: (Markdown内容, 提取的信息, 每页文本的摘要)，
+            已按增量处理完成时返回None
+    """
+    db = SessionLocal()
+    resume_service = ResumeService(db=db)
+    try:
+        file_processor = FileProcessor()
+        pages = await _convert_pdf(file_processor, task.file_path)
+        page_hashes = FileProcessor.hash_pages(pages)
+        markdown_content = file_processor.pages_to_markdown(pages, task.file_path)
+        logger.info(f"PDF转换为Markdown完成: {task.resume_id}")
+        
+        if settings.incremental_reprocessing:
+            result = await _process_new_version(
+                resume_service, file_processor, task.resume_id, task.user_id, pages, page_hashes, markdown_content,
+                task.use_cache
+            )
+            if result is not None:
+                extracted_info, scoring_result = result
+                _save_result(resume_service, task.resume_id, markdown_content, extracted_info, scoring_result, page_hashes)
+                return None
+        
+        on_fields = _make_early_writer(resume_service, task.resume_id) if settings.llm_streaming else None
+        extracted_info = await _extract_info(markdown_content, task.user_id, on_fields, task.resume_id, task.use_cache)
+        return markdown_content, extracted_info, page_hashes
+    except Exception as e:
+        logger.error(f"简历处理失败: {task.resume_id}, 错误: {str(e)}")
+        raise
+    finally:
+        db.close()
@@ -7,15 +7,20 @@ import os
 import uuid
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from ..models.resume_models import ResumeData, AnalysisResult, ResumeFormat
 from ..models.db_models import ResumeDB, AnalysisResultDB, ResumeFormatEnum
 from ..utils.file_processor import FileProcessor
+from ..utils.file_storage import remove_unreferenced_file
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 处理完成前允许提前写入的列
+EARLY_UPDATE_COLUMNS = ("name", "school_name", "school_city", "education_level", "major", "score")
+
 
 class ResumeService:
     """简历处理服务"""
@@ -56,12 +61,12 @@ class ResumeService:
             file_format = self._get_file_format(filename)
             
             # 保存文件
-            file_path = os.path.join(self.upload_dir, f"{resume_id}.{file_format}")
+            file_path = os.path.join(self.upload_dir, f"{resume_id}.{file_format.value}")
             with open(file_path, "wb") as f:
                 f.write(file_content)
             
-            # 提取文本内容
-            text_content = await self.file_processor.extract_text(file_path, file_format)
+            # 直接从内存中的文件内容提取文本，不再从磁盘重新读取
+            text_content = await self.file_processor.extract_text(file_content, file_format)
             
             # 创建简历数据对象
             resume_data = ResumeData(
@@ -70,7 +75,8 @@ class ResumeService:
                 format=file_format,
                 content=text_content,
                 file_size=len(file_content),
-                user_id=user_id
+                user_id=user_id,
+                file_path=file_path
             )
             
             logger.info(f"简历上传成功: {filename}, ID: {resume_id}")
@@ -101,6 +107,8 @@ class ResumeService:
                 upload_time=resume_data.upload_time,
                 user_id=resume_data.user_id,
                 file_path=resume_data.file_path,
+                content_hash=resume_data.content_hash,
+                page_hashes=resume_data.page_hashes,
                 processing_status=resume_data.processing_status,
                 extracted_info=resume_data.extracted_info,
                 processing_error=resume_data.processing_error,
@@ -156,6 +164,8 @@ class ResumeService:
             upload_time=db_resume.upload_time,
             user_id=db_resume.user_id,
             file_path=db_resume.file_path,
+            content_hash=db_resume.content_hash,
+            page_hashes=db_resume.page_hashes,
             processing_status=db_resume.processing_status,
             extracted_info=db_resume.extracted_info,
             processing_error=db_resume.processing_error,
@@ -256,6 +266,8 @@ class ResumeService:
                     upload_time=db_resume.upload_time,
                     user_id=db_resume.user_id,
                     file_path=db_resume.file_path,
+                    content_hash=db_resume.content_hash,
+                    page_hashes=db_resume.page_hashes,
                     processing_status=db_resume.processing_status,
                     extracted_info=db_resume.extracted_info,
                     processing_error=db_resume.processing_error,
@@ -335,6 +347,8 @@ class ResumeService:
                     upload_time=db_resume.upload_time,
                     user_id=db_resume.user_id,
                     file_path=db_resume.file_path,
+                    content_hash=db_resume.content_hash,
+                    page_hashes=db_resume.page_hashes,
                     processing_status=db_resume.processing_status,
                     extracted_info=db_resume.extracted_info,
                     processing_error=db_resume.processing_error,
@@ -373,7 +387,7 @@ class ResumeService:
             end_index = start_index + page_size
             return all_resumes[start_index:end_index], total_count
     
-    def update_resume_content(self, resume_id: str, content: str, extracted_info: Dict[str, Any], score: int = None, score_detail: Dict[str, Any] = None) -> bool:
+    def update_resume_content(self, resume_id: str, content: str, extracted_info: Dict[str, Any], score: int = None, score_detail: Dict[str, Any] = None, page_hashes: List[str] = None) -> bool:
         """
         更新简历内容和提取的信息
         
@@ -383,6 +397,7 @@ class ResumeService:
             extracted_info: 提取的信息
             score: 简历总分
             score_detail: 各维度详细得分
+            page_hashes: 每页文本的SHA-256
             
         Returns:
             bool: 更新是否成功
@@ -402,6 +417,8 @@ class ResumeService:
                         db_resume.score = score
                     if score_detail is not None:
                         db_resume.score_detail = score_detail
+                    if page_hashes is not None:
+                        db_resume.page_hashes = page_hashes
                     
                     # 从AI提取的信息中提取字段并写入对应列
                     logger.info(f"开始处理AI提取信息: {resume_id}, extracted_info类型: {type(extracted_info)}")
@@ -441,6 +458,38 @@ class ResumeService:
             logger.error(f"简历内容更新失败: {str(e)}")
             return False
     
+    def update_resume_fields(self, resume_id: str, fields: Dict[str, Any]) -> bool:
+        """
+        在处理完成前提前写入部分字段，供列表页尽早展示
+        
+        Args:
+            resume_id: 简历ID
+            fields: 列名到值的映射，只接受 EARLY_UPDATE_COLUMNS 中的列
+            
+        Returns:
+            bool: 更新是否成功
+        """
+        columns = {name: value for name, value in fields.items() if name in EARLY_UPDATE_COLUMNS}
+        if not columns:
+            return False
+        try:
+            if self.db:
+                updated = self.db.query(ResumeDB).filter(
+                    ResumeDB.id == resume_id,
+                    ResumeDB.processing_status != "completed"
+                ).update(columns, synchronize_session=False)
+                self.db.commit()
+                if updated:
+                    logger.info(f"简历字段提前写入: {resume_id}, 字段: {list(columns)}")
+                return bool(updated)
+            else:
+                logger.warning("数据库连接不可用，无法更新简历字段")
+                return False
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"简历字段提前写入失败: {str(e)}")
+            return False
+    
     def update_resume_status(self, resume_id: str, status: str, error: str = None) -> bool:
         """
         更新简历处理状态
@@ -475,6 +524,114 @@ class ResumeService:
             logger.error(f"简历状态更新失败: {str(e)}")
             return False
     
+    def find_processed_resume_by_hash(self, content_hash: str) -> Optional[ResumeData]:
+        """
+        按文件内容摘要查找已处理完成的简历
+        
+        Args:
+            content_hash: 文件内容SHA-256
+            
+        Returns:
+            ResumeData: 最近一次处理完成的简历数据，如果不存在返回None
+        """
+        if not self.db:
+            return None
+        
+        db_resume = (
+            self.db.query(ResumeDB)
+            .filter(ResumeDB.content_hash == content_hash)
+            .filter(ResumeDB.processing_status == "completed")
+            .order_by(ResumeDB.processed_at.desc())
+            .first()
+        )
+        return self._db_to_resume_data(db_resume) if db_resume else None
+    
+    def find_previous_version(
+        self,
+        user_id: str,
+        resume_id: str,
+        phone: Optional[str] = None,
+        email: Optional[str] = None,
+        name: Optional[str] = None
+    ) -> Optional[ResumeData]:
+        """
+        查找同一用户上传的同一候选人的上一版简历
+        
+        手机号或邮箱相同即视为同一候选人，两份简历都有姓名时姓名也必须相同
+        
+        Args:
+            user_id: 用户ID
+            resume_id: 当前简历ID，不参与匹配
+            phone: 当前简历的手机号
+            email: 当前简历的邮箱
+            name: 当前简历的姓名
+            
+        Returns:
+            ResumeData: 最近一次处理完成且记录了每页摘要的简历，如果不存在返回None
+        """
+        if not self.db or not (phone or email):
+            return None
+        
+        identity = []
+        if phone:
+            identity.append(ResumeDB.phone == phone)
+        if email:
+            identity.append(ResumeDB.email == email)
+        candidates = (
+            self.db.query(ResumeDB)
+            .filter(ResumeDB.user_id == user_id)
+            .filter(ResumeDB.id != resume_id)
+            .filter(ResumeDB.processing_status == "completed")
+            .filter(or_(*identity))
+            .order_by(ResumeDB.processed_at.desc())
+            .limit(10)
+            .all()
+        )
+        for db_resume in candidates:
+            if not db_resume.page_hashes:
+                continue
+            if name and db_resume.name and name != db_resume.name:
+                continue
+            return self._db_to_resume_data(db_resume)
+        return None
+    
+    def create_resume_from_duplicate(
+        self,
+        source: ResumeData,
+        resume_id: str,
+        filename: str,
+        user_id: str
+    ) -> ResumeData:
+        """
+        基于内容相同的已处理简历创建新的用户记录，复用解析与评分结果
+        
+        Args:
+            source: 内容相同且已处理完成的简历
+            resume_id: 新简历ID
+            filename: 上传文件名
+            user_id: 用户ID
+            
+        Returns:
+            ResumeData: 创建的简历数据
+        """
+        resume_data = source.model_copy(update={
+            "id": resume_id,
+            "filename": filename,
+            "user_id": user_id,
+            "upload_time": datetime.now(),
+            "processing_status": "completed",
+            "processing_error": None,
+            "processed_at": datetime.now(),
+            # 面试评价属于原记录的使用者，不复制
+            "interview_score": None,
+            "interview_comment": None,
+            "interview_date": None,
+            "interviewer": None
+        })
+        self.create_resume(resume_data)
+        logger.info(f"复用已处理简历结果: {source.id} -> {resume_id}")
+        return resume_data
+    
     def delete_resume(self, resume_id: str, user_id: str) -> bool:
         """
         删除简历
@@ -491,14 +648,19 @@ class ResumeService:
                 # 使用数据库
                 db_resume = self.db.query(ResumeDB).filter(ResumeDB.id == resume_id).first()
                 if db_resume:
-                    # 删除文件
-                    if db_resume.file_path and os.path.exists(db_resume.file_path):
-                        os.remove(db_resume.file_path)
+                    file_path = db_resume.file_path
                     
                     # 删除数据库记录
                     self.db.delete(db_resume)
                     self.db.commit()
                     logger.info(f"简历删除成功: {resume_id}")
+                    
+                    # 删除文件（按内容寻址的文件可能被其他记录共享或正被相同内容的上传复用，仅在无引用时删除）
+                    if file_path:
+                        try:
+                            remove_unreferenced_file(file_path, lambda: self._is_file_referenced(file_path))
+                        except Exception as e:
+                            logger.warning(f"删除简历文件失败: {file_path}, 错误: {str(e)}")
                     return True
                 else:
                     logger.error(f"简历不存在: {resume_id}")
@@ -512,6 +674,20 @@ class ResumeService:
             logger.error(f"简历删除失败: {str(e)}")
             return False
     
+    def _is_file_referenced(self, file_path: str) -> bool:
+        """
+        检查是否还有简历记录引用该文件
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            bool: 是否被引用
+        """
+        # 结束当前事务，读取其他进程刚提交的记录
+        self.db.commit()
+        return self.db.query(ResumeDB.id).filter(ResumeDB.file_path == file_path).first() is not None
+    
     def _get_file_format(self, filename: str) -> ResumeFormat:
         """根据文件名确定文件格式"""
         ext = filename.lower().split('.')[-1]
@@ -0,0 +1,99 @@
+"""
+简历新版本增量处理
+同一候选人上传新版本简历时，按每页文本摘要找出变化的页，只对变化的页重新提取，
+结果合并到上一版的提取信息中；影响评分的字段未变化时沿用上一版的评分
+"""
+
+import re
+from typing import Any, Dict, List, Sequence
+
+from ..models.llm_models import EXTRACTION_FIELDS
+from .local_extractor import SCORING_FIELDS, scoring_fields_differ
+from .resume_chunking import merge_extractions
+
+# 变化时需要重新评分的字段：客观维度使用学校、城市、专业和学历，主观维度参考经历和技能
+RESCORE_FIELDS = SCORING_FIELDS + ("school_city", "work_experience", "projects", "skills")
+# 判断上一版的条目是否仍在新版本中出现时使用的字段
+_PRESENCE_KEYS = {"work_experience": "company", "projects": "name"}
+
+
+def changed_pages(page_hashes: Sequence[str], previous_hashes: Sequence[str]) -> List[int]:
+    """
+    找出上一版中没有的页，页的顺序变化不视为变化
+
+    Args:
+        page_hashes: 新版本每页文本的摘要
+        previous_hashes: 上一版每页文本的摘要
+
+    Returns:
+        List[int]: 变化的页序号（从0开始）
+    """
+    previous = set(previous_hashes)
+    return [index for index, page_hash in enumerate(page_hashes) if page_hash not in previous]
+
+
+def _normalize(text: Any) -> str:
+    return re.sub(r"[^\w]", "", str(text or "")).lower()
+
+
+def _still_present(previous_info: Dict[str, Any], markdown_content: str) -> Dict[str, Any]:
+    """去掉上一版中在新版本全文里已找不到的经历、项目和技能"""
+    content = _normalize(markdown_content)
+    kept = dict(previous_info)
+    for field, key in _PRESENCE_KEYS.items():
+        kept[field] = [
+            record for record in previous_info.get(field) or []
+            if not _normalize(record.get(key)) or _normalize(record.get(key)) in content
+        ]
+    kept["skills"] = [skill for skill in previous_info.get("skills") or [] if _normalize(skill) in content]
+    return kept
+
+
+def merge_versions(
+    previous_info: Dict[str, Any],
+    changed_info: Dict[str, Any],
+    markdown_content: str
+) -> Dict[str, Any]:
+    """
+    把变化页的提取结果合并到上一版的提取信息中
+
+    标量字段优先使用变化页中的非空值；经历、项目和技能先去掉新版本中已删除的条目，
+    再与变化页的结果合并去重
+
+    Args:
+        previous_info: 上一版的提取信息
+        changed_info: 变化页的提取信息
+        markdown_content: 新版本的完整Markdown内容
+
+    Returns:
+        Dict[str, Any]: 合并后的提取信息
+    """
+    merged = dict(previous_info)
+    merged.update(merge_extractions(
+        [changed_info, _still_present(previous_info, markdown_content)],
+        EXTRACTION_FIELDS
+    ))
+    local_fields = set(previous_info.get("local_fields") or []) | set(changed_info.get("local_fields") or [])
+    if local_fields:
+        merged["local_fields"] = sorted(local_fields)
+    return merged
+
+
+def needs_rescore(previous_info: Dict[str, Any], merged_info: Dict[str, Any]) -> bool:
+    """
+    判断影响评分的字段是否变化
+
+    Args:
+        previous_info: 上一版的提取信息
+        merged_info: 合并后的提取信息
+
+    Returns:
+        bool: 需要重新评分时返回True
+    """
+    if scoring_fields_differ(previous_info, merged_info):
+        return True
+    return any(
+        (previous_info.get(field) or None) != (merged_info.get(field) or None)
+        for field in RESCORE_FIELDS
+        if field not in SCORING_FIELDS
+    )
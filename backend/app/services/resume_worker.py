@@ -0,0 +1,197 @@
+"""
+简历处理Worker
+从任务队列消费简历处理任务，可独立部署多个实例横向扩展
+"""
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+from .task_queue import TaskQueue, ResumeTask
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+TaskHandler = Callable[[ResumeTask], Awaitable[None]]
+FailureHandler = Callable[[ResumeTask, str], Awaitable[None]]
+# 批量处理函数，按任务顺序返回每个任务的异常，成功为None
+BatchHandler = Callable[[List[ResumeTask]], Awaitable[List[Optional[BaseException]]]]
+
+
+class PermanentTaskError(Exception):
+    """重试也无法成功的任务错误，Worker不再重试，直接按失败处理并确认任务"""
+
+
+class ResumeWorker:
+    """简历处理Worker"""
+
+    def __init__(
+        self,
+        queue: TaskQueue,
+        handler: TaskHandler,
+        on_failure: Optional[FailureHandler] = None,
+        concurrency: int = 4,
+        reap_interval: float = 30.0,
+        batch_handler: Optional[BatchHandler] = None,
+        batch_size: int = 1,
+        batch_linger: float = 0.5
+    ):
+        """
+        Args:
+            queue: 任务队列
+            handler: 任务处理函数，正常返回即视为处理完成并确认，抛出 PermanentTaskError 时不再重试
+            on_failure: 任务超过最大重试次数（包括租约多次过期）或无法重试时的回调
+            concurrency: 同时处理的任务数（批量模式下为同时处理的批数）
+            reap_interval: 检查过期租约的间隔（秒）
+            batch_handler: 批量处理函数，设置后每次取出最多 batch_size 个任务一起处理
+            batch_size: 每批最多任务数
+            batch_linger: 取到第一个任务后继续等待凑批的时间（秒）
+        """
+        self.queue = queue
+        self.handler = handler
+        self.on_failure = on_failure
+        self.concurrency = concurrency
+        self.reap_interval = reap_interval
+        self.batch_handler = batch_handler
+        self.batch_size = batch_size
+        self.batch_linger = batch_linger
+        self._stopping = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def run(self):
+        """运行Worker直到调用 stop"""
+        logger.info(f"简历处理Worker启动，并发数: {self.concurrency}")
+        self._stopping.clear()
+        self._tasks = [
+            asyncio.create_task(self._consume(index)) for index in range(self.concurrency)
+        ]
+        self._tasks.append(asyncio.create_task(self._reap()))
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            logger.info("简历处理Worker已停止")
+
+    def start(self) -> asyncio.Task:
+        """在当前事件循环中后台运行Worker"""
+        return asyncio.create_task(self.run())
+
+    async def stop(self):
+        """停止领取新任务并等待进行中的任务完成"""
+        self._stopping.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _consume(self, index: int):
+        """单个消费循环"""
+        batching = self.batch_handler is not None and self.batch_size > 1
+        while not self._stopping.is_set():
+            try:
+                if batching:
+                    tasks = await self.queue.dequeue_batch(
+                        self.batch_size, timeout=1.0, linger=self.batch_linger
+                    )
+                else:
+                    task = await self.queue.dequeue(timeout=1.0)
+                    tasks = [task] if task else []
+            except Exception as e:
+                logger.error(f"Worker-{index} 获取任务失败: {str(e)}")
+                await asyncio.sleep(1.0)
+                continue
+            if not tasks:
+                continue
+
+            if len(tasks) == 1:
+                await self._handle(index, tasks[0])
+            else:
+                await self._handle_batch(index, tasks)
+
+    async def _handle(self, index: int, task: ResumeTask):
+        """处理单个任务，成功则确认，失败则重试"""
+        logger.info(f"Worker-{index} 开始处理任务: {task.task_id}, 简历: {task.resume_id}, 第 {task.attempts + 1} 次")
+        heartbeat = asyncio.create_task(self._heartbeat(task))
+        try:
+            await self.handler(task)
+        except Exception as e:
+            await self._fail(index, task, e)
+        else:
+            await self._ack(index, task)
+        finally:
+            heartbeat.cancel()
+
+    async def _handle_batch(self, index: int, tasks: List[ResumeTask]):
+        """批量处理任务，逐个确认或重试"""
+        logger.info(f"Worker-{index} 开始批量处理任务: {len(tasks)} 个, 简历: {[task.resume_id for task in tasks]}")
+        heartbeats = [asyncio.create_task(self._heartbeat(task)) for task in tasks]
+        try:
+            try:
+                errors = await self.batch_handler(tasks)
+            except Exception as e:
+                errors = [e] * len(tasks)
+
+            for task, error in zip(tasks, errors):
+                if error is None:
+                    await self._ack(index, task)
+                else:
+                    await self._fail(index, task, error)
+        finally:
+            for heartbeat in heartbeats:
+                heartbeat.cancel()
+
+    async def _ack(self, index: int, task: ResumeTask):
+        """确认任务完成，确认失败时任务在租约过期后会被重新处理"""
+        try:
+            await self.queue.ack(task)
+        except Exception as e:
+            logger.error(f"Worker-{index} 确认任务失败: {task.task_id}, 错误: {str(e)}")
+            return
+        logger.info(f"Worker-{index} 任务处理完成: {task.task_id}")
+
+    async def _fail(self, index: int, task: ResumeTask, error: BaseException):
+        """任务处理失败，重新入队或在超过最大重试次数后放弃，无法重试的错误直接放弃"""
+        logger.error(f"Worker-{index} 任务处理失败: {task.task_id}, 错误: {str(error)}")
+        if isinstance(error, PermanentTaskError):
+            logger.error(f"任务无法重试，放弃处理: {task.task_id}")
+            await self._report_failure(task, str(error))
+            await self._ack(index, task)
+            return
+        try:
+            requeued = await self.queue.retry(task)
+        except Exception as e:
+            logger.error(f"任务重新入队失败，等待租约过期后重新处理: {task.task_id}, 错误: {str(e)}")
+            return
+        if not requeued:
+            logger.error(f"任务超过最大重试次数，放弃处理: {task.task_id}")
+            await self._report_failure(task, str(error))
+
+    async def _report_failure(self, task: ResumeTask, error: str):
+        """调用失败回调"""
+        if not self.on_failure:
+            return
+        try:
+            await self.on_failure(task, error)
+        except Exception as e:
+            logger.error(f"任务失败回调执行失败: {task.task_id}, 错误: {str(e)}")
+
+    async def _heartbeat(self, task: ResumeTask):
+        """处理期间定期续约，避免长任务被其他Worker重复领取"""
+        interval = max(self.queue.visibility_timeout / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.queue.touch(task)
+            except Exception as e:
+                logger.warning(f"任务续约失败: {task.task_id}, 错误: {str(e)}")
+
+    async def _reap(self):
+        """定期将租约过期的任务重新入队，过期次数超过最大尝试次数的任务按失败处理"""
+        while not self._stopping.is_set():
+            try:
+                abandoned = await self.queue.requeue_expired()
+            except Exception as e:
+                logger.warning(f"检查过期任务失败: {str(e)}")
+                abandoned = []
+            for task in abandoned:
+                await self._report_failure(task, "任务多次处理超时或Worker进程异常退出")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.reap_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,175 @@
+"""
+规则评分
+根据参考数据在本地确定性地计算地域、学校、专业三个客观维度的得分
+"""
+
+from typing import Any, Dict, Optional
+
+from .reference_data import ReferenceData
+
+# 各维度最高分
+DIMENSION_MAX_SCORES = {
+    "region_score": 5,
+    "school_score": 10,
+    "major_score": 8,
+    "highlight_score": 6,
+    "experience_score": 10,
+    "quality_score": 3,
+}
+
+# 由本地规则计算的客观维度
+OBJECTIVE_DIMENSIONS = ("region_score", "school_score", "major_score")
+
+# 由大模型评估的主观维度
+SUBJECTIVE_DIMENSIONS = ("highlight_score", "experience_score", "quality_score")
+
+# 四川省地级行政区
+SICHUAN_CITIES = (
+    "成都", "自贡", "攀枝花", "泸州", "德阳", "绵阳", "广元", "遂宁", "内江", "乐山",
+    "南充", "眉山", "宜宾", "广安", "达州", "雅安", "巴中", "资阳", "阿坝", "甘孜", "凉山",
+)
+
+JUNIOR_COLLEGE_KEYWORDS = ("专科", "大专", "高职", "职业技术学院", "职业学院", "高等专科")
+
+
+def _dimension(score: int, reason: str) -> Dict[str, Any]:
+    return {"score": score, "reason": reason}
+
+
+def _is_sichuan(text: Optional[str]) -> bool:
+    """判断地名或校名是否位于四川"""
+    if not text:
+        return False
+    return "四川" in text or any(city in text for city in SICHUAN_CITIES)
+
+
+def score_region(extracted_info: Dict[str, Any], reference: ReferenceData) -> Dict[str, Any]:
+    """
+    地域筛选：四川省内高校+5，四川省外重点高校+3，其他+0
+
+    Args:
+        extracted_info: 提取的简历信息
+        reference: 评分参考数据
+
+    Returns:
+        Dict[str, Any]: 维度得分及原因
+    """
+    school_name = extracted_info.get("school_name")
+    if not school_name:
+        return _dimension(0, "未识别到学校信息")
+
+    record = reference.lookup_school(school_name) or {}
+    locations = [
+        record.get("province"), record.get("city"), record.get("location"),
+        extracted_info.get("school_city"), school_name,
+    ]
+    if any(_is_sichuan(location) for location in locations):
+        return _dimension(5, f"{school_name}为四川省内高校")
+
+    tier = reference.school_tier(school_name)
+    if tier:
+        return _dimension(3, f"{school_name}为四川省外{tier}重点高校")
+    return _dimension(0, f"{school_name}为四川省外非重点高校")
+
+
+def score_school(extracted_info: Dict[str, Any], reference: ReferenceData) -> Dict[str, Any]:
+    """
+    学校选择：985+10，211+8，普通本科+5，专科+2
+
+    Args:
+        extracted_info: 提取的简历信息
+        reference: 评分参考数据
+
+    Returns:
+        Dict[str, Any]: 维度得分及原因
+    """
+    school_name = extracted_info.get("school_name")
+    if not school_name:
+        return _dimension(0, "未识别到学校信息")
+
+    tier = reference.school_tier(school_name)
+    if tier == "985":
+        return _dimension(10, f"{school_name}为985院校")
+    if tier == "211":
+        return _dimension(8, f"{school_name}为211院校")
+
+    education_level = extracted_info.get("education_level") or ""
+    if any(keyword in education_level or keyword in school_name for keyword in JUNIOR_COLLEGE_KEYWORDS):
+        return _dimension(2, f"{school_name}为专科院校")
+    return _dimension(5, f"{school_name}为普通本科院校")
+
+
+def score_major(extracted_info: Dict[str, Any], reference: ReferenceData) -> Dict[str, Any]:
+    """
+    专业匹配：计算机相关+8，其他理工科+5，其他专业+2
+
+    Args:
+        extracted_info: 提取的简历信息
+        reference: 评分参考数据
+
+    Returns:
+        Dict[str, Any]: 维度得分及原因
+    """
+    major = extracted_info.get("major")
+    if not major:
+        return _dimension(0, "未识别到专业信息")
+
+    for keyword in reference.computer_major_keywords:
+        if keyword and keyword in major:
+            return _dimension(8, f"{major}属于计算机相关专业（匹配: {keyword}）")
+    for keyword in reference.related_major_keywords:
+        if keyword and keyword in major:
+            return _dimension(5, f"{major}属于其他理工科专业（匹配: {keyword}）")
+    return _dimension(2, f"{major}属于其他专业")
+
+
+def score_objective_dimensions(extracted_info: Dict[str, Any], reference: ReferenceData) -> Dict[str, Dict[str, Any]]:
+    """
+    计算全部客观维度得分
+
+    Args:
+        extracted_info: 提取的简历信息
+        reference: 评分参考数据
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 维度名到得分及原因的映射
+    """
+    extracted_info = extracted_info or {}
+    return {
+        "region_score": score_region(extracted_info, reference),
+        "school_score": score_school(extracted_info, reference),
+        "major_score": score_major(extracted_info, reference),
+    }
+
+
+def merge_score_details(
+    objective: Dict[str, Dict[str, Any]],
+    subjective: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    合并客观维度与大模型评估的主观维度，按各维度最高分截断并重新计算总分
+
+    Args:
+        objective: 本地规则计算的客观维度
+        subjective: 大模型返回的主观维度
+
+    Returns:
+        Dict[str, Any]: 包含 total_score 和 score_details 的评分结果
+    """
+    score_details: Dict[str, Dict[str, Any]] = {}
+    for name in OBJECTIVE_DIMENSIONS:
+        score_details[name] = objective.get(name) or _dimension(0, "评分失败")
+    for name in SUBJECTIVE_DIMENSIONS:
+        detail = subjective.get(name) if isinstance(subjective.get(name), dict) else None
+        score_details[name] = detail or _dimension(0, "评分失败")
+
+    total_score = 0
+    for name, detail in score_details.items():
+        try:
+            score = int(detail.get("score") or 0)
+        except (TypeError, ValueError):
+            score = 0
+        detail["score"] = max(0, min(score, DIMENSION_MAX_SCORES[name]))
+        total_score += detail["score"]
+
+    return {"total_score": total_score, "score_details": score_details}
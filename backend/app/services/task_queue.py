@@ -0,0 +1,435 @@
+"""
+任务队列服务
+基于Redis的可靠简历处理队列，以及用于开发和测试的内存实现
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from ..config.settings import get_settings
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ResumeTask(BaseModel):
+    """简历处理任务"""
+    task_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="任务ID")
+    resume_id: str = Field(..., description="简历ID")
+    file_path: str = Field(..., description="文件存储路径")
+    user_id: str = Field(..., description="上传用户ID")
+    use_cache: bool = Field(default=True, description="是否读取大模型响应缓存，为False时重新调用大模型并刷新缓存")
+    attempts: int = Field(default=0, description="已尝试次数")
+    enqueued_at: datetime = Field(default_factory=datetime.now, description="入队时间")
+
+
+class TaskQueue(ABC):
+    """
+    任务队列接口
+
+    任务被取出后进入处理中状态并持有租约，处理完成后必须调用 ack 确认；
+    租约过期仍未确认的任务会被 requeue_expired 重新放回队列，保证进程崩溃时任务不丢失。
+    租约过期与处理失败一样计入尝试次数，反复导致进程崩溃的任务不会无限循环。
+    处理失败的任务按指数退避延迟后才重新可取，避免大模型服务短暂不可用时很快耗尽重试次数。
+    """
+
+    def __init__(
+        self,
+        visibility_timeout: int = 600,
+        max_attempts: int = 3,
+        retry_delay: float = 0.0,
+        max_retry_delay: float = 600.0
+    ):
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+    def _retry_delay(self, attempts: int) -> float:
+        """第 attempts 次失败后重新入队前的等待时间（秒），每次翻倍"""
+        if self.retry_delay <= 0:
+            return 0.0
+        return min(self.retry_delay * 2 ** max(attempts - 1, 0), self.max_retry_delay)
+
+    @abstractmethod
+    async def enqueue(self, task: ResumeTask) -> None:
+        """将任务放入队列"""
+
+    @abstractmethod
+    async def dequeue(self, timeout: float = 1.0) -> Optional[ResumeTask]:
+        """取出一个任务，超时未取到返回None；timeout 不大于0时不等待"""
+
+    async def dequeue_batch(self, max_count: int, timeout: float = 1.0, linger: float = 0.0) -> List[ResumeTask]:
+        """
+        取出一批任务
+
+        Args:
+            max_count: 最多取出的任务数
+            timeout: 等待第一个任务的超时时间（秒）
+            linger: 取到第一个任务后继续等待凑批的时间（秒）
+
+        Returns:
+            List[ResumeTask]: 取出的任务，超时未取到任何任务时为空
+        """
+        first = await self.dequeue(timeout)
+        if first is None:
+            return []
+
+        tasks = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + linger
+        while len(tasks) < max_count:
+            task = await self.dequeue(0)
+            if task is not None:
+                tasks.append(task)
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, 0.05))
+        return tasks
+
+    @abstractmethod
+    async def ack(self, task: ResumeTask) -> None:
+        """确认任务处理完成"""
+
+    @abstractmethod
+    async def touch(self, task: ResumeTask) -> None:
+        """延长任务租约"""
+
+    @abstractmethod
+    async def retry(self, task: ResumeTask) -> bool:
+        """
+        将处理失败的任务按退避延迟重新放回队列
+
+        Returns:
+            bool: 是否已重新入队，超过最大尝试次数时返回False并丢弃任务
+        """
+
+    @abstractmethod
+    async def requeue_expired(self) -> List[ResumeTask]:
+        """
+        将租约过期的任务重新放回队列
+
+        Returns:
+            List[ResumeTask]: 超过最大尝试次数而放弃的任务
+        """
+
+    @abstractmethod
+    async def qsize(self) -> int:
+        """等待处理的任务数量，不包括退避等待中的任务"""
+
+    async def close(self) -> None:
+        """释放队列占用的资源"""
+
+
+class InMemoryTaskQueue(TaskQueue):
+    """进程内任务队列，用于单进程开发环境和测试"""
+
+    def __init__(
+        self,
+        visibility_timeout: int = 600,
+        max_attempts: int = 3,
+        retry_delay: float = 0.0,
+        max_retry_delay: float = 600.0
+    ):
+        super().__init__(visibility_timeout, max_attempts, retry_delay, max_retry_delay)
+        self._pending: Deque[ResumeTask] = deque()
+        self._processing: Dict[str, Tuple[ResumeTask, float]] = {}
+        # 退避等待中的任务：(可取出时间, 序号, 任务)
+        self._delayed: List[Tuple[float, int, ResumeTask]] = []
+        self._sequence = itertools.count()
+        self._condition = asyncio.Condition()
+
+    async def enqueue(self, task: ResumeTask) -> None:
+        async with self._condition:
+            self._pending.append(task)
+            self._condition.notify()
+
+    async def dequeue(self, timeout: float = 1.0) -> Optional[ResumeTask]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(timeout, 0)
+        async with self._condition:
+            while True:
+                self._promote_delayed()
+                if self._pending:
+                    break
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                if self._delayed:
+                    remaining = min(remaining, max(self._delayed[0][0] - time.time(), 0))
+                try:
+                    await asyncio.wait_for(self._condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            task = self._pending.popleft()
+            self._processing[task.task_id] = (task, time.time() + self.visibility_timeout)
+            return task
+
+    async def ack(self, task: ResumeTask) -> None:
+        self._processing.pop(task.task_id, None)
+
+    async def touch(self, task: ResumeTask) -> None:
+        if task.task_id in self._processing:
+            self._processing[task.task_id] = (task, time.time() + self.visibility_timeout)
+
+    async def retry(self, task: ResumeTask) -> bool:
+        self._processing.pop(task.task_id, None)
+        task.attempts += 1
+        if task.attempts >= self.max_attempts:
+            return False
+        delay = self._retry_delay(task.attempts)
+        if delay <= 0:
+            await self.enqueue(task)
+            return True
+        async with self._condition:
+            heapq.heappush(self._delayed, (time.time() + delay, next(self._sequence), task))
+            # 唤醒等待中的消费者，按新的可取出时间重新计算等待时长
+            self._condition.notify()
+        return True
+
+    def _promote_delayed(self):
+        """将退避等待结束的任务移入待处理队列"""
+        now = time.time()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, task = heapq.heappop(self._delayed)
+            self._pending.append(task)
+
+    async def requeue_expired(self) -> List[ResumeTask]:
+        now = time.time()
+        expired = [task for task, deadline in self._processing.values() if deadline <= now]
+        abandoned = []
+        for task in expired:
+            self._processing.pop(task.task_id, None)
+            task.attempts += 1
+            if task.attempts >= self.max_attempts:
+                abandoned.append(task)
+            else:
+                await self.enqueue(task)
+        return abandoned
+
+    async def qsize(self) -> int:
+        return len(self._pending)
+
+
+class RedisTaskQueue(TaskQueue):
+    """
+    基于Redis列表的可靠队列
+
+    - pending 列表保存待处理任务ID，BLMOVE 原子地移入 processing 列表
+    - leases 哈希记录处理中任务的租约截止时间
+    - jobs 哈希保存任务内容
+    - delayed 有序集合保存退避等待中的任务ID，分数为可取出时间，到期后由 dequeue 移入 pending
+    - dead 列表保存超过最大尝试次数的任务内容，便于排查
+    """
+
+    # dead 列表最多保留的任务数
+    DEAD_LETTER_LIMIT = 1000
+
+    def __init__(
+        self,
+        redis_url: str,
+        queue_name: str = "krinol:resume_tasks",
+        visibility_timeout: int = 600,
+        max_attempts: int = 3,
+        retry_delay: float = 0.0,
+        max_retry_delay: float = 600.0
+    ):
+        super().__init__(visibility_timeout, max_attempts, retry_delay, max_retry_delay)
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(redis_url, decode_responses=True)
+        self._pending_key = f"{queue_name}:pending"
+        self._processing_key = f"{queue_name}:processing"
+        self._leases_key = f"{queue_name}:leases"
+        self._jobs_key = f"{queue_name}:jobs"
+        self._delayed_key = f"{queue_name}:delayed"
+        self._dead_key = f"{queue_name}:dead"
+
+    async def enqueue(self, task: ResumeTask) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._jobs_key, task.task_id, task.model_dump_json())
+            pipe.lpush(self._pending_key, task.task_id)
+            await pipe.execute()
+
+    async def dequeue(self, timeout: float = 1.0) -> Optional[ResumeTask]:
+        await self._promote_delayed()
+        if timeout <= 0:
+            task_id = await self._redis.lmove(self._pending_key, self._processing_key, "RIGHT", "LEFT")
+        else:
+            task_id = await self._redis.blmove(
+                self._pending_key, self._processing_key, max(int(timeout), 1), "RIGHT", "LEFT"
+            )
+        if not task_id:
+            return None
+
+        await self._redis.hset(self._leases_key, task_id, time.time() + self.visibility_timeout)
+        payload = await self._redis.hget(self._jobs_key, task_id)
+        if payload is None:
+            # 任务内容已丢失，直接清理
+            logger.warning(f"任务内容不存在，丢弃任务: {task_id}")
+            await self._remove(task_id)
+            return None
+        return ResumeTask.model_validate_json(payload)
+
+    async def ack(self, task: ResumeTask) -> None:
+        await self._remove(task.task_id)
+
+    async def touch(self, task: ResumeTask) -> None:
+        await self._redis.hset(self._leases_key, task.task_id, time.time() + self.visibility_timeout)
+
+    async def retry(self, task: ResumeTask) -> bool:
+        task.attempts += 1
+        if task.attempts >= self.max_attempts:
+            await self._dead_letter(task)
+            return False
+
+        delay = self._retry_delay(task.attempts)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._jobs_key, task.task_id, task.model_dump_json())
+            pipe.lrem(self._processing_key, 1, task.task_id)
+            pipe.hdel(self._leases_key, task.task_id)
+            if delay > 0:
+                pipe.zadd(self._delayed_key, {task.task_id: time.time() + delay})
+            else:
+                pipe.lpush(self._pending_key, task.task_id)
+            await pipe.execute()
+        return True
+
+    async def _promote_delayed(self):
+        """将退避等待结束的任务移入 pending，多个Worker同时移动时只有一个成功"""
+        from redis.exceptions import WatchError
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            await pipe.watch(self._delayed_key)
+            due = await pipe.zrangebyscore(self._delayed_key, "-inf", time.time())
+            if not due:
+                await pipe.unwatch()
+                return
+            pipe.multi()
+            pipe.zrem(self._delayed_key, *due)
+            # 放到出队端，优先被重新处理
+            pipe.rpush(self._pending_key, *due)
+            try:
+                await pipe.execute()
+            except WatchError:
+                return
+
+    async def requeue_expired(self) -> List[ResumeTask]:
+        now = time.time()
+        leases = await self._redis.hgetall(self._leases_key)
+        processing: List[str] = await self._redis.lrange(self._processing_key, 0, -1)
+
+        abandoned: List[ResumeTask] = []
+        for task_id in processing:
+            deadline = leases.get(task_id)
+            if deadline is None:
+                # 取出后尚未写入租约（或写入前进程退出），先补一个租约，下次检查时再判断
+                await self._redis.hsetnx(self._leases_key, task_id, now + self.visibility_timeout)
+                continue
+            if float(deadline) > now:
+                continue
+
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.lrem(self._processing_key, 1, task_id)
+                pipe.hdel(self._leases_key, task_id)
+                removed, _ = await pipe.execute()
+            if not removed:
+                continue
+
+            payload = await self._redis.hget(self._jobs_key, task_id)
+            if payload is None:
+                logger.warning(f"任务内容不存在，丢弃任务: {task_id}")
+                continue
+            task = ResumeTask.model_validate_json(payload)
+            task.attempts += 1
+            if task.attempts >= self.max_attempts:
+                logger.error(f"任务租约多次过期，放弃处理: {task_id}")
+                await self._dead_letter(task)
+                abandoned.append(task)
+                continue
+
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.hset(self._jobs_key, task_id, task.model_dump_json())
+                # 放到出队端，优先被重新处理
+                pipe.rpush(self._pending_key, task_id)
+                await pipe.execute()
+            logger.warning(f"任务租约过期，重新入队: {task_id}, 第 {task.attempts} 次")
+        return abandoned
+
+    async def qsize(self) -> int:
+        return await self._redis.llen(self._pending_key)
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+    async def _dead_letter(self, task: ResumeTask):
+        """移除超过最大尝试次数的任务，任务内容保存到 dead 列表"""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self._processing_key, 1, task.task_id)
+            pipe.hdel(self._leases_key, task.task_id)
+            pipe.hdel(self._jobs_key, task.task_id)
+            pipe.lpush(self._dead_key, task.model_dump_json())
+            pipe.ltrim(self._dead_key, 0, self.DEAD_LETTER_LIMIT - 1)
+            await pipe.execute()
+
+    async def _remove(self, task_id: str):
+        """从处理中列表移除任务并清理租约和任务内容"""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self._processing_key, 1, task_id)
+            pipe.hdel(self._leases_key, task_id)
+            pipe.hdel(self._jobs_key, task_id)
+            await pipe.execute()
+
+
+# 全局队列实例
+_task_queue: Optional[TaskQueue] = None
+
+
+def get_task_queue() -> TaskQueue:
+    """
+    获取任务队列实例（单例模式）
+
+    Returns:
+        TaskQueue: 根据配置创建的任务队列
+    """
+    global _task_queue
+    if _task_queue is None:
+        settings = get_settings()
+        if settings.task_queue_backend == "redis":
+            _task_queue = RedisTaskQueue(
+                redis_url=settings.redis_url,
+                queue_name=settings.task_queue_name,
+                visibility_timeout=settings.task_visibility_timeout,
+                max_attempts=settings.task_max_attempts,
+                retry_delay=settings.task_retry_delay,
+                max_retry_delay=settings.task_max_retry_delay
+            )
+        elif settings.task_queue_backend == "memory":
+            _task_queue = InMemoryTaskQueue(
+                visibility_timeout=settings.task_visibility_timeout,
+                max_attempts=settings.task_max_attempts,
+                retry_delay=settings.task_retry_delay,
+                max_retry_delay=settings.task_max_retry_delay
+            )
+        else:
+            raise ValueError(f"不支持的任务队列类型: {settings.task_queue_backend}")
+    return _task_queue
+
+
+async def close_task_queue():
+    """关闭全局任务队列"""
+    global _task_queue
+    if _task_queue is not None:
+        await _task_queue.close()
+        _task_queue = None
@@ -0,0 +1,212 @@
+"""
+token用量统计
+按调用类型记录每次大模型调用的输入、输出token数和延迟，维护滚动百分位，
+并据此自动确定各调用类型的 max_tokens 上限
+"""
+
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Sequence
+
+from ..config.settings import get_settings
+
+# 统计的百分位
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """
+    计算百分位（最近秩法）
+
+    Args:
+        values: 样本
+        q: 百分位（0-100）
+
+    Returns:
+        Optional[float]: 百分位值，没有样本时返回None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class CallTypeStats:
+    """单个调用类型的用量统计"""
+
+    def __init__(self, window: int):
+        self.prompt_tokens: Deque[int] = deque(maxlen=window)
+        self.completion_tokens: Deque[int] = deque(maxlen=window)
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.truncated = 0
+        self.discarded = 0
+        self.total_prompt_tokens = 0
+        self.total_completion_tokens = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """统计摘要"""
+        summary: Dict[str, Any] = {
+            "calls": self.calls,
+            "truncated": self.truncated,
+            "discarded": self.discarded,
+            "total_prompt_tokens": self.total_prompt_tokens,
+            "total_completion_tokens": self.total_completion_tokens,
+        }
+        for q in PERCENTILES:
+            summary[f"prompt_p{q}"] = percentile(self.prompt_tokens, q)
+            summary[f"completion_p{q}"] = percentile(self.completion_tokens, q)
+            latency = percentile(self.latencies, q)
+            summary[f"latency_p{q}"] = round(latency, 3) if latency is not None else None
+        return summary
+
+
+class TokenAccountant:
+    """
+    按调用类型统计token用量
+
+    样本足够后，max_tokens 取输出token数 p99 乘以余量系数，并限制在 [min_max_tokens, max_tokens] 之间；
+    输出因达到上限被截断时按上限的两倍记录样本，使上限随之提高
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 20000,
+        min_max_tokens: int = 512,
+        headroom: float = 1.5,
+        min_samples: int = 20,
+        window: int = 200
+    ):
+        """
+        Args:
+            max_tokens: max_tokens 的最大值，样本不足时使用
+            min_max_tokens: max_tokens 的最小值
+            headroom: p99 之上的余量系数
+            min_samples: 开始自动调整所需的样本数
+            window: 每个调用类型保留的最近样本数
+        """
+        self.max_tokens = max_tokens
+        self.min_max_tokens = min(min_max_tokens, max_tokens)
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.window = window
+        self._stats: Dict[str, CallTypeStats] = {}
+
+    def _get(self, call_type: str) -> CallTypeStats:
+        stats = self._stats.get(call_type)
+        if stats is None:
+            stats = self._stats[call_type] = CallTypeStats(self.window)
+        return stats
+
+    def record(self, call_type: str, prompt_tokens: int, completion_tokens: int, truncated: bool = False):
+        """
+        记录一次调用的用量
+
+        Args:
+            call_type: 调用类型
+            prompt_tokens: 输入token数
+            completion_tokens: 输出token数
+            truncated: 输出是否因达到 max_tokens 被截断
+        """
+        stats = self._get(call_type)
+        stats.calls += 1
+        stats.total_prompt_tokens += prompt_tokens
+        stats.total_completion_tokens += completion_tokens
+        stats.prompt_tokens.append(prompt_tokens)
+        if truncated:
+            stats.truncated += 1
+            completion_tokens = max(completion_tokens, self.max_tokens_for(call_type)) * 2
+        stats.completion_tokens.append(completion_tokens)
+
+    def record_discarded(self, call_type: str, prompt_tokens: int, completion_tokens: int):
+        """
+        记录一次结果被丢弃的调用（如对冲中落败的请求），只计入总用量，不作为 max_tokens 的样本
+
+        Args:
+            call_type: 调用类型
+            prompt_tokens: 输入token数
+            completion_tokens: 输出token数
+        """
+        stats = self._get(call_type)
+        stats.discarded += 1
+        stats.total_prompt_tokens += prompt_tokens
+        stats.total_completion_tokens += completion_tokens
+
+    def record_latency(self, call_type: str, latency: float):
+        """
+        记录一次请求的耗时
+
+        Args:
+            call_type: 调用类型
+            latency: 耗时（秒）
+        """
+        self._get(call_type).latencies.append(latency)
+
+    def latency_percentile(self, call_type: str, q: float) -> Optional[float]:
+        """
+        获取调用类型的延迟百分位
+
+        Args:
+            call_type: 调用类型
+            q: 百分位（0-100）
+
+        Returns:
+            Optional[float]: 延迟（秒），样本不足时返回None
+        """
+        stats = self._stats.get(call_type)
+        if stats is None or len(stats.latencies) < self.min_samples:
+            return None
+        return percentile(stats.latencies, q)
+
+    def max_tokens_for(self, call_type: str) -> int:
+        """
+        获取调用类型当前的 max_tokens
+
+        Args:
+            call_type: 调用类型
+
+        Returns:
+            int: max_tokens
+        """
+        stats = self._stats.get(call_type)
+        if stats is None or len(stats.completion_tokens) < self.min_samples:
+            return self.max_tokens
+        p99 = percentile(stats.completion_tokens, 99)
+        return int(min(max(math.ceil(p99 * self.headroom), self.min_max_tokens), self.max_tokens))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        各调用类型的用量统计
+
+        Returns:
+            Dict[str, Any]: 调用类型到统计摘要的映射，包含当前的 max_tokens
+        """
+        return {
+            call_type: {**stats.summary(), "max_tokens": self.max_tokens_for(call_type)}
+            for call_type, stats in self._stats.items()
+        }
+
+
+# 全局统计实例
+_token_accountant: Optional[TokenAccountant] = None
+
+
+def get_token_accountant() -> TokenAccountant:
+    """
+    获取token用量统计（单例模式）
+
+    Returns:
+        TokenAccountant: 按配置创建的统计实例
+    """
+    global _token_accountant
+    if _token_accountant is None:
+        settings = get_settings()
+        _token_accountant = TokenAccountant(
+            max_tokens=settings.llm_max_tokens,
+            min_max_tokens=settings.llm_min_max_tokens,
+            headroom=settings.llm_max_tokens_headroom,
+            min_samples=settings.llm_max_tokens_min_samples,
+            window=settings.llm_usage_window
+        )
+    return _token_accountant
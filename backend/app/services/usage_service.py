@@ -0,0 +1,151 @@
+"""
+大模型用量服务
+按简历和用户记录、查询大模型调用的token用量
+"""
+
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.db_models import LLMUsageDB
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class UsageService:
+    """大模型用量服务类"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_usage(
+        self,
+        call_type: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        resume_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        estimated: bool = False
+    ) -> LLMUsageDB:
+        """
+        记录一次大模型调用的用量
+
+        Args:
+            call_type: 调用类型
+            model: 模型名称
+            prompt_tokens: 输入token数
+            completion_tokens: 输出token数
+            resume_id: 关联的简历ID
+            user_id: 发起请求的用户ID
+            estimated: token数是否为估算值
+
+        Returns:
+            LLMUsageDB: 用量记录
+        """
+        usage = LLMUsageDB(
+            resume_id=resume_id,
+            user_id=user_id,
+            call_type=call_type,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            estimated=1 if estimated else 0
+        )
+        self.db.add(usage)
+        self.db.commit()
+        return usage
+
+    def get_resume_usage(self, resume_id: str) -> Dict[str, Any]:
+        """
+        获取单份简历的用量，按调用类型汇总
+
+        Args:
+            resume_id: 简历ID
+
+        Returns:
+            Dict[str, Any]: 总token数和各调用类型的用量
+        """
+        rows = self.db.query(
+            LLMUsageDB.call_type,
+            func.count(LLMUsageDB.id),
+            func.sum(LLMUsageDB.prompt_tokens),
+            func.sum(LLMUsageDB.completion_tokens)
+        ).filter(LLMUsageDB.resume_id == resume_id).group_by(LLMUsageDB.call_type).all()
+
+        by_call_type = {
+            call_type: {
+                "calls": calls,
+                "prompt_tokens": int(prompt_tokens or 0),
+                "completion_tokens": int(completion_tokens or 0),
+            }
+            for call_type, calls, prompt_tokens, completion_tokens in rows
+        }
+        total = sum(item["prompt_tokens"] + item["completion_tokens"] for item in by_call_type.values())
+        return {"resume_id": resume_id, "total_tokens": total, "by_call_type": by_call_type}
+
+    def get_user_usage(self, user_id: str) -> Dict[str, Any]:
+        """
+        获取用户的累计用量
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            Dict[str, Any]: 调用次数和token数
+        """
+        calls, prompt_tokens, completion_tokens = self.db.query(
+            func.count(LLMUsageDB.id),
+            func.sum(LLMUsageDB.prompt_tokens),
+            func.sum(LLMUsageDB.completion_tokens)
+        ).filter(LLMUsageDB.user_id == user_id).one()
+        prompt_tokens = int(prompt_tokens or 0)
+        completion_tokens = int(completion_tokens or 0)
+        return {
+            "user_id": user_id,
+            "calls": calls,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def get_costliest_resumes(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        获取消耗token最多的简历
+
+        Args:
+            limit: 返回数量
+
+        Returns:
+            List[Dict[str, Any]]: 简历ID、调用次数和总token数，按总token数降序
+        """
+        total = func.sum(LLMUsageDB.total_tokens)
+        rows = self.db.query(
+            LLMUsageDB.resume_id,
+            func.count(LLMUsageDB.id),
+            total
+        ).filter(LLMUsageDB.resume_id.isnot(None)).group_by(LLMUsageDB.resume_id).order_by(total.desc()).limit(limit).all()
+        return [
+            {"resume_id": resume_id, "calls": calls, "total_tokens": int(total_tokens or 0)}
+            for resume_id, calls, total_tokens in rows
+        ]
+
+
+def record_llm_usage(**kwargs):
+    """
+    使用独立的数据库会话记录一次调用的用量（供后台线程调用）
+
+    Args:
+        **kwargs: 传给 UsageService.record_usage 的参数
+    """
+    db = SessionLocal()
+    try:
+        UsageService(db).record_usage(**kwargs)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"记录大模型用量失败: {str(e)}")
+    finally:
+        db.close()
@@ -7,6 +7,7 @@ from .logger import get_logger, setup_logging
 from .auth import create_access_token, verify_token, get_current_user
 from .password import get_password_hash, verify_password
 from .file_processor import FileProcessor
+from .file_storage import save_upload_stream, upload_suffix, remove_unreferenced_file, UploadTooLargeError
 
 __all__ = [
     "get_logger",
@@ -16,5 +17,9 @@ __all__ = [
     "get_current_user",
     "get_password_hash",
     "verify_password",
-    "FileProcessor"
+    "FileProcessor",
+    "save_upload_stream",
+    "upload_suffix",
+    "remove_unreferenced_file",
+    "UploadTooLargeError"
 ]
@@ -0,0 +1,111 @@
+"""
+文档文本提取器
+按文件格式从内存缓冲区（bytes 或内存映射）中提取每页的原始文本，
+PDF、DOCX、TXT 使用相同的接口，其他格式可通过 register_extractor 注册
+"""
+
+import io
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Dict, List, Union
+
+import docx
+import fitz  # PyMuPDF
+
+from .pdf_sandbox import check_pdf_bytes
+
+# 内存缓冲区：小文件为 bytes，大文件为内存映射的 memoryview
+Buffer = Union[bytes, memoryview]
+
+
+class DocumentExtractor(ABC):
+    """文档文本提取器接口"""
+
+    @abstractmethod
+    def extract_pages(self, buffer: Buffer, max_pages: int = 0) -> List[str]:
+        """
+        从内存缓冲区中提取每页的原始文本
+
+        Args:
+            buffer: 文件内容
+            max_pages: 允许的最大页数，0表示不限制
+
+        Returns:
+            List[str]: 每页的原始文本，没有分页概念的格式返回单页
+        """
+
+
+class PdfExtractor(DocumentExtractor):
+    """PDF文本提取器，通过 fitz.open(stream=...) 直接从内存解析"""
+
+    def extract_pages(self, buffer: Buffer, max_pages: int = 0) -> List[str]:
+        check_pdf_bytes(bytes(buffer[:1024]), bytes(buffer[-8192:]))
+        with fitz.open(stream=buffer, filetype="pdf") as doc:
+            if max_pages > 0 and len(doc) > max_pages:
+                raise ValueError(f"PDF页数 {len(doc)} 超过上限 {max_pages}")
+            return [page.get_text() for page in doc]
+
+
+class DocxExtractor(DocumentExtractor):
+    """DOCX文本提取器，按段落和表格顺序提取"""
+
+    def extract_pages(self, buffer: Buffer, max_pages: int = 0) -> List[str]:
+        document = docx.Document(io.BytesIO(bytes(buffer)))
+        lines = [paragraph.text for paragraph in document.paragraphs]
+        for table in document.tables:
+            for row in table.rows:
+                lines.append(" ".join(cell.text for cell in row.cells))
+        return ["\n".join(line for line in lines if line.strip())]
+
+
+class TextExtractor(DocumentExtractor):
+    """纯文本提取器，依次尝试UTF-8和GB18030编码"""
+
+    def extract_pages(self, buffer: Buffer, max_pages: int = 0) -> List[str]:
+        data = bytes(buffer)
+        for encoding in ("utf-8-sig", "gb18030"):
+            try:
+                return [data.decode(encoding)]
+            except UnicodeDecodeError:
+                continue
+        return [data.decode("utf-8", errors="replace")]
+
+
+_extractors: Dict[str, DocumentExtractor] = {
+    "pdf": PdfExtractor(),
+    "docx": DocxExtractor(),
+    "txt": TextExtractor(),
+}
+
+
+def register_extractor(file_format: str, extractor: DocumentExtractor):
+    """
+    注册或替换文件格式对应的提取器
+
+    提取器在PDF解析进程池的工作进程中执行，需要能被pickle（类定义在模块顶层）
+
+    Args:
+        file_format: 文件格式（扩展名，不含点）
+        extractor: 提取器
+    """
+    _extractors[file_format.lower()] = extractor
+
+
+def get_extractor(file_format: Union[str, Enum]) -> DocumentExtractor:
+    """
+    获取文件格式对应的提取器
+
+    Args:
+        file_format: 文件格式（扩展名，不含点）或 ResumeFormat
+
+    Returns:
+        DocumentExtractor: 提取器
+
+    Raises:
+        ValueError: 不支持的文件格式
+    """
+    file_format = getattr(file_format, "value", file_format)
+    extractor = _extractors.get(str(file_format).lower())
+    if extractor is None:
+        raise ValueError(f"不支持的文件格式: {file_format}")
+    return extractor
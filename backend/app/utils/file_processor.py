@@ -3,14 +3,192 @@
 处理PDF转Markdown等功能
 """
 
+import asyncio
+import hashlib
+import multiprocessing
+import os
 import fitz  # PyMuPDF
 import markdown
-from typing import Optional, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, Any, List, Tuple, Union
 import re
+from ..config.settings import get_settings
 from ..utils.logger import get_logger
+from .markdown_compactor import SECTION_KEYWORDS, compact_pages, get_compaction_stats
+from .document_extractors import DocumentExtractor, get_extractor
+from .pdf_sandbox import PdfSandboxError, init_sandbox_worker, open_buffer, precheck_pdf, run_limited
 
 logger = get_logger(__name__)
 
+# PDF解析进程池及排队限制（按需创建）
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+_pdf_queue_slots: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """
+    获取PDF解析进程池（单例模式），开启沙箱时工作进程启动后限制地址空间
+    
+    Returns:
+        ProcessPoolExecutor: 进程池
+    """
+    global _pdf_executor
+    if _pdf_executor is None:
+        settings = get_settings()
+        max_workers = settings.pdf_process_pool_size or os.cpu_count() or 1
+        memory_mb = settings.pdf_sandbox_memory_mb if settings.pdf_sandbox else 0
+        _pdf_executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_sandbox_worker,
+            initargs=(memory_mb,)
+        )
+        logger.info(f"PDF解析进程池已创建，进程数: {max_workers}")
+    return _pdf_executor
+
+
+def _discard_pdf_executor(executor: ProcessPoolExecutor, terminate: bool = False):
+    """
+    丢弃已损坏或需要中止的进程池，下次调用时重建
+
+    Args:
+        executor: 要丢弃的进程池，已被其他任务重建时不影响新的进程池
+        terminate: 是否终止仍在运行的工作进程（用于中止超时的解析）
+    """
+    global _pdf_executor
+    if _pdf_executor is executor:
+        _pdf_executor = None
+    if terminate:
+        # ProcessPoolExecutor 没有中止单个任务的接口，只能终止工作进程
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.kill()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pdf_executor():
+    """关闭PDF解析进程池"""
+    global _pdf_executor
+    if _pdf_executor is not None:
+        _pdf_executor.shutdown(wait=False, cancel_futures=True)
+        _pdf_executor = None
+    _pdf_queue_slots.clear()
+
+
+async def _run_in_pdf_pool(func, *args):
+    """
+    在PDF进程池中执行函数，超过排队深度时等待空位
+
+    开启沙箱时每个任务限制CPU时间和总耗时。超时后终止工作进程并重建进程池；
+    进程池因其他任务超时或超限被终止而损坏时，在新的进程池中重试一次
+
+    Raises:
+        PdfSandboxError: 超时或超出资源限制
+    """
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    slots = _pdf_queue_slots.get(loop)
+    if slots is None:
+        slots = _pdf_queue_slots.setdefault(loop, asyncio.Semaphore(max(settings.pdf_max_queue_depth, 1)))
+    if settings.pdf_sandbox:
+        args = (settings.pdf_sandbox_cpu_seconds, func, *args)
+        func = run_limited
+    timeout = settings.pdf_sandbox_timeout if settings.pdf_sandbox else None
+    async with slots:
+        for attempt in range(2):
+            executor = get_pdf_executor()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(executor, func, *args), timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"PDF解析超过 {timeout:g} 秒未完成，终止工作进程并重建进程池")
+                _discard_pdf_executor(executor, terminate=True)
+                raise PdfSandboxError(f"PDF解析超过 {timeout:g} 秒未完成")
+            except BrokenProcessPool:
+                # 工作进程异常退出后进程池不可再用，丢弃以便重建
+                logger.error("PDF解析进程池已损坏，将重建进程池")
+                _discard_pdf_executor(executor)
+                if attempt:
+                    if settings.pdf_sandbox:
+                        raise PdfSandboxError("PDF解析进程超出资源限制被终止")
+                    raise
+
+
+def _convert_pdf_range(
+    file_path: str,
+    start: int,
+    end: int,
+    max_pages: int = 0,
+    mmap_threshold: int = 0,
+    keep_lines: bool = True
+) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    转换PDF指定页范围（在进程池工作进程中执行）
+    
+    Args:
+        file_path: PDF文件路径
+        start: 起始页（包含，从0开始）
+        end: 结束页（不包含）
+        max_pages: 允许的最大页数，0表示不限制
+        mmap_threshold: 使用内存映射打开文件的最小文件大小（字节）
+        keep_lines: 清理文本时是否保留换行，见 FileProcessor._clean_text
+        
+    Returns:
+        Tuple[int, List[Tuple[int, str]]]: (总页数, [(页码, Markdown文本)])
+    """
+    with open_buffer(file_path, mmap_threshold) as buffer, fitz.open(stream=buffer, filetype="pdf") as doc:
+        page_count = len(doc)
+        if max_pages > 0 and page_count > max_pages:
+            raise PdfSandboxError(f"PDF页数 {page_count} 超过上限 {max_pages}")
+        pages = []
+        for page_num in range(start, min(end, page_count)):
+            text = doc.load_page(page_num).get_text()
+            cleaned_text = FileProcessor._clean_text(text, keep_lines)
+            pages.append((page_num, FileProcessor._text_to_markdown(cleaned_text)))
+        return page_count, pages
+
+
+def _extract_document(
+    extractor: DocumentExtractor,
+    source: Union[bytes, str],
+    max_pages: int = 0,
+    mmap_threshold: int = 0
+) -> List[str]:
+    """
+    提取文档每页的原始文本（在进程池工作进程中执行）
+    
+    Args:
+        extractor: 文档格式对应的提取器
+        source: 文件内容或文件路径
+        max_pages: 允许的最大页数，0表示不限制
+        mmap_threshold: 使用内存映射打开文件的最小文件大小（字节）
+        
+    Returns:
+        List[str]: 每页的原始文本
+    """
+    if not isinstance(source, str):
+        return extractor.extract_pages(source, max_pages)
+    with open_buffer(source, mmap_threshold) as buffer:
+        return extractor.extract_pages(buffer, max_pages)
+
+
+async def _convert_range(file_path: str, start: int, end: int) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    在进程池中转换PDF指定页范围，开启沙箱时受工作进程的资源限制和总耗时限制
+    
+    Args:
+        file_path: PDF文件路径
+        start: 起始页（包含，从0开始）
+        end: 结束页（不包含）
+        
+    Returns:
+        Tuple[int, List[Tuple[int, str]]]: (总页数, [(页码, Markdown文本)])
+    """
+    settings = get_settings()
+    return await _run_in_pdf_pool(
+        _convert_pdf_range, file_path, start, end, settings.pdf_max_pages, settings.document_mmap_threshold,
+        settings.markdown_compaction
+    )
+
 
 class FileProcessor:
     """文件处理器"""
@@ -28,59 +206,179 @@ class FileProcessor:
         Returns:
             str: Markdown格式的文本内容
         """
+        return self.pages_to_markdown(await self.pdf_to_pages(file_path), file_path)
+    
+    async def pdf_to_pages(self, file_path: str) -> List[str]:
+        """
+        将PDF文件按页转换为Markdown
+        
+        解析在进程池中执行，不阻塞事件循环；页数较多的文档按页分段并行转换。
+        文件头尾检查不通过、页数超过上限、超时或超出资源限制时抛出 PdfSandboxError，
+        其他错误包装为普通异常
+        
+        Args:
+            file_path: PDF文件路径
+            
+        Returns:
+            List[str]: 每页的Markdown文本，按页码排列，空白页为空字符串
+            
+        Raises:
+            PdfSandboxError: 文件被拒绝解析，重试也不会成功
+        """
         try:
             logger.info(f"开始转换PDF文件: {file_path}")
+            settings = get_settings()
+            pages_per_task = max(settings.pdf_pages_per_task, 1)
+            precheck_pdf(file_path)
             
-            # 打开PDF文件
-            doc = fitz.open(file_path)
-            markdown_content = []
+            # 第一段同时返回总页数，小文档一次提交即可完成
+            page_count, pages = await _convert_range(file_path, 0, pages_per_task)
+            if page_count > pages_per_task:
+                remaining = await asyncio.gather(*[
+                    _convert_range(file_path, start, start + pages_per_task)
+                    for start in range(pages_per_task, page_count, pages_per_task)
+                ])
+                for _, chunk in remaining:
+                    pages.extend(chunk)
             
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                
-                # 清理文本
-                cleaned_text = self._clean_text(text)
-                
-                # 转换为Markdown格式
-                markdown_text = self._text_to_markdown(cleaned_text)
-                
-                if markdown_text.strip():
-                    markdown_content.append(f"## 第 {page_num + 1} 页\n\n{markdown_text}\n")
+            logger.info(f"PDF转换完成: {file_path}, 页数: {page_count}")
+            return [markdown_text for _, markdown_text in pages]
             
-            doc.close()
+        except PdfSandboxError as e:
+            logger.error(f"PDF被拒绝解析: {file_path}, 错误: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"PDF转换失败: {file_path}, 错误: {str(e)}")
+            raise Exception(f"PDF转换失败: {str(e)}")
+    
+    def pages_to_markdown(self, pages: List[str], source: str = "", record_stats: bool = True) -> str:
+        """
+        把按页转换的Markdown合并为整篇文档，开启压缩时同时压缩
+        
+        Args:
+            pages: 每页的Markdown文本
+            source: 文档来源，用于日志
+            record_stats: 是否计入压缩统计，对文档的部分页合并时传False
             
+        Returns:
+            str: Markdown格式的文本内容
+        """
+        markdown_content = [
+            f"## 第 {page_num + 1} 页\n\n{markdown_text}\n"
+            for page_num, markdown_text in enumerate(pages)
+            if markdown_text.strip()
+        ]
+        
+        if get_settings().markdown_compaction:
+            result = self.compact_markdown(markdown_content, source, record_stats)
+        else:
             result = "\n".join(markdown_content)
-            logger.info(f"PDF转换完成: {file_path}, 内容长度: {len(result)}")
-            
-            return result
+        logger.info(f"Markdown生成完成: {source}, 内容长度: {len(result)}")
+        return result
+    
+    async def extract_text(self, source: Union[bytes, str], file_format: str) -> str:
+        """
+        提取文档内容并转换为Markdown
+        
+        source 为 bytes 时直接从内存解析，不经过磁盘；为文件路径时 PDF 走 pdf_to_markdown，
+        其他格式按文件大小读入内存或使用内存映射后解析。解析都在PDF解析进程池中执行，
+        开启沙箱时同样受资源限制和总耗时限制
+        
+        Args:
+            source: 文件内容或文件路径
+            file_format: 文件格式（pdf/docx/txt）
             
+        Returns:
+            str: Markdown格式的文本内容
+        """
+        extractor = get_extractor(file_format)
+        settings = get_settings()
+        if isinstance(source, str) and getattr(file_format, "value", file_format) == "pdf":
+            return await self.pdf_to_markdown(source)
+        
+        try:
+            raw_pages = await _run_in_pdf_pool(
+                _extract_document, extractor, source, settings.pdf_max_pages, settings.document_mmap_threshold
+            )
         except Exception as e:
-            logger.error(f"PDF转换失败: {file_path}, 错误: {str(e)}")
-            raise Exception(f"PDF转换失败: {str(e)}")
+            logger.error(f"文档解析失败: {file_format}, 错误: {str(e)}")
+            raise Exception(f"文档解析失败: {str(e)}")
+        pages = [self._text_to_markdown(self._clean_text(text, settings.markdown_compaction)) for text in raw_pages]
+        source_name = source if isinstance(source, str) else f"<{len(source)} bytes>"
+        return self.pages_to_markdown(pages, source_name)
+    
+    @staticmethod
+    def hash_pages(pages: List[str]) -> List[str]:
+        """
+        计算每页文本的摘要，忽略空白差异
+        
+        Args:
+            pages: 每页的Markdown文本
+            
+        Returns:
+            List[str]: 每页文本的SHA-256
+        """
+        return [
+            hashlib.sha256(re.sub(r"\s+", "", page).encode("utf-8")).hexdigest()
+            for page in pages
+        ]
     
-    def _clean_text(self, text: str) -> str:
+    def compact_markdown(self, pages: List[str], source: str = "", record_stats: bool = True) -> str:
+        """
+        压缩按页转换的Markdown，减少发送给大模型的token数
+        
+        去除跨页重复的页眉页脚、页码和模板文字，还原被误判为标题的短行，
+        未开启分段提取且超出 markdown_token_budget 时优先裁剪自我评价、获奖等价值较低的章节
+        
+        Args:
+            pages: 每页的Markdown文本
+            source: 文档来源，用于日志
+            record_stats: 是否计入压缩统计
+            
+        Returns:
+            str: 压缩后的Markdown文本
+        """
+        settings = get_settings()
+        # 开启分段提取时保留完整内容，由分段提取处理长简历，预算只用于评分提示词
+        token_budget = 0 if settings.llm_chunked_extraction else settings.markdown_token_budget
+        content, report = compact_pages(pages, token_budget)
+        if record_stats:
+            get_compaction_stats().record(report)
+        logger.info(
+            f"Markdown压缩完成: {source}, token数: {report.original_tokens} -> {report.compacted_tokens}, "
+            f"节省: {report.saved_tokens} ({report.saved_ratio:.1%}), 去除行数: {report.removed_lines}, "
+            f"还原标题数: {report.collapsed_titles}"
+        )
+        if report.trimmed_sections:
+            logger.warning(f"简历超出token预算，已裁剪章节: {source}, {report.trimmed_sections}")
+        return content
+    
+    @staticmethod
+    def _clean_text(text: str, keep_lines: bool = True) -> str:
         """
         清理文本内容
         
         Args:
             text: 原始文本
+            keep_lines: 是否保留换行。压缩Markdown时保留，以便识别标题和页眉页脚；
+                关闭压缩时与原来一样把整页合并为一行
             
         Returns:
             str: 清理后的文本
         """
         # 移除多余的空白字符
-        text = re.sub(r'\s+', ' ', text)
+        text = re.sub(r'[^\S\n]+' if keep_lines else r'\s+', ' ', text)
         
-        # 移除特殊字符
-        text = re.sub(r'[^\w\s\u4e00-\u9fff.,;:!?()（）【】《》""''""''、，。；：！？]', '', text)
+        # 移除特殊字符，保留邮箱、手机号和时间段中的 @ + - – — ~ ～，供本地提取和复杂度估计识别
+        text = re.sub(r'[^\w\s\u4e00-\u9fff.,;:!?()（）【】《》""''""''、，。；：！？@+–—~～-]', '', text)
         
         # 清理行首行尾空白
         lines = [line.strip() for line in text.split('\n') if line.strip()]
         
         return '\n'.join(lines)
     
-    def _text_to_markdown(self, text: str) -> str:
+    @staticmethod
+    def _text_to_markdown(text: str) -> str:
         """
         将文本转换为Markdown格式
         
@@ -99,14 +397,15 @@ class FileProcessor:
                 continue
             
             # 检测标题（简单的启发式规则）
-            if self._is_title(line):
+            if FileProcessor._is_title(line):
                 markdown_lines.append(f"### {line}")
             else:
                 markdown_lines.append(line)
         
         return '\n'.join(markdown_lines)
     
-    def _is_title(self, line: str) -> bool:
+    @staticmethod
+    def _is_title(line: str) -> bool:
         """
         判断是否为标题
         
@@ -116,19 +415,8 @@ class FileProcessor:
         Returns:
             bool: 是否为标题
         """
-        # 简单的标题检测规则
-        title_keywords = [
-            '个人信息', '基本信息', '个人简介', '联系方式',
-            '教育背景', '教育经历', '学历', '教育',
-            '工作经历', '工作经验', '职业经历', '工作',
-            '项目经历', '项目经验', '项目',
-            '技能', '专业技能', '技术技能', '能力',
-            '获奖情况', '荣誉', '奖项',
-            '自我评价', '个人评价', '自我描述'
-        ]
-        
         # 检查是否包含标题关键词
-        for keyword in title_keywords:
+        for keyword in SECTION_KEYWORDS:
             if keyword in line:
                 return True
         
@@ -178,4 +466,4 @@ class FileProcessor:
             "skills": [],
             "projects": [],
             "summary": None
-        }
\ No newline at end of file
+        }
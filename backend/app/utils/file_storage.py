@@ -0,0 +1,196 @@
+"""
+文件存储工具
+以流式方式将上传文件写入磁盘，避免整文件驻留内存
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from typing import Callable, Optional, Protocol
+
+import aiofiles
+import aiofiles.os
+from pydantic import BaseModel, Field
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 默认分块大小：1MB
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# 按内容寻址的文件最近写入后的保留时间（秒），期间可能有相同内容的上传正在创建记录
+RECENT_WRITE_GRACE = 60
+
+# 上传文件的Content-Type对应的扩展名
+CONTENT_TYPE_SUFFIXES = {
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "text/plain": ".txt",
+}
+
+
+class AsyncReadable(Protocol):
+    """支持异步分块读取的上传文件（如 FastAPI 的 UploadFile）"""
+
+    async def read(self, size: int = -1) -> bytes:
+        ...
+
+
+class UploadTooLargeError(Exception):
+    """上传文件超过大小限制"""
+
+    def __init__(self, limit: int, batch: bool = False):
+        self.limit = limit
+        self.batch = batch
+        scope = "批量上传总大小" if batch else "文件大小"
+        super().__init__(f"{scope}不能超过 {limit // (1024 * 1024)}MB")
+
+
+class StoredFile(BaseModel):
+    """已落盘的上传文件信息"""
+    path: str = Field(..., description="文件存储路径")
+    size: int = Field(..., description="文件大小（字节）")
+    sha256: str = Field(..., description="文件内容SHA-256摘要")
+    deduplicated: bool = Field(default=False, description="目标位置是否已存在相同内容的文件")
+
+
+def upload_suffix(filename: Optional[str], content_type: Optional[str]) -> str:
+    """
+    按内容摘要命名时使用的扩展名
+
+    Args:
+        filename: 上传文件名
+        content_type: 已校验的Content-Type
+
+    Returns:
+        str: 优先取Content-Type对应的扩展名，其次取文件名中的已知扩展名，都无法识别时为空
+    """
+    suffix = CONTENT_TYPE_SUFFIXES.get((content_type or "").split(";")[0].strip().lower())
+    if suffix:
+        return suffix
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if extension in CONTENT_TYPE_SUFFIXES.values() else ""
+
+
+async def save_upload_stream(
+    upload_file: AsyncReadable,
+    dest_dir: str,
+    filename: Optional[str],
+    max_file_size: int,
+    max_total_size: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    suffix: str = "",
+) -> StoredFile:
+    """
+    将上传文件分块写入临时文件，边写边校验大小并计算摘要，完成后原子重命名到目标位置
+
+    按内容摘要命名时目标文件已存在也同样替换（内容相同），使目标文件的修改时间总是反映最近一次上传，
+    见 remove_unreferenced_file
+
+    Args:
+        upload_file: 上传文件对象
+        dest_dir: 目标目录
+        filename: 目标文件名，None表示按内容摘要命名（内容寻址）
+        max_file_size: 单个文件最大字节数
+        max_total_size: 本次允许写入的剩余批量字节数，None表示不限制
+        chunk_size: 每次读取的字节数
+        suffix: 按内容摘要命名时附加的文件扩展名
+
+    Returns:
+        StoredFile: 已保存文件的信息
+
+    Raises:
+        UploadTooLargeError: 文件或批量总大小超过限制
+    """
+    # 客户端声明了大小时可在读取前直接拒绝
+    declared_size = getattr(upload_file, "size", None)
+    if isinstance(declared_size, int):
+        _check_size(declared_size, max_file_size, max_total_size)
+
+    await aiofiles.os.makedirs(dest_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=".part")
+    os.close(fd)
+
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while True:
+                chunk = await upload_file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                _check_size(size, max_file_size, max_total_size)
+                hasher.update(chunk)
+                await out.write(chunk)
+
+        sha256 = hasher.hexdigest()
+        final_path = os.path.join(dest_dir, filename or f"{sha256}{suffix}")
+        deduplicated = filename is None and await aiofiles.os.path.exists(final_path)
+        await aiofiles.os.replace(temp_path, final_path)
+    except BaseException:
+        await _remove_quietly(temp_path)
+        raise
+
+    logger.info(f"上传文件已流式写入: {final_path}, 大小: {size}, 复用已有文件: {deduplicated}")
+    return StoredFile(path=final_path, size=size, sha256=sha256, deduplicated=deduplicated)
+
+
+def remove_unreferenced_file(
+    path: str,
+    is_referenced: Callable[[], bool],
+    grace: float = RECENT_WRITE_GRACE
+) -> bool:
+    """
+    删除不再被引用的按内容寻址文件，不会误删相同内容的并发上传正在复用的文件
+
+    上传总是把新写入的文件原子替换到目标路径。删除时先把文件改名移开再检查：改名前有上传写入时，
+    移开的是刚写入的文件，按修改时间放回原处；改名后写入的是新文件，不受影响
+
+    Args:
+        path: 文件路径
+        is_referenced: 检查是否还有记录引用该文件，需读取其他进程已提交的记录
+        grace: 最近写入后的保留时间（秒）
+
+    Returns:
+        bool: 是否删除了文件
+    """
+    if is_referenced():
+        return False
+    removing = f"{path}.{uuid.uuid4().hex}.removing"
+    try:
+        os.rename(path, removing)
+    except FileNotFoundError:
+        return False
+
+    if os.path.getmtime(removing) > time.time() - grace or is_referenced():
+        try:
+            # 改名后又有上传写入时保留新文件
+            os.link(removing, path)
+        except FileExistsError:
+            pass
+        os.remove(removing)
+        logger.info(f"文件最近被写入或仍被引用，保留: {path}")
+        return False
+    os.remove(removing)
+    logger.info(f"已删除不再被引用的文件: {path}")
+    return True
+
+
+def _check_size(size: int, max_file_size: int, max_total_size: Optional[int]):
+    """校验已读取的字节数是否超过限制"""
+    if size > max_file_size:
+        raise UploadTooLargeError(max_file_size)
+    if max_total_size is not None and size > max_total_size:
+        raise UploadTooLargeError(max_total_size, batch=True)
+
+
+async def _remove_quietly(path: str):
+    """删除文件，忽略不存在等错误"""
+    try:
+        await aiofiles.os.remove(path)
+    except OSError:
+        pass
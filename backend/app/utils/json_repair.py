@@ -0,0 +1,142 @@
+"""
+容错JSON解析
+处理大模型输出中常见的偏差：代码块标记、前后多余的说明文字、尾随逗号、
+Python风格字面量以及被截断的字符串和括号
+"""
+
+import json
+import re
+from typing import Any, List
+
+# ```json / ~~~json 等代码块标记
+_FENCE_PATTERN = re.compile(r"^\s*(```|~~~)[\w-]*\s*\n?|\n?\s*(```|~~~)\s*$")
+_TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+_PYTHON_LITERALS = {"None": "null", "True": "true", "False": "false"}
+
+
+class JSONRepairError(ValueError):
+    """输出无法修复为JSON"""
+
+
+def _strip_fences(text: str) -> str:
+    """去除首尾的代码块标记"""
+    previous = None
+    while previous != text:
+        previous = text
+        text = _FENCE_PATTERN.sub("", text).strip()
+    return text
+
+
+def _replace_outside_strings(text: str) -> str:
+    """在字符串之外去除尾随逗号并替换Python风格字面量"""
+    result: List[str] = []
+    segment: List[str] = []
+    in_string = False
+    escape = False
+
+    def flush():
+        chunk = _TRAILING_COMMA_PATTERN.sub(r"\1", "".join(segment))
+        for literal, replacement in _PYTHON_LITERALS.items():
+            chunk = re.sub(rf"(?<![\w\"]){literal}(?![\w\"])", replacement, chunk)
+        result.append(chunk)
+        segment.clear()
+
+    for char in text:
+        if in_string:
+            result.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            flush()
+            result.append(char)
+            in_string = True
+        else:
+            segment.append(char)
+    flush()
+    return "".join(result)
+
+
+def _close_truncated(text: str) -> List[str]:
+    """补全被截断的字符串和未闭合的括号，返回候选修复结果"""
+    stack: List[str] = []
+    in_string = False
+    escape = False
+    string_start = -1
+    for index, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            string_start = index
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+
+    closing = "".join(reversed(stack))
+    bodies = []
+    if in_string:
+        # 截断在字符串中：先尝试补全引号，再尝试丢弃这个不完整的字符串
+        bodies.append(text + '"')
+        bodies.append(text[:string_start])
+    else:
+        bodies.append(text)
+
+    candidates = []
+    for body in bodies:
+        body = body.rstrip()
+        # 去掉只有键名没有值的键值对，以及末尾多余的逗号或冒号
+        body = re.sub(r'([{,])\s*"[^"]*"\s*:\s*$', r"\1", body)
+        body = re.sub(r"[,:]\s*$", "", body)
+        candidates.append(body + closing)
+    return candidates
+
+
+def loads_lenient(text: str) -> Any:
+    """
+    尽量把大模型输出解析为JSON
+
+    Args:
+        text: 大模型原始输出
+
+    Returns:
+        Any: 解析得到的对象
+
+    Raises:
+        JSONRepairError: 输出中不包含可修复的JSON
+    """
+    text = _strip_fences(text or "")
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        pass
+
+    start = min((index for index in (text.find("{"), text.find("[")) if index >= 0), default=-1)
+    if start < 0:
+        raise JSONRepairError("输出中不包含JSON")
+    text = text[start:]
+
+    # 去掉JSON之后多余的说明文字
+    try:
+        value, _ = json.JSONDecoder(strict=False).raw_decode(text)
+        return value
+    except ValueError:
+        pass
+
+    repaired = _replace_outside_strings(text)
+    for candidate in [repaired] + _close_truncated(repaired):
+        try:
+            value, _ = json.JSONDecoder(strict=False).raw_decode(candidate)
+            return value
+        except ValueError:
+            continue
+    raise JSONRepairError("输出无法修复为JSON")
@@ -0,0 +1,188 @@
+"""
+增量JSON解析
+逐块消费大模型的流式输出，在字段值完整时立即返回，并尽早发现格式错误的输出
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+# JSON字面量（数字、true、false、null）可能包含的字符
+_LITERAL_CHARS = set("0123456789+-.eEtrufalsn")
+_WHITESPACE = set(" \t\r\n")
+
+
+class JSONStreamError(ValueError):
+    """流式输出不是合法的JSON"""
+
+
+class _Frame:
+    """解析栈中的一层对象或数组"""
+    __slots__ = ("kind", "state", "key")
+
+    def __init__(self, kind: str, state: str):
+        self.kind = kind
+        self.state = state
+        self.key: Any = None if kind == "object" else 0
+
+
+class IncrementalJSONParser:
+    """
+    增量JSON解析器
+
+    只跟踪结构而不构建完整对象；被关注路径上的标量值（字符串、数字、布尔、null）
+    一旦完整就由 feed 返回。路径用点号连接，数组下标用数字，如 "extracted_info.name"。
+    根对象之前的内容（如 ```json 代码块标记）会被跳过，根对象结束后的内容被忽略。
+    """
+
+    def __init__(self, watch: Iterable[str] = (), max_preamble: int = 200):
+        """
+        Args:
+            watch: 关注的字段路径
+            max_preamble: 根对象之前允许跳过的最大字符数
+        """
+        self.watch = set(watch)
+        self.max_preamble = max_preamble
+        self.fields: Dict[str, Any] = {}
+        self.finished = False
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._preamble = 0
+        self._string: Optional[List[str]] = None
+        self._string_is_key = False
+        self._escape = False
+        self._literal: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """
+        输入一段输出
+
+        Args:
+            chunk: 新收到的文本
+
+        Returns:
+            Dict[str, Any]: 本次新完成的关注字段
+
+        Raises:
+            JSONStreamError: 输出不是合法的JSON
+        """
+        completed: Dict[str, Any] = {}
+        for char in chunk:
+            if self.finished:
+                break
+            self._consume(char, completed)
+        return completed
+
+    def _consume(self, char: str, completed: Dict[str, Any]):
+        if not self._started:
+            if char in "{[":
+                self._started = True
+                self._open(char)
+                return
+            self._preamble += 1
+            if self._preamble > self.max_preamble:
+                raise JSONStreamError("输出开头不是JSON")
+            return
+
+        if self._string is not None:
+            self._consume_string(char, completed)
+            return
+
+        if self._literal is not None:
+            if char in _LITERAL_CHARS:
+                self._literal.append(char)
+                return
+            self._finish_literal(completed)
+
+        if char in _WHITESPACE:
+            return
+
+        frame = self._stack[-1]
+        state = frame.state
+        if state in ("key", "key_or_end"):
+            if char == '"':
+                self._start_string(is_key=True)
+            elif char == "}" and state == "key_or_end":
+                self._close()
+            else:
+                raise JSONStreamError(f"期望字段名，实际为: {char!r}")
+        elif state == "colon":
+            if char != ":":
+                raise JSONStreamError(f"期望冒号，实际为: {char!r}")
+            frame.state = "value"
+        elif state in ("value", "value_or_end"):
+            if char == "]" and state == "value_or_end":
+                self._close()
+            elif char in "{[":
+                self._open(char)
+            elif char == '"':
+                self._start_string(is_key=False)
+            elif char in "-0123456789tfn":
+                self._literal = [char]
+            else:
+                raise JSONStreamError(f"期望值，实际为: {char!r}")
+        elif state == "comma_or_end":
+            if char == ",":
+                if frame.kind == "object":
+                    frame.state = "key"
+                else:
+                    frame.key += 1
+                    frame.state = "value"
+            elif (char == "}" and frame.kind == "object") or (char == "]" and frame.kind == "array"):
+                self._close()
+            else:
+                raise JSONStreamError(f"期望逗号或结束符，实际为: {char!r}")
+
+    def _consume_string(self, char: str, completed: Dict[str, Any]):
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            raw = "".join(self._string)
+            self._string = None
+            try:
+                value = json.loads(f'"{raw}"', strict=False)
+            except ValueError as e:
+                raise JSONStreamError(f"字符串转义错误: {str(e)}")
+            if self._string_is_key:
+                frame = self._stack[-1]
+                frame.key = value
+                frame.state = "colon"
+            else:
+                self._complete_value(value, completed)
+            return
+        self._string.append(char)
+
+    def _finish_literal(self, completed: Dict[str, Any]):
+        text = "".join(self._literal)
+        self._literal = None
+        try:
+            value = json.loads(text)
+        except ValueError:
+            raise JSONStreamError(f"非法的字面量: {text}")
+        self._complete_value(value, completed)
+
+    def _start_string(self, is_key: bool):
+        self._string = []
+        self._string_is_key = is_key
+        self._escape = False
+
+    def _open(self, char: str):
+        if char == "{":
+            self._stack.append(_Frame("object", "key_or_end"))
+        else:
+            self._stack.append(_Frame("array", "value_or_end"))
+
+    def _close(self):
+        self._stack.pop()
+        if not self._stack:
+            self.finished = True
+            return
+        self._stack[-1].state = "comma_or_end"
+
+    def _complete_value(self, value: Any, completed: Dict[str, Any]):
+        path = ".".join(str(frame.key) for frame in self._stack)
+        if path in self.watch and path not in self.fields:
+            self.fields[path] = value
+            completed[path] = value
+        self._stack[-1].state = "comma_or_end"
@@ -0,0 +1,313 @@
+"""
+Markdown压缩
+PDF转换结果发送给大模型前去除跨页重复的页眉页脚、页码和模板文字，
+还原被误判为标题的短行，并在超出token预算时优先裁剪价值较低的章节
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .tokens import estimate_tokens
+
+# 简历章节标题关键词
+SECTION_KEYWORDS = (
+    '个人信息', '基本信息', '个人简介', '联系方式',
+    '教育背景', '教育经历', '学历', '教育',
+    '工作经历', '工作经验', '职业经历', '工作',
+    '项目经历', '项目经验', '项目',
+    '技能', '专业技能', '技术技能', '能力',
+    '获奖情况', '荣誉', '奖项',
+    '自我评价', '个人评价', '自我描述'
+)
+# 章节标题的最大长度，更长的行即使包含关键词也视为正文
+SECTION_TITLE_MAX_LENGTH = 12
+
+# 超出预算时的裁剪优先级，数值越小越先裁剪；未识别的章节为1，标题之前的内容（姓名、联系方式）为3
+_LOW_VALUE_KEYWORDS = ('自我评价', '个人评价', '自我描述', '兴趣', '爱好', '获奖', '荣誉', '奖项', '证书')
+_CORE_KEYWORDS = ('个人信息', '基本信息', '联系方式', '教育', '学历', '工作', '实习', '项目', '技能')
+_PREAMBLE_PRIORITY = 3
+
+# 页眉页脚只在每页开头和结尾的若干行中查找
+_EDGE_LINES = 2
+_PAGE_HEADER_PATTERN = re.compile(r"^##\s*第\s*\d+\s*页$")
+_PAGE_NUMBER_PATTERN = re.compile(
+    r"^(?:第\s*\d+\s*页(?:\s*[,，/]?\s*共\s*\d+\s*页)?|\d+\s*/\s*\d+|[-—]?\s*\d+\s*[-—]?|page\s*\d+(?:\s*of\s*\d+)?)$",
+    re.IGNORECASE
+)
+# 不含有效信息的模板文字
+_BOILERPLATE_PATTERN = re.compile(
+    r"^(?:个\s*人\s*简\s*历|简\s*历|求\s*职\s*简\s*历|resume|curriculum\s*vitae|cv|"
+    r"本人承诺.{0,20}属实.*|以上信息.{0,10}属实.*|感谢(?:您的)?(?:阅读|审阅|关注).*|谢谢(?:阅读|审阅)?)$",
+    re.IGNORECASE
+)
+
+
+def is_section_title(line: str) -> bool:
+    """
+    判断一行是否为简历章节标题
+
+    Args:
+        line: 去掉Markdown标题标记的文本行
+
+    Returns:
+        bool: 是否为章节标题
+    """
+    line = line.strip()
+    return len(line) <= SECTION_TITLE_MAX_LENGTH and any(keyword in line for keyword in SECTION_KEYWORDS)
+
+
+@dataclass
+class CompactionReport:
+    """单个文档的压缩结果"""
+    original_tokens: int
+    compacted_tokens: int
+    removed_lines: int = 0
+    collapsed_titles: int = 0
+    trimmed_sections: List[str] = field(default_factory=list)
+
+    @property
+    def saved_tokens(self) -> int:
+        """节省的token数"""
+        return self.original_tokens - self.compacted_tokens
+
+    @property
+    def saved_ratio(self) -> float:
+        """节省的token比例"""
+        return self.saved_tokens / self.original_tokens if self.original_tokens else 0.0
+
+
+@dataclass
+class _Section:
+    heading: Optional[str]
+    lines: List[str]
+    priority: int
+    index: int
+
+
+def _strip_title(line: str) -> str:
+    return line.lstrip("#").strip() if line.startswith("#") else line
+
+
+def _edge_key(line: str) -> str:
+    """页眉页脚中的页码等数字每页不同，比较时忽略"""
+    return re.sub(r"\d+", "#", _strip_title(line))
+
+
+def _remove_repeated_edges(pages: List[List[str]]) -> int:
+    """
+    去除在多数页的开头或结尾重复出现的行，只保留第一次出现
+
+    Returns:
+        int: 去除的行数
+    """
+    if len(pages) < 2:
+        return 0
+    counts: Dict[str, int] = {}
+    for lines in pages:
+        for key in {_edge_key(line) for line in lines[:_EDGE_LINES] + lines[-_EDGE_LINES:]}:
+            counts[key] = counts.get(key, 0) + 1
+    threshold = max(2, (len(pages) + 1) // 2)
+    repeated = {key for key, count in counts.items() if count >= threshold}
+    if not repeated:
+        return 0
+
+    removed = 0
+    seen = set()
+    for page_index, lines in enumerate(pages):
+        edges = set(range(min(_EDGE_LINES, len(lines)))) | set(range(max(len(lines) - _EDGE_LINES, 0), len(lines)))
+        kept = []
+        for line_index, line in enumerate(lines):
+            key = _edge_key(line)
+            if line_index in edges and key in repeated:
+                if key in seen:
+                    removed += 1
+                    continue
+                seen.add(key)
+            kept.append(line)
+        pages[page_index] = kept
+    return removed
+
+
+def _section_priority(heading: str) -> int:
+    if any(keyword in heading for keyword in _LOW_VALUE_KEYWORDS):
+        return 0
+    if any(keyword in heading for keyword in _CORE_KEYWORDS):
+        return 2
+    return 1
+
+
+def _split_sections(lines: List[str]) -> List[_Section]:
+    sections = [_Section(heading=None, lines=[], priority=_PREAMBLE_PRIORITY, index=0)]
+    for line in lines:
+        if line.startswith("#"):
+            sections.append(_Section(
+                heading=line,
+                lines=[],
+                priority=_section_priority(_strip_title(line)),
+                index=len(sections)
+            ))
+        else:
+            sections[-1].lines.append(line)
+    return sections
+
+
+def _line_tokens(line: str) -> int:
+    # 换行符计为一个token
+    return estimate_tokens(line) + 1
+
+
+def _trim_to_budget(lines: List[str], token_budget: int) -> Tuple[List[str], List[str]]:
+    """
+    按章节优先级从低到高、同优先级从后往前裁剪正文行，章节正文清空时连同标题一起去除
+
+    Returns:
+        Tuple[List[str], List[str]]: (裁剪后的行, 被裁剪的章节标题)
+    """
+    total = sum(_line_tokens(line) for line in lines)
+    if total <= token_budget:
+        return lines, []
+
+    sections = _split_sections(lines)
+    trimmed: List[str] = []
+    for section in sorted(sections, key=lambda s: (s.priority, -s.index)):
+        if total <= token_budget:
+            break
+        name = _strip_title(section.heading) if section.heading else "（开头）"
+        trimmed.append(name)
+        while section.lines and total > token_budget:
+            total -= _line_tokens(section.lines.pop())
+        if not section.lines and section.heading and total > token_budget:
+            total -= _line_tokens(section.heading)
+            section.heading = None
+
+    result: List[str] = []
+    for section in sections:
+        if section.heading:
+            result.append(section.heading)
+        result.extend(section.lines)
+    return result, trimmed
+
+
+def compact_pages(pages: Sequence[str], token_budget: int = 0) -> Tuple[str, CompactionReport]:
+    """
+    压缩按页转换的Markdown
+
+    Args:
+        pages: 每页的Markdown文本，可以带"## 第 N 页"页标题
+        token_budget: token预算，0表示不限制
+
+    Returns:
+        Tuple[str, CompactionReport]: (压缩后的Markdown, 压缩结果)
+    """
+    original_tokens = estimate_tokens("\n".join(pages))
+    report = CompactionReport(original_tokens=original_tokens, compacted_tokens=original_tokens)
+
+    page_lines = []
+    for page in pages:
+        lines = [line.strip() for line in page.splitlines() if line.strip()]
+        kept = [line for line in lines if not _PAGE_HEADER_PATTERN.match(line)]
+        report.removed_lines += len(lines) - len(kept)
+        page_lines.append(kept)
+
+    report.removed_lines += _remove_repeated_edges(page_lines)
+
+    lines: List[str] = []
+    for raw in (line for page in page_lines for line in page):
+        text = _strip_title(raw)
+        if (
+            not text
+            or _PAGE_NUMBER_PATTERN.match(text)
+            or _BOILERPLATE_PATTERN.match(text)
+            or (lines and _strip_title(lines[-1]) == text)
+        ):
+            report.removed_lines += 1
+            continue
+        # 文档第一行通常是姓名，保留其标题标记
+        if raw.startswith("#") and lines and not is_section_title(text):
+            report.collapsed_titles += 1
+            raw = text
+        lines.append(raw)
+
+    if token_budget > 0:
+        lines, report.trimmed_sections = _trim_to_budget(lines, token_budget)
+
+    content = "\n".join(lines)
+    report.compacted_tokens = estimate_tokens(content)
+    return content, report
+
+
+def trim_markdown(content: str, token_budget: int) -> Tuple[str, List[str]]:
+    """
+    把已压缩的Markdown裁剪到token预算内，裁剪顺序与 compact_pages 相同
+
+    Args:
+        content: Markdown文本
+        token_budget: token预算，0表示不限制
+
+    Returns:
+        Tuple[str, List[str]]: (裁剪后的Markdown, 被裁剪的章节标题)
+    """
+    if token_budget <= 0:
+        return content, []
+    lines, trimmed = _trim_to_budget([line for line in content.splitlines() if line.strip()], token_budget)
+    if not trimmed:
+        return content, []
+    return "\n".join(lines), trimmed
+
+
+class CompactionStats:
+    """进程内的压缩累计统计"""
+
+    def __init__(self):
+        self.documents = 0
+        self.trimmed_documents = 0
+        self.original_tokens = 0
+        self.compacted_tokens = 0
+
+    def record(self, report: CompactionReport):
+        """
+        记录一个文档的压缩结果
+
+        Args:
+            report: 压缩结果
+        """
+        self.documents += 1
+        self.original_tokens += report.original_tokens
+        self.compacted_tokens += report.compacted_tokens
+        if report.trimmed_sections:
+            self.trimmed_documents += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        压缩统计
+
+        Returns:
+            Dict[str, Any]: 文档数、被预算裁剪的文档数、压缩前后的token总数和节省比例
+        """
+        saved = self.original_tokens - self.compacted_tokens
+        return {
+            "documents": self.documents,
+            "trimmed_documents": self.trimmed_documents,
+            "original_tokens": self.original_tokens,
+            "compacted_tokens": self.compacted_tokens,
+            "saved_tokens": saved,
+            "saved_ratio": round(saved / self.original_tokens, 4) if self.original_tokens else 0.0,
+        }
+
+
+# 全局统计实例
+_compaction_stats: Optional[CompactionStats] = None
+
+
+def get_compaction_stats() -> CompactionStats:
+    """
+    获取压缩统计（单例模式）
+
+    Returns:
+        CompactionStats: 统计实例
+    """
+    global _compaction_stats
+    if _compaction_stats is None:
+        _compaction_stats = CompactionStats()
+    return _compaction_stats
@@ -0,0 +1,144 @@
+"""
+PDF解析沙箱
+PDF解析进程池的工作进程在启动时限制地址空间，每个解析任务限制CPU时间，
+父进程限制总耗时；超时时终止工作进程并重建进程池
+"""
+
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Callable, Iterator, TypeVar, Union
+
+# 文件头需在开头的若干字节内出现"%PDF-"，交叉引用表位置标记需在结尾的若干字节内出现
+_HEADER_WINDOW = 1024
+_TRAILER_WINDOW = 8192
+
+T = TypeVar("T")
+
+
+class PdfSandboxError(Exception):
+    """PDF文件无法在限制内完成解析"""
+
+
+@contextmanager
+def open_buffer(file_path: str, mmap_threshold: int) -> Iterator[Union[bytes, memoryview]]:
+    """
+    以内存缓冲区的形式打开文件，供 fitz.open(stream=...) 等直接从内存解析
+
+    不超过 mmap_threshold 的文件一次读入内存；更大的文件使用只读内存映射，由操作系统按需读取页面
+
+    Args:
+        file_path: 文件路径
+        mmap_threshold: 使用内存映射的最小文件大小（字节）
+
+    Returns:
+        Iterator[Union[bytes, memoryview]]: 文件内容，内存映射在退出上下文时关闭
+    """
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or size <= mmap_threshold:
+            yield f.read()
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        try:
+            yield view
+        finally:
+            view.release()
+            mapped.close()
+
+
+def check_pdf_bytes(header: bytes, trailer: bytes):
+    """
+    检查PDF文件头和交叉引用表标记
+
+    Args:
+        header: 文件开头的字节
+        trailer: 文件结尾的字节
+
+    Raises:
+        PdfSandboxError: 文件不是有效的PDF
+    """
+    if not header:
+        raise PdfSandboxError("PDF文件为空")
+    if b"%PDF-" not in header[:_HEADER_WINDOW]:
+        raise PdfSandboxError("文件头不是PDF格式")
+    trailer = trailer[-_TRAILER_WINDOW:]
+    if b"startxref" not in trailer and b"%%EOF" not in trailer:
+        raise PdfSandboxError("PDF文件缺少交叉引用表标记，文件可能已损坏或被截断")
+
+
+def precheck_pdf(file_path: str):
+    """
+    只读取文件头尾，检查PDF文件头和交叉引用表标记
+
+    Args:
+        file_path: PDF文件路径
+
+    Raises:
+        PdfSandboxError: 文件不是有效的PDF
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        header = f.read(_HEADER_WINDOW)
+        f.seek(max(size - _TRAILER_WINDOW, 0))
+        trailer = f.read()
+    check_pdf_bytes(header, trailer)
+
+
+def init_sandbox_worker(memory_mb: int):
+    """
+    PDF解析进程池工作进程的初始化函数，限制工作进程的地址空间
+
+    Args:
+        memory_mb: 地址空间上限（MB），0表示不限制
+    """
+    try:
+        import resource
+    except ImportError:
+        # 非POSIX平台只依赖父进程的总耗时限制
+        return
+    if memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _limit_cpu_time(cpu_seconds: int):
+    """
+    把当前进程的CPU时间软限制设为已用时间加 cpu_seconds，超过时进程收到SIGXCPU被终止
+
+    工作进程会执行多个任务，CPU时间按进程累计，因此每个任务开始时重新设置软限制
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def run_limited(cpu_seconds: int, func: Callable[..., T], *args) -> T:
+    """
+    在进程池工作进程中执行解析任务，限制本任务的CPU时间
+
+    Args:
+        cpu_seconds: 本任务的CPU时间上限（秒），0表示不限制
+        func: 解析函数
+        *args: 解析函数的参数
+
+    Returns:
+        T: 解析函数的返回值
+
+    Raises:
+        PdfSandboxError: 超出地址空间限制
+    """
+    if cpu_seconds > 0:
+        _limit_cpu_time(cpu_seconds)
+    try:
+        return func(*args)
+    except MemoryError:
+        raise PdfSandboxError("PDF解析超出内存限制")
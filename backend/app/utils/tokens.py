@@ -0,0 +1,28 @@
+"""
+token估算工具
+在不依赖具体分词器的情况下粗略估算文本的token数
+"""
+
+import re
+
+# 中日韩文字基本按每字一个token计算
+_CJK_PATTERN = re.compile(r"[　-〿㐀-䶿一-鿿＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的token数
+
+    中文字符按每字1个token，其余字符按每4个字符1个token估算
+
+    Args:
+        text: 文本内容
+
+    Returns:
+        int: 估算的token数
+    """
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return cjk_count + (other_count + 3) // 4
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+LLM客户端并发能力基准测试
+
+启动一个本地模拟的OpenAI兼容服务（固定响应延迟），分别用以下两种方式并发发起请求，
+统计服务端观察到的最大同时在途请求数、总耗时和吞吐：
+
+- thread: 同步 openai.OpenAI 客户端 + asyncio.to_thread（旧实现，受默认线程池大小限制）
+- async:  共享的 AsyncOpenAI 客户端 + httpx 连接池（当前实现，受连接数限制）
+
+用法:
+    python benchmarks/llm_concurrency_bench.py [--requests 200] [--latency 0.5] [--max-connections 100]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+import openai
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESPONSE_BODY = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench-model",
+    "choices": [{
+        "index": 0,
+        "message": {"role": "assistant", "content": "{\"name\": \"张三\"}"},
+        "finish_reason": "stop"
+    }],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+}).encode()
+
+
+class MockLLMServer:
+    """固定延迟的最小OpenAI兼容HTTP服务，记录同时在途的请求数"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections = 0
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v1"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def reset(self):
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                header = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in header.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                await asyncio.sleep(self.latency)
+                self.in_flight -= 1
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(RESPONSE_BODY)}\r\nConnection: keep-alive\r\n\r\n".encode()
+                    + RESPONSE_BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+def _messages():
+    return [{"role": "user", "content": "bench"}]
+
+
+async def run_thread_mode(base_url: str, requests: int):
+    """旧实现：每个请求占用一个默认线程池线程"""
+    client = openai.OpenAI(api_key="bench", base_url=base_url, max_retries=0)
+
+    await asyncio.gather(*[
+        asyncio.to_thread(client.chat.completions.create, model="bench-model", messages=_messages())
+        for _ in range(requests)
+    ])
+    client.close()
+
+
+async def run_async_mode(base_url: str, requests: int, max_connections: int):
+    """当前实现：共享异步客户端，并发受连接池大小限制"""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    )
+    client = openai.AsyncOpenAI(api_key="bench", base_url=base_url, http_client=http_client, max_retries=0)
+
+    await asyncio.gather(*[
+        client.chat.completions.create(model="bench-model", messages=_messages())
+        for _ in range(requests)
+    ])
+    await client.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="LLM客户端并发能力基准测试")
+    parser.add_argument("--requests", type=int, default=200, help="并发请求数")
+    parser.add_argument("--latency", type=float, default=0.5, help="模拟的LLM响应延迟（秒）")
+    parser.add_argument("--max-connections", type=int, default=100, help="异步客户端连接池大小")
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.latency)
+    base_url = await server.start()
+
+    print(f"请求数: {args.requests}, 模拟延迟: {args.latency}s, 默认线程池上限: {min(32, (os.cpu_count() or 1) + 4)}")
+    print(f"{'模式':<8}{'最大在途':>10}{'连接数':>10}{'耗时(s)':>10}{'吞吐(req/s)':>14}")
+
+    for mode in ("thread", "async"):
+        server.reset()
+        start = time.perf_counter()
+        if mode == "thread":
+            await run_thread_mode(base_url, args.requests)
+        else:
+            await run_async_mode(base_url, args.requests, args.max_connections)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{mode:<8}{server.peak_in_flight:>10}{server.connections:>10}"
+            f"{elapsed:>10.2f}{args.requests / elapsed:>14.1f}"
+        )
+
+    await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
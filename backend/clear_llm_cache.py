@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+大模型响应缓存清理脚本
+修改提示词或模型输出异常后清除缓存，之后的请求重新调用大模型
+"""
+
+import argparse
+
+from app.services.llm_cache import get_llm_cache, close_llm_cache
+
+
+def main():
+    """清除全部缓存或指定提示词模板版本的缓存"""
+    parser = argparse.ArgumentParser(description="清除大模型响应缓存")
+    parser.add_argument(
+        "--prompt-version",
+        help="只清除指定提示词模板版本的缓存，格式为 提示词类型:版本，如 extraction:1；不指定时清除全部"
+    )
+    args = parser.parse_args()
+
+    cache = get_llm_cache()
+    if cache is None:
+        print("大模型响应缓存未启用或无法打开")
+        return
+    try:
+        removed = cache.clear_sync(args.prompt_version)
+        print(f"已清除 {removed} 条缓存，剩余 {cache.stats()['entries']} 条")
+    finally:
+        close_llm_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,11 @@ from app.config.settings import get_settings
 from app.routes import auth_routes, resume_routes, analysis_routes
 from app.database import create_tables
 from app.utils.logger import get_logger, setup_logging
+from app.services.task_queue import get_task_queue, close_task_queue
+from app.utils.file_processor import shutdown_pdf_executor
+from app.services.llm_router import close_llm_router
+from app.services.llm_cache import close_llm_cache
+from app.services.metrics import collect_metrics
 
 # 获取配置
 settings = get_settings()
@@ -15,14 +20,39 @@ setup_logging(level=settings.log_level, log_file=settings.log_file)
 logger = get_logger(__name__)
 logger.info("应用启动中...")
 
+
 # 定义lifespan事件处理器
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时执行
     create_tables()
+    
+    # memory 队列没有独立worker，在API进程内消费
+    worker = None
+    if settings.task_queue_backend == "memory":
+        from app.services.resume_pipeline import process_resume_task, process_resume_batch, mark_resume_task_failed
+        from app.services.resume_worker import ResumeWorker
+        worker = ResumeWorker(
+            queue=get_task_queue(),
+            handler=process_resume_task,
+            on_failure=mark_resume_task_failed,
+            concurrency=settings.worker_concurrency,
+            batch_handler=process_resume_batch if settings.llm_batch_scoring else None,
+            batch_size=settings.llm_batch_max_size,
+            batch_linger=settings.task_batch_linger
+        )
+        worker.start()
+    
     yield
-    # 关闭时执行（如果需要的话）
+    
+    # 关闭时执行
+    if worker:
+        await worker.stop()
+    await close_task_queue()
+    shutdown_pdf_executor()
+    await close_llm_router()
+    close_llm_cache()
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -69,6 +99,12 @@ async def health_check():
     return {"status": "healthy", "timestamp": "2024-01-01T00:00:00Z"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """运行指标"""
+    return await collect_metrics()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -76,4 +112,4 @@ if __name__ == "__main__":
         host=settings.host,
         port=settings.port,
         reload=settings.debug
-    )
\ No newline at end of file
+    )
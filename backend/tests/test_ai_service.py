@@ -0,0 +1,441 @@
+"""
+AI服务测试
+"""
+
+import asyncio
+import json
+
+import httpx
+import openai
+import pytest
+
+from app.services import ai_service
+from app.services.ai_service import AIService
+from app.services.llm_cache import LLMCache, make_cache_key
+from app.services.llm_hedging import HedgeBudget
+from app.services.llm_scheduler import LLMScheduler
+from app.services.token_accounting import TokenAccountant
+from app.services.llm_router import Endpoint, EndpointConfig, LLMRouter
+from tests.test_scoring_rules import REFERENCE
+
+
+def _make_service(response: str) -> AIService:
+    """构造返回固定响应的AI服务"""
+    service = AIService()
+    service.reference = REFERENCE
+
+    async def fake_call(prompt: str, **kwargs) -> str:
+        return response
+
+    service._call_openai = fake_call
+    return service
+
+
+@pytest.mark.asyncio
+async def test_extract_and_score_combined():
+    """测试单次调用同时返回提取信息和评分"""
+    response = json.dumps({
+        "extracted_info": {"name": "张三", "school_name": "四川大学", "major": "软件工程"},
+        "total_score": 99,
+        "score_details": {
+            "region_score": {"score": 0, "reason": "模型误判"},
+            "highlight_score": {"score": 6, "reason": "ACM获奖"},
+            "experience_score": {"score": 12, "reason": "大厂实习"},
+            "quality_score": {"score": 1, "reason": "使用主动性动词"},
+        },
+    }, ensure_ascii=False)
+
+    result = await _make_service(f"```json\n{response}\n```").extract_and_score("简历内容")
+
+    assert result is not None
+    extracted_info, scoring_result = result
+    assert extracted_info["name"] == "张三"
+    details = scoring_result["score_details"]
+    assert details["region_score"]["score"] == 5
+    assert details["school_score"]["score"] == 10
+    assert details["experience_score"]["score"] == 10
+    assert scoring_result["total_score"] == 5 + 10 + 8 + 6 + 10 + 1
+
+
+@pytest.mark.asyncio
+async def test_extract_and_score_invalid_response():
+    """测试单次调用响应无法解析时返回None以便回退"""
+    assert await _make_service("不是JSON").extract_and_score("简历内容") is None
+    assert await _make_service('{"total_score": 1}').extract_and_score("简历内容") is None
+
+
+class _FakeDelta:
+    def __init__(self, content):
+        self.content = content
+
+
+class _FakeChunk:
+    def __init__(self, content):
+        self.choices = [type("Choice", (), {"delta": _FakeDelta(content), "finish_reason": None})()]
+
+
+class _FakeResponse:
+    closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class _FakeStream:
+    def __init__(self, parts):
+        self.parts = parts
+        self.consumed = 0
+        self.response = _FakeResponse()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for part in self.parts:
+            self.consumed += 1
+            yield _FakeChunk(part)
+
+
+def _fake_client(stream):
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return stream
+
+    completions = type("Completions", (), {"create": staticmethod(create)})()
+    return type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})()
+
+
+def fake_router(client) -> LLMRouter:
+    """构造只有一个使用指定客户端的端点的路由"""
+    config = EndpointConfig(name="test", base_url="http://llm.test/v1", model="test-model")
+    return LLMRouter([Endpoint(config, client=client)])
+
+
+@pytest.mark.asyncio
+async def test_streaming_emits_fields_early(monkeypatch):
+    """测试流式模式下关键字段解析完成即回调"""
+    stream = _FakeStream(['{"name": "张三", ', '"school_name": "四川大学"', ', "major": null}', "多余内容"])
+    monkeypatch.setattr(ai_service.settings, "llm_streaming", True)
+    monkeypatch.setattr(ai_service.settings, "llm_cache_enabled", False)
+    monkeypatch.setattr(ai_service, "get_llm_router", lambda: fake_router(_fake_client(stream)))
+
+    received = []
+
+    async def on_fields(fields):
+        received.append(fields)
+
+    service = AIService(on_fields=on_fields)
+    response = await service._call_openai("prompt", prompt_kind="extraction")
+
+    assert json.loads(response)["name"] == "张三"
+    assert received == [{"name": "张三"}, {"school_name": "四川大学"}, {"major": None}]
+    assert stream.consumed == 3
+    assert stream.response.closed
+
+
+@pytest.mark.asyncio
+async def test_streaming_non_strict_json_falls_back_to_lenient_parse(monkeypatch, tmp_path):
+    """测试流式输出不是严格JSON时不视为服务不可用，接收完整输出后宽松解析，且不写入缓存"""
+    stream = _FakeStream(['{"name": "张三", ', '"school_name": "四川大学",', "}"])
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(ai_service.settings, "llm_streaming", True)
+    monkeypatch.setattr(ai_service.settings, "local_fast_extraction", False)
+    monkeypatch.setattr(ai_service.settings, "llm_chunked_extraction", False)
+    monkeypatch.setattr(ai_service, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(ai_service, "get_llm_router", lambda: fake_router(_fake_client(stream)))
+
+    service = AIService()
+    service.reference = REFERENCE
+    monkeypatch.setattr(ai_service.settings, "llm_reask_missing_fields", False)
+    info = await service.extract_resume_info("简历内容")
+
+    assert info["name"] == "张三"
+    assert info["school_name"] == "四川大学"
+    assert stream.consumed == 3
+    assert stream.response.closed
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_streaming_garbage_output_is_parse_failure(monkeypatch):
+    """测试流式输出无法解析时按解析失败处理，不抛出服务不可用异常"""
+    stream = _FakeStream(["抱歉，" * 100, "无法完成"])
+    monkeypatch.setattr(ai_service.settings, "llm_streaming", True)
+    monkeypatch.setattr(ai_service.settings, "llm_cache_enabled", False)
+    monkeypatch.setattr(ai_service, "get_llm_router", lambda: fake_router(_fake_client(stream)))
+
+    response = await AIService()._call_openai("prompt", prompt_kind="extraction")
+    assert response == "抱歉，" * 100 + "无法完成"
+    # 全部字段缺失，由重新询问补全
+    _, missing = AIService()._parse_extraction_response(response, ai_service.EXTRACTION_FIELDS)
+    assert missing == list(ai_service.EXTRACTION_FIELDS)
+
+
+def _completion_client(content, finish_reason):
+    """构造返回固定非流式响应的客户端"""
+    async def create(**kwargs):
+        message = type("Message", (), {"content": content})()
+        choice = type("Choice", (), {"message": message, "finish_reason": finish_reason})()
+        return type("Response", (), {"choices": [choice], "usage": None})()
+
+    completions = type("Completions", (), {"create": staticmethod(create)})()
+    return type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})()
+
+
+@pytest.mark.asyncio
+async def test_only_complete_strict_json_is_cached(monkeypatch, tmp_path):
+    """测试被截断或需要修复的输出不写入缓存"""
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(ai_service.settings, "llm_streaming", False)
+    monkeypatch.setattr(ai_service.settings, "llm_hedging", False)
+    monkeypatch.setattr(ai_service, "get_llm_cache", lambda: cache)
+
+    for index, (content, finish_reason) in enumerate([
+        ('{"name": "张三", "skills": ["Py', "length"),
+        ('```json\n{"name": "张三"}\n```', "stop"),
+    ]):
+        monkeypatch.setattr(ai_service, "get_llm_router", lambda: fake_router(_completion_client(content, finish_reason)))
+        await AIService()._call_openai(f"prompt-{index}", prompt_kind="extraction")
+    assert cache.stats()["entries"] == 0
+
+    monkeypatch.setattr(ai_service, "get_llm_router", lambda: fake_router(_completion_client('{"name": "张三"}', "stop")))
+    await AIService()._call_openai("prompt-2", prompt_kind="extraction")
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_and_usage_use_serving_endpoint_model(monkeypatch, tmp_path):
+    """测试端点故障换用其他端点后，缓存键和用量记录使用实际提供服务的端点上的模型"""
+    async def fail(**kwargs):
+        raise openai.APIConnectionError(request=httpx.Request("POST", "http://llm-a.test/v1"))
+
+    completions = type("Completions", (), {"create": staticmethod(fail)})()
+    failing = type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})()
+    router = LLMRouter([
+        Endpoint(EndpointConfig(name="a", base_url="http://llm-a.test/v1", model="model-a"), client=failing),
+        Endpoint(
+            EndpointConfig(name="b", base_url="http://llm-b.test/v1", model="model-b"),
+            client=_completion_client('{"name": "张三"}', "stop")
+        ),
+    ])
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"))
+    recorded = []
+    monkeypatch.setattr(ai_service.settings, "llm_streaming", False)
+    monkeypatch.setattr(ai_service.settings, "llm_hedging", False)
+    monkeypatch.setattr(ai_service.settings, "llm_usage_tracking", True)
+    monkeypatch.setattr(ai_service, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(ai_service, "get_llm_router", lambda: router)
+    monkeypatch.setattr(ai_service, "record_llm_usage", lambda **kwargs: recorded.append(kwargs))
+
+    await AIService(user_id="u1")._call_openai("prompt", prompt_kind="extraction")
+
+    assert [usage["model"] for usage in recorded] == ["model-b"]
+    prompt_version = f"extraction:{ai_service.PROMPT_VERSIONS.get('extraction', '1')}"
+    assert await cache.get(make_cache_key("model-b", prompt_version, "prompt")) == '{"name": "张三"}'
+    assert await cache.get(make_cache_key("model-a", prompt_version, "prompt")) is None
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_hedge_takes_scheduler_slot_and_records_loser_usage(monkeypatch):
+    """测试对冲请求单独占用调度名额，被取消的原请求的用量也计入统计"""
+    accountant = TokenAccountant(min_samples=1)
+    accountant.record_latency("extraction", 0.01)
+    scheduler = LLMScheduler(max_in_flight=4)
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(len(calls))
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+        message = type("Message", (), {"content": '{"name": "张三"}'})()
+        choice = type("Choice", (), {"message": message, "finish_reason": "stop"})()
+        usage = type("Usage", (), {"prompt_tokens": 100, "completion_tokens": 10})()
+        return type("Response", (), {"choices": [choice], "usage": usage})()
+
+    completions = type("Completions", (), {"create": staticmethod(create)})()
+    client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})()
+    monkeypatch.setattr(ai_service.settings, "llm_streaming", False)
+    monkeypatch.setattr(ai_service.settings, "llm_cache_enabled", False)
+    monkeypatch.setattr(ai_service.settings, "llm_hedging", True)
+    monkeypatch.setattr(ai_service.settings, "llm_hedge_min_delay", 0.01)
+    monkeypatch.setattr(ai_service, "get_llm_router", lambda: fake_router(client))
+    monkeypatch.setattr(ai_service, "get_token_accountant", lambda: accountant)
+    monkeypatch.setattr(ai_service, "get_llm_scheduler", lambda: scheduler)
+    monkeypatch.setattr(ai_service, "get_hedge_budget", lambda: HedgeBudget(ratio=1.0))
+
+    response = await AIService()._call_openai("prompt", prompt_kind="extraction")
+
+    assert json.loads(response) == {"name": "张三"}
+    assert calls == [0, 1]
+    assert scheduler.stats()["granted_total"] == 2
+    assert scheduler.in_flight == 0
+    stats = accountant.stats()["extraction"]
+    assert stats["calls"] == 1
+    assert stats["discarded"] == 1
+    assert stats["total_prompt_tokens"] == 100 + ai_service.estimate_tokens("prompt")
+
+
+def _make_sequence_service(responses):
+    """构造按顺序返回响应并记录提示词的AI服务"""
+    service = AIService()
+    service.reference = REFERENCE
+    prompts = []
+
+    async def fake_call(prompt: str, **kwargs) -> str:
+        prompts.append((kwargs.get("prompt_kind"), prompt))
+        return responses[len(prompts) - 1]
+
+    service._call_openai = fake_call
+    return service, prompts
+
+
+@pytest.mark.asyncio
+async def test_extraction_reasks_only_missing_fields(monkeypatch):
+    """测试提取结果被截断时只针对缺失字段重新询问"""
+    monkeypatch.setattr(ai_service.settings, "llm_reask_missing_fields", True)
+    truncated = (
+        '~~~json\n{"name": "张三", "school_name": "四川大学", "school_city": "成都", '
+        '"education_level": "本科", "major": "软件工程", "graduation_year": 2024, '
+        '"phone": "13800000000", "email": null, "position": null, "work_experience": [], '
+        '"skills": "Python、Go", "projects": [{"name": "p'
+    )
+    service, prompts = _make_sequence_service([truncated, '{"summary": "热爱编程"}'])
+
+    info = await service.extract_resume_info("简历内容")
+
+    assert info["name"] == "张三"
+    assert info["graduation_year"] == "2024"
+    assert info["skills"] == ["Python", "Go"]
+    assert info["summary"] == "热爱编程"
+    assert [kind for kind, _ in prompts] == ["extraction", "extraction_reask"]
+    assert "- summary:" in prompts[1][1]
+    assert "- name:" not in prompts[1][1]
+
+
+@pytest.mark.asyncio
+async def test_subjective_scoring_reasks_missing_dimension(monkeypatch):
+    """测试评分响应缺少维度时只针对缺失维度重新询问"""
+    monkeypatch.setattr(ai_service.settings, "llm_reask_missing_fields", True)
+    first = '评分如下：{"total_score": 9, "score_details": {"highlight_score": {"score": "6分", "reason": "ACM"}, ' \
+            '"experience_score": {"score": 3, "reason": "实习"}}} 希望对您有帮助'
+    service, prompts = _make_sequence_service([first, '{"score_details": {"quality_score": 2}}'])
+
+    result = await service._score_resume_with_rules(
+        "简历内容", {"school_name": "清华大学", "major": "计算机科学"}
+    )
+
+    details = result["score_details"]
+    assert details["highlight_score"]["score"] == 6
+    assert details["quality_score"]["score"] == 2
+    assert [kind for kind, _ in prompts] == ["subjective_scoring", "scoring_reask"]
+    assert result["total_score"] == 3 + 10 + 8 + 6 + 3 + 2
+
+
+@pytest.mark.asyncio
+async def test_score_resumes_batch(monkeypatch):
+    """测试批量评分一次请求返回多份简历结果，缺失的简历单独评分"""
+    monkeypatch.setattr(ai_service.settings, "local_rule_scoring", True)
+    monkeypatch.setattr(ai_service.settings, "llm_batch_max_size", 8)
+    monkeypatch.setattr(ai_service.settings, "llm_batch_token_budget", 100000)
+    monkeypatch.setattr(ai_service.settings, "llm_reask_missing_fields", False)
+    batch_response = json.dumps({"results": [
+        {"resume_id": "1", "score_details": {
+            "highlight_score": {"score": 6, "reason": "ACM"},
+            "experience_score": {"score": 7, "reason": "实习"},
+            "quality_score": {"score": 1, "reason": "动词"},
+        }},
+        {"resume_id": "9", "score_details": {"highlight_score": {"score": 6, "reason": "编号错误"}}},
+    ]}, ensure_ascii=False)
+    single_response = '{"total_score": 2, "score_details": {"quality_score": {"score": 2, "reason": "量化"}}}'
+    service, prompts = _make_sequence_service([batch_response, single_response])
+
+    results = await service.score_resumes_batch([
+        ("resume-a", "简历A", {"school_name": "四川大学", "major": "软件工程"}),
+        ("resume-b", "简历B", {"school_name": "清华大学", "major": "通信工程"}),
+    ])
+
+    assert [kind for kind, _ in prompts] == ["batch_scoring", "subjective_scoring"]
+    assert "## 简历 1" in prompts[0][1] and "## 简历 2" in prompts[0][1]
+    assert results["resume-a"]["total_score"] == 5 + 10 + 8 + 6 + 7 + 1
+    assert results["resume-b"]["score_details"]["quality_score"]["score"] == 2
+    assert results["resume-b"]["score_details"]["school_score"]["score"] == 10
+
+
+@pytest.mark.asyncio
+async def test_batch_scoring_usage_split_across_resumes(monkeypatch):
+    """测试批量评分的用量在本批简历之间平均分摊，单独评分的用量记在对应简历上"""
+    monkeypatch.setattr(ai_service.settings, "local_rule_scoring", True)
+    monkeypatch.setattr(ai_service.settings, "llm_batch_max_size", 8)
+    monkeypatch.setattr(ai_service.settings, "llm_batch_token_budget", 100000)
+    monkeypatch.setattr(ai_service.settings, "llm_reask_missing_fields", False)
+    monkeypatch.setattr(ai_service.settings, "llm_usage_tracking", True)
+    recorded = []
+    monkeypatch.setattr(ai_service, "record_llm_usage", lambda **kwargs: recorded.append(kwargs))
+    batch_response = json.dumps({"results": [
+        {"resume_id": str(index), "score_details": {"highlight_score": {"score": 6, "reason": "ACM"}}}
+        for index in (1, 2, 3)
+    ]})
+    single_response = '{"total_score": 2, "score_details": {"quality_score": {"score": 2, "reason": "量化"}}}'
+    service = AIService(user_id="u1")
+    service.reference = REFERENCE
+
+    async def fake_call(prompt: str, prompt_kind: str = "default", **kwargs) -> str:
+        if prompt_kind == "batch_scoring":
+            await service._record_usage(prompt_kind, "m", 101, 20, estimated=False)
+            return batch_response
+        await service._record_usage(prompt_kind, "m", 40, 8, estimated=False)
+        return single_response
+
+    service._call_openai = fake_call
+    await service.score_resumes_batch([
+        (resume_id, f"简历{resume_id}", {"school_name": "四川大学"}) for resume_id in ("a", "b", "c")
+    ])
+
+    usage = sorted((item["resume_id"], item["call_type"], item["prompt_tokens"], item["completion_tokens"]) for item in recorded)
+    assert usage == [
+        ("a", "batch_scoring", 34, 7), ("b", "batch_scoring", 34, 7), ("c", "batch_scoring", 33, 6),
+    ]
+    assert {item["user_id"] for item in recorded} == {"u1"}
+
+    recorded.clear()
+    batch_response = json.dumps({"results": []})
+    await service.score_resumes_batch([("a", "简历a", {}), ("b", "简历b", {})])
+    assert sorted(item["resume_id"] for item in recorded if item["call_type"] == "subjective_scoring") == ["a", "b"]
+    assert sum(item["prompt_tokens"] for item in recorded if item["call_type"] == "batch_scoring") == 101
+
+
+def test_pack_scoring_batches(monkeypatch):
+    """测试按数量上限和token预算分组"""
+    monkeypatch.setattr(ai_service.settings, "llm_batch_max_size", 2)
+    monkeypatch.setattr(ai_service.settings, "llm_batch_token_budget", 10 ** 6)
+    service = AIService()
+    items = [(f"r{index}", "内容", {}) for index in range(5)]
+    assert [len(batch) for batch in service._pack_scoring_batches(items)] == [2, 2, 1]
+
+    monkeypatch.setattr(ai_service.settings, "llm_batch_max_size", 10)
+    rules_tokens = ai_service.estimate_tokens(service._batch_scoring_rules())
+    monkeypatch.setattr(ai_service.settings, "llm_batch_token_budget", rules_tokens + 5)
+    items = [(f"r{index}", "简历内容", {}) for index in range(3)]
+    assert [len(batch) for batch in service._pack_scoring_batches(items)] == [1, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_scoring_prompt_trimmed_to_token_budget(monkeypatch):
+    """测试评分提示词中的简历内容按token预算裁剪，提取使用完整内容"""
+    monkeypatch.setattr(ai_service.settings, "local_rule_scoring", False)
+    monkeypatch.setattr(ai_service.settings, "markdown_compaction", True)
+    monkeypatch.setattr(ai_service.settings, "markdown_token_budget", 40)
+    content = "### 张三\n### 项目经历\n简历解析系统\n### 自我评价\n" + "热爱技术乐于学习\n" * 20
+    response = json.dumps({
+        "total_score": 0,
+        "score_details": {name: {"score": 0, "reason": ""} for name in ai_service.DIMENSION_LABELS}
+    })
+    service, prompts = _make_sequence_service([response])
+
+    await service.score_resume(content, {"name": "张三"})
+
+    assert "简历解析系统" in prompts[0][1]
+    assert prompts[0][1].count("热爱技术乐于学习") < 20
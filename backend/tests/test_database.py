@@ -0,0 +1,22 @@
+"""
+数据库表结构补齐测试
+"""
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import add_missing_columns
+
+
+def test_add_missing_columns_to_existing_table():
+    """测试为旧版本创建的表补齐新增的列和索引，重复执行不报错"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE resume_data (id VARCHAR(36) PRIMARY KEY, filename VARCHAR(255))"))
+
+    add_missing_columns(engine)
+    add_missing_columns(engine)
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("resume_data")}
+    assert {"content_hash", "page_hashes"} <= columns
+    assert any(index["column_names"] == ["content_hash"] for index in inspector.get_indexes("resume_data"))
@@ -0,0 +1,124 @@
+"""
+文档文本提取器测试
+"""
+
+import io
+import time
+
+import docx
+import fitz
+import pytest
+
+from app.services.resume_service import ResumeService
+from app.utils import document_extractors, file_processor
+from app.utils.document_extractors import DocumentExtractor, get_extractor, register_extractor
+from app.utils.file_processor import FileProcessor, _convert_pdf_range
+from app.utils.pdf_sandbox import open_buffer
+
+
+class UpperExtractor(DocumentExtractor):
+    """测试用提取器，在进程池中执行，需定义在模块顶层"""
+
+    def extract_pages(self, buffer, max_pages=0):
+        return [bytes(buffer).decode().upper()]
+
+
+class SlowExtractor(DocumentExtractor):
+    """测试用提取器，解析耗时超过总耗时上限"""
+
+    def extract_pages(self, buffer, max_pages=0):
+        time.sleep(10)
+        return [""]
+
+
+def _pdf_bytes(pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _docx_bytes():
+    document = docx.Document()
+    document.add_paragraph("Zhang San")
+    document.add_paragraph("Education")
+    table = document.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Python"
+    table.rows[0].cells[1].text = "Go"
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def test_open_buffer_reads_small_files_and_maps_large_files(tmp_path):
+    """测试小文件一次读入内存，大文件使用内存映射"""
+    path = tmp_path / "resume.pdf"
+    path.write_bytes(_pdf_bytes(["Page one", "Page two"]))
+
+    with open_buffer(str(path), mmap_threshold=1 << 30) as buffer:
+        assert isinstance(buffer, bytes)
+    with open_buffer(str(path), mmap_threshold=0) as buffer:
+        assert isinstance(buffer, memoryview)
+        with fitz.open(stream=buffer, filetype="pdf") as doc:
+            assert doc.load_page(1).get_text().strip() == "Page two"
+
+    page_count, pages = _convert_pdf_range(str(path), 0, 8, max_pages=10, mmap_threshold=0)
+    assert page_count == 2
+    assert [text.strip("# ") for _, text in pages] == ["Page one", "Page two"]
+
+
+@pytest.mark.asyncio
+async def test_extract_text_from_memory():
+    """测试PDF、DOCX、TXT从内存中的文件内容提取"""
+    processor = FileProcessor()
+
+    pdf_markdown = await processor.extract_text(_pdf_bytes(["Zhang San"]), "pdf")
+    assert "Zhang San" in pdf_markdown
+
+    docx_markdown = await processor.extract_text(_docx_bytes(), "docx")
+    assert "Zhang San" in docx_markdown
+    assert "Python Go" in docx_markdown
+
+    txt_markdown = await processor.extract_text("张三\n教育经历".encode("gb18030"), "txt")
+    assert "张三" in txt_markdown
+
+    with pytest.raises(Exception, match="文件头"):
+        await processor.extract_text(b"not a pdf", "pdf")
+    with pytest.raises(ValueError, match="不支持"):
+        await processor.extract_text(b"", "rtf")
+
+
+@pytest.mark.asyncio
+async def test_extract_text_from_memory_in_sandbox(monkeypatch):
+    """测试沙箱模式下内存中的文件内容也在进程池中解析，超时时终止解析"""
+    monkeypatch.setattr(document_extractors, "_extractors", dict(document_extractors._extractors))
+    settings = file_processor.get_settings()
+    monkeypatch.setattr(settings, "pdf_sandbox", True)
+    assert "Zhang San" in await FileProcessor().extract_text(_pdf_bytes(["Zhang San"]), "pdf")
+
+    register_extractor("slow", SlowExtractor())
+    monkeypatch.setattr(settings, "pdf_sandbox_timeout", 0.5)
+    with pytest.raises(Exception, match="未完成"):
+        await FileProcessor().extract_text(b"slow", "slow")
+
+
+@pytest.mark.asyncio
+async def test_register_extractor(tmp_path, monkeypatch):
+    """测试注册自定义格式的提取器，并从文件路径提取"""
+    monkeypatch.setattr(document_extractors, "_extractors", dict(document_extractors._extractors))
+    register_extractor("md", UpperExtractor())
+    assert isinstance(get_extractor("MD"), UpperExtractor)
+    path = tmp_path / "resume.md"
+    path.write_text("zhang san")
+    assert "ZHANG SAN" in await FileProcessor().extract_text(str(path), "md")
+
+
+@pytest.mark.asyncio
+async def test_upload_resume_extracts_from_memory(tmp_path):
+    """测试上传简历时直接从内存中的文件内容提取文本"""
+    service = ResumeService(upload_dir=str(tmp_path))
+    resume = await service.upload_resume("张三\n教育经历".encode("utf-8"), "resume.txt", user_id="u1")
+    assert "张三" in resume.content
+    assert resume.file_path.endswith(".txt")
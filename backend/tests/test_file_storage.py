@@ -0,0 +1,179 @@
+"""
+流式上传存储测试
+"""
+
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db_models import Base, ResumeDB, ResumeFormatEnum
+from app.services.resume_service import ResumeService
+from app.utils.file_storage import remove_unreferenced_file, save_upload_stream, upload_suffix, UploadTooLargeError
+
+
+class FakeUpload:
+    """模拟UploadFile的异步分块读取"""
+
+    def __init__(self, content: bytes):
+        self._buffer = io.BytesIO(content)
+        self.reads = []
+
+    async def read(self, size: int = -1) -> bytes:
+        chunk = self._buffer.read(size)
+        self.reads.append(len(chunk))
+        return chunk
+
+
+@pytest.mark.asyncio
+async def test_save_upload_stream_writes_in_chunks(temp_upload_dir):
+    """测试分块写入并计算摘要"""
+    content = os.urandom(10 * 1024 + 7)
+    upload = FakeUpload(content)
+
+    stored = await save_upload_stream(
+        upload, temp_upload_dir, "resume.pdf",
+        max_file_size=1024 * 1024, chunk_size=1024
+    )
+
+    assert stored.size == len(content)
+    assert stored.sha256 == hashlib.sha256(content).hexdigest()
+    assert max(upload.reads) <= 1024
+    with open(stored.path, "rb") as f:
+        assert f.read() == content
+    assert os.listdir(temp_upload_dir) == ["resume.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_save_upload_stream_rejects_oversized_file(temp_upload_dir):
+    """测试超过单文件大小限制时中止并清理临时文件"""
+    upload = FakeUpload(b"x" * 5000)
+
+    with pytest.raises(UploadTooLargeError) as exc_info:
+        await save_upload_stream(
+            upload, temp_upload_dir, "big.pdf",
+            max_file_size=4096, chunk_size=1024
+        )
+
+    assert not exc_info.value.batch
+    assert sum(upload.reads) <= 5 * 1024
+    assert os.listdir(temp_upload_dir) == []
+
+
+@pytest.mark.asyncio
+async def test_save_upload_stream_rejects_batch_overflow(temp_upload_dir):
+    """测试超过批量剩余额度时抛出批量错误"""
+    upload = FakeUpload(b"x" * 3000)
+
+    with pytest.raises(UploadTooLargeError) as exc_info:
+        await save_upload_stream(
+            upload, temp_upload_dir, "batch.pdf",
+            max_file_size=10000, max_total_size=2048, chunk_size=1024
+        )
+
+    assert exc_info.value.batch
+    assert os.listdir(temp_upload_dir) == []
+
+
+@pytest.mark.asyncio
+async def test_save_upload_stream_content_addressed_dedup(temp_upload_dir):
+    """测试按内容摘要命名时相同内容只存储一份"""
+    content = b"%PDF-1.4 same resume"
+
+    first = await save_upload_stream(
+        FakeUpload(content), temp_upload_dir, None,
+        max_file_size=1024, suffix=".pdf"
+    )
+    second = await save_upload_stream(
+        FakeUpload(content), temp_upload_dir, None,
+        max_file_size=1024, suffix=".pdf"
+    )
+
+    assert first.path == second.path
+    assert os.path.basename(first.path) == f"{first.sha256}.pdf"
+    assert not first.deduplicated
+    assert second.deduplicated
+    assert os.listdir(temp_upload_dir) == [f"{first.sha256}.pdf"]
+
+
+def test_upload_suffix():
+    """测试扩展名优先取Content-Type，其次取文件名中的已知扩展名"""
+    assert upload_suffix("resume", "application/pdf") == ".pdf"
+    assert upload_suffix("resume.PDF", "application/octet-stream") == ".pdf"
+    assert upload_suffix("resume.docx", None) == ".docx"
+    assert upload_suffix("resume.exe", "application/octet-stream") == ""
+
+
+def _old_file(path: str) -> str:
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4 resume")
+    past = time.time() - 3600
+    os.utime(path, (past, past))
+    return path
+
+
+def test_remove_unreferenced_file(temp_upload_dir):
+    """测试只删除无引用且不是最近写入的文件"""
+    path = _old_file(os.path.join(temp_upload_dir, "a.pdf"))
+    assert not remove_unreferenced_file(path, lambda: True)
+    assert os.path.exists(path)
+
+    assert remove_unreferenced_file(path, lambda: False)
+    assert os.listdir(temp_upload_dir) == []
+    assert not remove_unreferenced_file(path, lambda: False)
+
+
+@pytest.mark.asyncio
+async def test_remove_keeps_file_reused_by_concurrent_upload(temp_upload_dir):
+    """测试删除与相同内容的上传并发时不会删掉上传正在复用的文件"""
+    content = b"%PDF-1.4 same resume"
+    path = os.path.join(temp_upload_dir, f"{hashlib.sha256(content).hexdigest()}.pdf")
+
+    # 上传在删除检查引用之后、改名之前写入：移开的是刚写入的文件，放回原处
+    _old_file(path)
+    stored = await save_upload_stream(FakeUpload(content), temp_upload_dir, None, max_file_size=1024, suffix=".pdf")
+    assert stored.deduplicated and stored.path == path
+    assert not remove_unreferenced_file(path, lambda: False)
+    assert os.listdir(temp_upload_dir) == [os.path.basename(path)]
+
+    # 上传在改名之后写入：删除移开的旧文件，保留新文件
+    _old_file(path)
+    checks = []
+
+    def is_referenced() -> bool:
+        checks.append(path)
+        if len(checks) == 2:
+            with open(path, "wb") as f:
+                f.write(content)
+        return False
+
+    assert remove_unreferenced_file(path, is_referenced)
+    assert len(checks) == 2
+    assert os.listdir(temp_upload_dir) == [os.path.basename(path)]
+    with open(path, "rb") as f:
+        assert f.read() == content
+
+
+def test_delete_resume_removes_file_after_last_reference(temp_upload_dir):
+    """测试删除简历时共享的文件保留到最后一条引用被删除"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    path = _old_file(os.path.join(temp_upload_dir, "shared.pdf"))
+    for resume_id in ("r1", "r2"):
+        db.add(ResumeDB(
+            id=resume_id, filename="a.pdf", format=ResumeFormatEnum.PDF, content="", file_size=1,
+            user_id="u1", file_path=path
+        ))
+    db.commit()
+
+    service = ResumeService(upload_dir=temp_upload_dir, db=db)
+    assert service.delete_resume("r1", "u1")
+    assert os.path.exists(path)
+    assert service.delete_resume("r2", "u1")
+    assert not os.path.exists(path)
+    db.close()
@@ -0,0 +1,29 @@
+"""
+容错JSON解析测试
+"""
+
+import pytest
+
+from app.utils.json_repair import JSONRepairError, loads_lenient
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('~~~\n{"a": 1}\n~~~', {"a": 1}),
+    ('好的，结果如下：\n{"a": 1}\n以上是提取结果。', {"a": 1}),
+    ('{"a": [1, 2,], "b": None, "c": "None",}', {"a": [1, 2], "b": None, "c": "None"}),
+    ('{"a": 1, "b": "张', {"a": 1, "b": "张"}),
+    ('{"a": 1, "b": ', {"a": 1}),
+    ('{"a": {"x": [1, 2', {"a": {"x": [1, 2]}}),
+    ('{"a": 1, "na', {"a": 1}),
+])
+def test_repairs_common_deviations(text, expected):
+    """测试常见的输出偏差可以被修复"""
+    assert loads_lenient(text) == expected
+
+
+def test_unrecoverable_output():
+    """测试不包含JSON的输出"""
+    with pytest.raises(JSONRepairError):
+        loads_lenient("抱歉，我无法处理这份简历。")
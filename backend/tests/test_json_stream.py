@@ -0,0 +1,63 @@
+"""
+增量JSON解析测试
+"""
+
+import json
+
+import pytest
+
+from app.utils.json_stream import IncrementalJSONParser, JSONStreamError
+
+
+def _feed_in_chunks(parser, text, size=3):
+    completed = {}
+    for start in range(0, len(text), size):
+        completed.update(parser.feed(text[start:start + size]))
+    return completed
+
+
+def test_fields_emitted_as_they_complete():
+    """测试关注字段在值完整时立即返回"""
+    parser = IncrementalJSONParser(watch=["name", "school_name", "total_score"])
+
+    assert parser.feed('```json\n{"name": "张') == {}
+    assert parser.feed('三", "skills": ["a", "b"], "school_name"') == {"name": "张三"}
+    assert parser.feed(': "四川大学", "total_score": 4') == {"school_name": "四川大学"}
+    assert parser.feed("2}\n```") == {"total_score": 42}
+    assert parser.finished
+
+
+def test_nested_paths_and_escapes():
+    """测试嵌套路径、数组下标和转义字符"""
+    document = {
+        "extracted_info": {"name": "Li \"Lei\"\n", "projects": [{"name": "p1"}, {"name": "p2"}]},
+        "score_details": {"major_score": {"score": 8, "reason": "计算机"}},
+        "flag": None,
+    }
+    parser = IncrementalJSONParser(watch=[
+        "extracted_info.name", "extracted_info.projects.1.name",
+        "score_details.major_score.score", "flag",
+    ])
+    completed = _feed_in_chunks(parser, json.dumps(document, ensure_ascii=False, indent=2))
+
+    assert completed == {
+        "extracted_info.name": "Li \"Lei\"\n",
+        "extracted_info.projects.1.name": "p2",
+        "score_details.major_score.score": 8,
+        "flag": None,
+    }
+    assert parser.finished
+
+
+@pytest.mark.parametrize("text", [
+    '{"name" "张三"}',
+    '{"name": 张三}',
+    '{"a": 1 "b": 2}',
+    '{"a": tru}',
+    "抱歉，我无法处理这份简历。" * 20,
+])
+def test_malformed_output_detected(text):
+    """测试非法输出尽早报错"""
+    parser = IncrementalJSONParser(max_preamble=50)
+    with pytest.raises(JSONStreamError):
+        _feed_in_chunks(parser, text)
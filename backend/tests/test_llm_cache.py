@@ -0,0 +1,67 @@
+"""
+大模型响应缓存测试
+"""
+
+import time
+
+from app.services.llm_cache import LLMCache, make_cache_key
+
+
+def test_cache_key_depends_on_version():
+    """测试缓存键区分模型、模板版本和提示词"""
+    key = make_cache_key("gpt", "extraction:1", "prompt")
+    assert key == make_cache_key("gpt", "extraction:1", "prompt")
+    assert key != make_cache_key("gpt", "extraction:2", "prompt")
+    assert key != make_cache_key("gpt-4", "extraction:1", "prompt")
+    assert key != make_cache_key("gpt", "extraction:1", "prompt2")
+
+
+def test_get_set_and_hit_ratio(tmp_path):
+    """测试读写缓存及命中率统计"""
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"))
+    key = make_cache_key("gpt", "extraction:1", "prompt")
+
+    assert cache.get_sync(key) is None
+    cache.set_sync(key, "gpt", "extraction:1", '{"name": "张三"}')
+    assert cache.get_sync(key) == '{"name": "张三"}'
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+    assert stats["entries"] == 1
+
+    cache.close()
+
+
+def test_ttl_expiry(tmp_path):
+    """测试过期条目不再返回"""
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), ttl=1)
+    cache.set_sync("key", "gpt", "scoring:1", "{}")
+    cache._conn.execute("UPDATE llm_cache SET created_at = ?", (time.time() - 10,))
+    assert cache.get_sync("key") is None
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    """测试超过容量时淘汰最久未使用的条目"""
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    for index in range(3):
+        cache.set_sync(f"key-{index}", "gpt", "scoring:1", "{}")
+        cache._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (index, f"key-{index}"))
+    cache._prune_locked(time.time())
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get_sync("key-0") is None
+    cache.close()
+
+
+def test_clear_by_prompt_version(tmp_path):
+    """测试按模板版本清除缓存"""
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"))
+    cache.set_sync("a", "gpt", "extraction:1", "{}")
+    cache.set_sync("b", "gpt", "scoring:1", "{}")
+
+    assert cache.clear_sync("extraction:1") == 1
+    assert cache.get_sync("b") == "{}"
+    cache.close()
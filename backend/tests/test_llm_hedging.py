@@ -0,0 +1,85 @@
+"""
+大模型请求对冲测试
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.llm_hedging import HedgeBudget, hedged_call
+
+
+def _make_request(delays, results):
+    """构造按调用顺序使用不同延迟和结果的请求函数"""
+    calls = []
+    cancelled = []
+
+    async def request():
+        index = len(calls)
+        calls.append(index)
+        try:
+            await asyncio.sleep(delays[index])
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        result = results[index]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return request, calls, cancelled
+
+
+@pytest.mark.asyncio
+async def test_fast_request_not_hedged():
+    """测试请求在延迟阈值内返回时不发送对冲请求"""
+    request, calls, _ = _make_request([0], ["primary"])
+    budget = HedgeBudget(ratio=1.0)
+
+    assert await hedged_call(request, 0.5, budget) == "primary"
+    assert calls == [0]
+    assert budget.stats()["hedged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_request_hedged_and_cancelled():
+    """测试慢请求被对冲，对冲请求胜出后原请求被取消"""
+    request, calls, cancelled = _make_request([1.0, 0], ["primary", "hedge"])
+    budget = HedgeBudget(ratio=1.0)
+
+    assert await hedged_call(request, 0.01, budget) == "hedge"
+    await asyncio.sleep(0)
+    assert calls == [0, 1]
+    assert cancelled == [0]
+    assert budget.stats()["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalid_result_waits_for_other_request():
+    """测试先返回的结果无效时等待另一个请求"""
+    request, _, _ = _make_request([0.05, 0.01], ["primary", "invalid"])
+    budget = HedgeBudget(ratio=1.0)
+
+    assert await hedged_call(request, 0.01, budget, is_valid=lambda result: result != "invalid") == "primary"
+    assert budget.stats()["hedge_wins"] == 0
+
+
+@pytest.mark.asyncio
+async def test_error_falls_back_to_first_failure():
+    """测试两个请求都失败时抛出最先结束的请求的异常"""
+    request, _, _ = _make_request([0.05, 0.01], [RuntimeError("primary"), RuntimeError("hedge")])
+
+    with pytest.raises(RuntimeError, match="hedge"):
+        await hedged_call(request, 0.01, HedgeBudget(ratio=1.0))
+
+
+def test_budget_caps_hedge_ratio():
+    """测试对冲请求数不超过预算比例"""
+    budget = HedgeBudget(ratio=0.25)
+    granted = 0
+    for _ in range(20):
+        budget.record_call()
+        granted += budget.try_acquire()
+
+    assert granted == 5
+    assert budget.stats()["rejected"] == 15
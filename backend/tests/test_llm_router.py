@@ -0,0 +1,208 @@
+"""
+大模型多端点路由测试
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import llm_router
+from app.services.llm_router import (
+    CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, Endpoint, EndpointConfig, LLMRouter, NoEndpointAvailableError,
+    load_endpoint_configs
+)
+
+
+def _endpoint(name: str, weight: float = 1.0, requests_per_minute: int = 0, **kwargs) -> Endpoint:
+    config = EndpointConfig(
+        name=name, base_url=f"http://{name}.test/v1", model="m",
+        weight=weight, requests_per_minute=requests_per_minute
+    )
+    return Endpoint(config, client=object(), **kwargs)
+
+
+def _failure() -> Exception:
+    return httpx.ConnectError("connection refused")
+
+
+@pytest.mark.asyncio
+async def test_routes_to_lowest_latency():
+    """测试优先选择加权EWMA延迟最低的端点"""
+    slow, fast = _endpoint("slow"), _endpoint("fast")
+    slow.ewma_latency, fast.ewma_latency = 2.0, 0.5
+    router = LLMRouter([slow, fast])
+
+    used = []
+
+    async def request(endpoint):
+        used.append(endpoint.name)
+        return endpoint.name
+
+    assert await router.run(request) == "fast"
+    # 权重足够大时慢端点也会被优先选择
+    slow.config.weight = 10
+    assert await router.run(request) == "slow"
+    assert used == ["fast", "slow"]
+
+
+@pytest.mark.asyncio
+async def test_failover_and_circuit_breaker():
+    """测试端点故障时换用其他端点，连续失败后熔断，冷却后探测成功恢复"""
+    broken = _endpoint("broken", failure_threshold=2, cooldown=60)
+    healthy = _endpoint("healthy")
+    healthy.ewma_latency = 10.0
+    router = LLMRouter([broken, healthy])
+
+    async def request(endpoint):
+        if endpoint.name == "broken":
+            raise _failure()
+        return endpoint.name
+
+    assert await router.run(request) == "healthy"
+    assert await router.run(request) == "healthy"
+    assert broken.state == CIRCUIT_OPEN
+    assert broken.stats()["failures"] == 2
+
+    # 熔断期间不再选择该端点
+    assert await router.run(request) == "healthy"
+    assert broken.stats()["failures"] == 2
+
+    # 冷却结束后放行一个探测请求，成功即恢复
+    broken.opened_at -= 61
+
+    async def recovered(endpoint):
+        return endpoint.name
+
+    assert await router.run(recovered) == "broken"
+    assert broken.state == CIRCUIT_CLOSED
+
+
+@pytest.mark.asyncio
+async def test_request_errors_do_not_trip_breaker():
+    """测试请求本身的错误不计入端点故障，也不重试"""
+    endpoint = _endpoint("only", failure_threshold=1)
+    router = LLMRouter([endpoint])
+
+    async def request(_):
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await router.run(request)
+    assert endpoint.state == CIRCUIT_CLOSED
+    assert endpoint.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_all_endpoints_failing_raises():
+    """测试所有端点都故障时抛出最后一个异常"""
+    router = LLMRouter([_endpoint("a"), _endpoint("b")])
+
+    async def request(endpoint):
+        raise _failure()
+
+    with pytest.raises(httpx.ConnectError):
+        await router.run(request)
+
+
+def test_rate_limit_and_half_open_probe():
+    """测试每分钟请求数限制和半开状态只放行一个探测请求"""
+    endpoint = _endpoint("limited", requests_per_minute=2, failure_threshold=1, cooldown=5)
+    endpoint.end(endpoint.begin(100.0))
+    endpoint.end(endpoint.begin(101.0))
+    assert endpoint.wait_time(102.0) == pytest.approx(58.0)
+    assert endpoint.wait_time(160.5) == 0
+
+    endpoint.record_failure(200.0)
+    assert not endpoint.available(201.0)
+    assert endpoint.available(206.0)
+    assert endpoint.state == CIRCUIT_HALF_OPEN
+    assert endpoint.begin(206.0)
+    assert not endpoint.available(206.5)
+    endpoint.end(True)
+    endpoint.record_failure(207.0)
+    assert endpoint.state == CIRCUIT_OPEN
+
+
+def test_only_probe_end_releases_half_open():
+    """测试熔断前发出的请求结束时不会放行第二个探测请求"""
+    endpoint = _endpoint("e", failure_threshold=1, cooldown=5)
+    stale = endpoint.begin(100.0)
+    endpoint.record_failure(100.0)
+    assert endpoint.available(106.0)
+    probe = endpoint.begin(106.0)
+    assert probe and not stale
+
+    endpoint.end(stale)
+    assert not endpoint.available(106.5)
+    endpoint.end(probe)
+    assert endpoint.available(107.0)
+
+
+@pytest.mark.asyncio
+async def test_open_circuits_fail_fast():
+    """测试多个端点都熔断时立即失败，不在占用调度名额时等待冷却"""
+    endpoints = [_endpoint(name, failure_threshold=1, cooldown=60) for name in ("a", "b")]
+    router = LLMRouter(endpoints)
+
+    async def request(_):
+        raise _failure()
+
+    with pytest.raises(httpx.ConnectError):
+        await router.run(request)
+    assert [endpoint.state for endpoint in endpoints] == [CIRCUIT_OPEN, CIRCUIT_OPEN]
+    with pytest.raises(NoEndpointAvailableError):
+        await asyncio.wait_for(router.run(request), timeout=0.5)
+
+
+@pytest.mark.asyncio
+async def test_single_endpoint_waits_for_cooldown():
+    """测试唯一端点熔断时等待冷却结束后发送探测请求，而不是让排队的请求全部失败"""
+    endpoint = _endpoint("only", failure_threshold=1, cooldown=0.2)
+    router = LLMRouter([endpoint])
+
+    async def failing(_):
+        raise _failure()
+
+    async def request(_):
+        return "ok"
+
+    with pytest.raises(httpx.ConnectError):
+        await router.run(failing)
+    assert endpoint.state == CIRCUIT_OPEN
+    assert 0 < endpoint.cooldown_remaining(endpoint.opened_at + 0.1) < 0.2
+    assert await asyncio.wait_for(router.run(request), timeout=2) == "ok"
+    assert endpoint.state == CIRCUIT_CLOSED
+
+
+@pytest.mark.asyncio
+async def test_client_does_not_retry():
+    """测试端点客户端不自动重试，重试由调度器、路由和任务队列负责"""
+    endpoint = Endpoint(EndpointConfig(name="e", base_url="http://e.test/v1", api_key="k", model="m"))
+    try:
+        assert endpoint.client().max_retries == 0
+    finally:
+        await endpoint.close()
+
+
+def test_load_endpoint_configs(monkeypatch):
+    """测试端点配置解析，未填写的字段使用OPENAI_*配置"""
+    settings = llm_router.get_settings()
+    monkeypatch.setattr(settings, "llm_endpoints", "")
+    configs = load_endpoint_configs()
+    assert [config.name for config in configs] == ["default"]
+    assert configs[0].model == settings.openai_model
+
+    monkeypatch.setattr(
+        settings, "llm_endpoints",
+        '[{"name": "a", "base_url": "http://a/v1", "weight": 2}, {"base_url": "http://b/v1", "model": "qwen"}]'
+    )
+    configs = load_endpoint_configs()
+    assert [config.name for config in configs] == ["a", "endpoint-2"]
+    assert configs[0].weight == 2
+    assert configs[0].model == settings.openai_model
+    assert configs[1].model == "qwen"
+
+    monkeypatch.setattr(settings, "llm_endpoints", "[1]")
+    with pytest.raises(ValueError):
+        load_endpoint_configs()
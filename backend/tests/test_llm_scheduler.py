@@ -0,0 +1,154 @@
+"""
+大模型请求调度测试
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.llm_scheduler import AIMDLimit, LLMScheduler
+from app.utils.tokens import estimate_tokens
+
+
+@pytest.mark.asyncio
+async def test_in_flight_cap():
+    """测试进行中的请求数不超过上限"""
+    scheduler = LLMScheduler(max_in_flight=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with scheduler.slot("user-1", 10):
+            peak = max(peak, scheduler.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert peak == 2
+    assert scheduler.in_flight == 0
+    assert scheduler.queue_length == 0
+
+
+@pytest.mark.asyncio
+async def test_round_robin_between_users():
+    """测试名额在用户之间轮转分配"""
+    scheduler = LLMScheduler(max_in_flight=1)
+    order = []
+    blocker = await scheduler.acquire("busy", 10)
+
+    async def call(user_id):
+        async with scheduler.slot(user_id, 10):
+            order.append(user_id)
+
+    tasks = [asyncio.create_task(call("busy")) for _ in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(call("other")))
+    await asyncio.sleep(0)
+    assert scheduler.queue_length == 4
+
+    scheduler.release(blocker)
+    await asyncio.gather(*tasks)
+
+    assert order[:2] == ["busy", "other"]
+
+
+@pytest.mark.asyncio
+async def test_token_budget_and_refund():
+    """测试token预算不足时等待，并按实际用量退还"""
+    scheduler = LLMScheduler(max_in_flight=10, tokens_per_minute=600)
+
+    lease = await scheduler.acquire("user-1", 600)
+    waiter = asyncio.create_task(scheduler.acquire("user-2", 300))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    lease.used_tokens = 100
+    scheduler.release(lease)
+    second = await asyncio.wait_for(waiter, 1)
+    scheduler.release(second)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_removed():
+    """测试取消等待中的请求后不占用队列"""
+    scheduler = LLMScheduler(max_in_flight=1)
+    lease = await scheduler.acquire("user-1", 10)
+    waiter = asyncio.create_task(scheduler.acquire("user-2", 10))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert scheduler.queue_length == 0
+    scheduler.release(lease)
+    assert scheduler.in_flight == 0
+
+
+def test_estimate_tokens():
+    """测试token估算"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("四川大学") == 4
+    assert estimate_tokens("abcdefgh") == 2
+
+
+def test_aimd_additive_increase():
+    """测试延迟稳定时并发上限逐步上调且不超过最大值"""
+    limit = AIMDLimit(initial_limit=2, min_limit=1, max_limit=4)
+    for _ in range(50):
+        limit.on_success(1.0)
+
+    assert limit.current == 4
+    assert limit.increases == 2
+
+
+def test_aimd_multiplicative_decrease():
+    """测试过载时并发上限减半，同一往返时间内只下调一次"""
+    limit = AIMDLimit(initial_limit=8, min_limit=1, max_limit=16)
+    limit.on_success(1.0)
+
+    limit.on_overload()
+    limit.on_overload()
+    assert limit.current == 4
+    assert limit.decreases == 1
+
+    limit.on_success(5.0)
+    assert limit.current == 4
+
+
+def test_aimd_latency_baseline_per_call_kind():
+    """测试延迟基线按调用类型维护，耗时较长的调用类型不会触发下调"""
+    limit = AIMDLimit(initial_limit=8, min_limit=1, max_limit=16)
+    limit.on_success(1.0, kind="extraction_reask")
+    limit.on_success(10.0, kind="combined")
+    limit.on_success(11.0, kind="combined")
+    limit.on_success(1.2, kind="extraction_reask")
+    assert limit.current == 8
+    assert limit.decreases == 0
+
+    limit.on_success(5.0, kind="extraction_reask")
+    assert limit.current == 4
+
+
+def test_aimd_not_increased_when_idle():
+    """测试并发未用满时不上调上限"""
+    limit = AIMDLimit(initial_limit=2, min_limit=1, max_limit=8)
+    for _ in range(20):
+        limit.on_success(1.0, saturated=False)
+    assert limit.current == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_uses_adaptive_limit():
+    """测试调度器按自适应上限放行请求"""
+    scheduler = LLMScheduler(
+        max_in_flight=10,
+        adaptive_limit=AIMDLimit(initial_limit=1, min_limit=1, max_limit=10)
+    )
+    lease = await scheduler.acquire("user-1", 10)
+    waiter = asyncio.create_task(scheduler.acquire("user-1", 10))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    assert scheduler.stats()["limit"] == 1
+
+    scheduler.release(lease)
+    scheduler.release(await waiter)
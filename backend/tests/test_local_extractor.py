@@ -0,0 +1,188 @@
+"""
+本地预提取测试
+"""
+
+import fitz
+import pytest
+
+from app.services import ai_service
+from app.services.ai_service import AIService
+from app.services.local_extractor import fast_extract, pre_extract, scoring_fields_differ
+from app.utils.file_processor import FileProcessor
+from tests.test_ai_service import _make_service, _make_sequence_service
+from tests.test_scoring_rules import REFERENCE
+
+RESUME = """# 张三
+电话：13800138000
+
+## 教育经历
+西南交通大学 计算机科学与技术 本科 2019.09 - 2023.06
+
+## 项目经历
+参与某大学生创新项目
+"""
+
+
+def test_pre_extract_from_reference_school():
+    """测试按参考名单识别学校，并在学校所在行识别专业"""
+    info = pre_extract(RESUME, REFERENCE)
+    assert info == {
+        "name": "张三",
+        "school_name": "西南交通大学",
+        "school_city": "成都",
+        "major": "计算机科学与技术",
+        "education_level": "本科",
+    }
+
+
+def test_pre_extract_labeled_fields():
+    """测试识别"姓名：""学校：""专业："等标注和最高学历"""
+    content = "姓名：李四\n学校：成都信息工程大学\n专业：通信工程\n学历：硕士研究生（本科毕业于某学院）"
+    info = pre_extract(content, REFERENCE)
+    assert info["name"] == "李四"
+    assert info["school_name"] == "成都信息工程大学"
+    assert info["school_city"] is None
+    assert info["major"] == "通信工程"
+    assert info["education_level"] == "硕士"
+
+
+def test_fast_extract():
+    """测试正则快速提取手机号、邮箱、毕业年份和学校"""
+    content = RESUME + "邮箱：zhang.san@example.com\n电话：+86 139-1234-5678"
+    assert fast_extract(content, REFERENCE) == {
+        "phone": "13800138000",
+        "email": "zhang.san@example.com",
+        "graduation_year": "2023",
+        "school_name": "西南交通大学",
+    }
+    assert fast_extract("2024届毕业，毕业于某某学院", REFERENCE) == {"graduation_year": "2024"}
+    # 身份证号等更长的数字串不是手机号
+    assert fast_extract("证件号 510104199901011234", REFERENCE) == {}
+
+
+def test_fast_extract_school_only_from_education_section():
+    """测试项目经历中提到的参考名单院校不作为本地提取的学校"""
+    content = """# 李四
+
+## 项目经历
+与四川大学合作开发教务系统
+
+## 教育背景
+成都某某学院 软件工程 本科 2019 - 2023
+"""
+    assert "school_name" not in fast_extract(content, REFERENCE)
+    # 没有教育经历标题时不直接填入，只作为评分时的假定值
+    assert "school_name" not in fast_extract("李四 四川大学 软件工程", REFERENCE)
+    assert pre_extract("李四 四川大学 软件工程", REFERENCE)["school_name"] == "四川大学"
+
+    content = content.replace("成都某某学院", "西南交通大学")
+    assert fast_extract(content, REFERENCE)["school_name"] == "西南交通大学"
+
+
+@pytest.mark.asyncio
+async def test_fast_extract_on_pipeline_markdown(tmp_path):
+    """测试对PDF转换、清理后的Markdown快速提取，邮箱和时间段不被清理掉"""
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), RESUME.replace("#", "") + "邮箱：zhang.san@example.com", fontname="china-s")
+    path = tmp_path / "resume.pdf"
+    doc.save(str(path))
+    doc.close()
+
+    processor = FileProcessor()
+    markdown_content = processor.pages_to_markdown(await processor.pdf_to_pages(str(path)))
+    assert fast_extract(markdown_content, REFERENCE) == {
+        "phone": "13800138000",
+        "email": "zhang.san@example.com",
+        "graduation_year": "2023",
+        "school_name": "西南交通大学",
+    }
+
+
+@pytest.mark.asyncio
+async def test_extraction_skips_prefilled_fields(monkeypatch):
+    """测试本地已提取的字段不再要求大模型输出，并记录由本地填充的字段"""
+    monkeypatch.setattr(ai_service.settings, "local_fast_extraction", True)
+    monkeypatch.setattr(ai_service.settings, "llm_reask_missing_fields", True)
+    response = '{"name": "张三", "school_city": "成都", "education_level": "本科", "major": "计算机科学与技术", ' \
+               '"email": null, "position": null, "work_experience": [], "skills": [], "projects": [], "summary": null}'
+    service, prompts = _make_sequence_service([response])
+
+    info = await service.extract_resume_info(RESUME)
+
+    assert len(prompts) == 1
+    assert '"phone"' not in prompts[0][1]
+    assert '"school_name"' not in prompts[0][1]
+    assert '"email"' in prompts[0][1]
+    assert info["phone"] == "13800138000"
+    assert info["school_name"] == "西南交通大学"
+    assert info["name"] == "张三"
+    assert info["local_fields"] == ["graduation_year", "phone", "school_name"]
+
+
+@pytest.mark.asyncio
+async def test_extraction_keeps_local_fields_when_llm_fails(monkeypatch):
+    """测试大模型不可用时仍返回本地提取的字段"""
+    monkeypatch.setattr(ai_service.settings, "local_fast_extraction", True)
+    service = AIService()
+    service.reference = REFERENCE
+
+    async def failing_call(prompt: str, **kwargs) -> str:
+        raise Exception("AI服务调用失败")
+
+    service._call_openai = failing_call
+    info = await service.extract_resume_info(RESUME)
+
+    assert info["phone"] == "13800138000"
+    assert info["school_name"] == "西南交通大学"
+    assert info["name"] is None
+
+
+def test_scoring_fields_differ():
+    """测试只比较影响评分的字段"""
+    assumed = {"name": "张三", "school_name": "四川大学", "major": "软件工程", "education_level": "本科"}
+    assert scoring_fields_differ(assumed, {**assumed, "name": "张 三"}) == {}
+    assert scoring_fields_differ(assumed, {**assumed, "school_name": "四川 大学"}) == {}
+    assert scoring_fields_differ(assumed, {**assumed, "major": "通信工程"}) == {"major": "通信工程"}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_recomputes_objective_dimensions(monkeypatch):
+    """测试本地规则评分时按提取结果重新计算客观维度，不再调用大模型"""
+    monkeypatch.setattr(ai_service.settings, "local_rule_scoring", True)
+    service = _make_service("不应调用")
+    scoring_result = {
+        "total_score": 0,
+        "score_details": {
+            "region_score": {"score": 0, "reason": "未识别到学校信息"},
+            "highlight_score": {"score": 3, "reason": "GitHub项目"},
+        },
+    }
+
+    result = await service.reconcile_scoring(
+        "简历内容", {"school_name": None}, {"school_name": "四川大学", "major": "软件工程"}, scoring_result
+    )
+
+    assert result["score_details"]["school_score"]["score"] == 10
+    assert result["score_details"]["highlight_score"]["score"] == 3
+    assert result["total_score"] == 5 + 10 + 8 + 3
+
+
+@pytest.mark.asyncio
+async def test_reconcile_rescores_on_mismatch(monkeypatch):
+    """测试大模型评分时，评分依据的字段不一致才重新评分"""
+    monkeypatch.setattr(ai_service.settings, "local_rule_scoring", False)
+    calls = []
+
+    async def fake_score(markdown_content, extracted_info):
+        calls.append(extracted_info)
+        return {"total_score": 42, "score_details": {}}
+
+    service = _make_service("")
+    service.score_resume = fake_score
+    assumed = {"school_name": "四川大学", "major": "软件工程", "education_level": "本科"}
+    original = {"total_score": 30, "score_details": {}}
+
+    assert await service.reconcile_scoring("简历内容", assumed, dict(assumed), original) is original
+    result = await service.reconcile_scoring("简历内容", assumed, {**assumed, "major": "通信工程"}, original)
+    assert result["total_score"] == 42
+    assert calls == [{**assumed, "major": "通信工程"}]
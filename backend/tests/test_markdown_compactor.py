@@ -0,0 +1,113 @@
+"""
+Markdown压缩测试
+"""
+
+import fitz
+import pytest
+
+from app.utils import file_processor
+from app.utils.file_processor import FileProcessor
+from app.utils.markdown_compactor import compact_pages, is_section_title, trim_markdown
+
+PAGES = [
+    "## 第 1 页\n\n### 个人简历\n### 张三\n电话：13800138000\n### 教育经历\n"
+    "西南交通大学 计算机科学与技术 本科\n### 2019.09 - 2023.06\n### 某某科技有限公司 内部资料\n第 1 页 共 2 页\n",
+    "## 第 2 页\n\n### 某某科技有限公司 内部资料\n### 项目经历\n简历解析系统 负责后端开发\n"
+    "### 自我评价\n热爱技术，乐于学习\n本人承诺以上信息真实属实\n第 2 页 共 2 页\n",
+]
+
+
+def test_compact_removes_noise_and_collapses_titles():
+    """测试去除页标题、页码、重复页眉页脚和模板文字，并还原误判的标题"""
+    content, report = compact_pages(PAGES)
+    assert content.splitlines() == [
+        "### 张三",
+        "电话：13800138000",
+        "### 教育经历",
+        "西南交通大学 计算机科学与技术 本科",
+        "2019.09 - 2023.06",
+        "某某科技有限公司 内部资料",
+        "### 项目经历",
+        "简历解析系统 负责后端开发",
+        "### 自我评价",
+        "热爱技术，乐于学习",
+    ]
+    assert report.collapsed_titles == 2
+    assert report.saved_tokens > 0
+    assert report.compacted_tokens < report.original_tokens
+    assert report.trimmed_sections == []
+
+
+def test_compact_trims_low_value_sections_first():
+    """测试超出预算时先裁剪低价值章节，保留开头和核心章节"""
+    pages = [
+        "### 张三\n电话：13800138000\n### 教育经历\n西南交通大学 本科\n"
+        "### 项目经历\n简历解析系统\n### 自我评价\n" + "热爱技术乐于学习\n" * 20
+    ]
+    full, full_report = compact_pages(pages)
+    content, report = compact_pages(pages, token_budget=40)
+    assert report.trimmed_sections == ["自我评价"]
+    assert "自我评价" not in content
+    assert "西南交通大学 本科" in content
+    assert "简历解析系统" in content
+    assert report.compacted_tokens < full_report.compacted_tokens
+    assert content in full
+
+
+def test_budget_applies_to_scoring_only_with_chunked_extraction(monkeypatch):
+    """测试开启分段提取时保存完整内容，评分内容按预算裁剪；关闭时转换结果直接裁剪"""
+    settings = file_processor.get_settings()
+    monkeypatch.setattr(settings, "markdown_compaction", True)
+    monkeypatch.setattr(settings, "markdown_token_budget", 40)
+    pages = [
+        "### 张三\n电话：13800138000\n### 教育经历\n西南交通大学 本科\n"
+        "### 项目经历\n简历解析系统\n### 自我评价\n" + "热爱技术乐于学习\n" * 20
+    ]
+
+    monkeypatch.setattr(settings, "llm_chunked_extraction", True)
+    content = FileProcessor().pages_to_markdown(pages)
+    assert "自我评价" in content
+    trimmed, sections = trim_markdown(content, 40)
+    assert sections == ["自我评价"]
+    assert trimmed == compact_pages(pages, token_budget=40)[0]
+    assert trim_markdown(trimmed, 40) == (trimmed, [])
+
+    monkeypatch.setattr(settings, "llm_chunked_extraction", False)
+    assert FileProcessor().pages_to_markdown(pages) == trimmed
+
+
+def test_compact_without_budget_keeps_everything():
+    """测试预算为0时不裁剪"""
+    pages = ["### 张三\n### 自我评价\n" + "热爱技术\n" * 50]
+    content, report = compact_pages(pages, token_budget=0)
+    assert report.trimmed_sections == []
+    assert content.count("热爱技术") == 1  # 连续重复行只保留一行
+
+
+def test_is_section_title():
+    """测试章节标题需要包含关键词且足够短"""
+    assert is_section_title("教育经历")
+    assert not is_section_title("张三")
+    assert not is_section_title("负责公司核心项目的后端开发和性能优化工作")
+
+
+def test_clean_text_keeps_line_breaks():
+    """测试清理文本时保留换行"""
+    assert FileProcessor._clean_text("张三\n\n  电话   13800138000 \n") == "张三\n电话 13800138000"
+
+
+@pytest.mark.asyncio
+async def test_compaction_off_matches_previous_output(tmp_path, monkeypatch):
+    """测试关闭压缩时输出与原来的转换结果一致：每页合并为一行，整行按标题规则处理"""
+    monkeypatch.setattr(file_processor.get_settings(), "markdown_compaction", False)
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "张三\n电话：13800138000\n教育经历\n四川大学  软件工程", fontname="china-s")
+    doc.new_page().insert_text((72, 72), "负责后端开发，参与性能优化。", fontname="china-s")
+    path = tmp_path / "resume.pdf"
+    doc.save(str(path))
+    doc.close()
+
+    assert await FileProcessor().pdf_to_markdown(str(path)) == (
+        "## 第 1 页\n\n### 张三 电话：13800138000 教育经历 四川大学 软件工程\n\n"
+        "## 第 2 页\n\n负责后端开发，参与性能优化。\n"
+    )
@@ -0,0 +1,95 @@
+"""
+模型分级测试
+"""
+
+import fitz
+import pytest
+
+from app.services import ai_service
+from app.services.ai_service import AIService
+from app.services.model_tiering import TIER_LIGHT, TIER_STRONG, ModelTiering, estimate_complexity
+from app.utils.file_processor import FileProcessor
+
+SIMPLE_RESUME = """# 张三
+## 教育经历
+四川大学 软件工程 本科 2019.09 - 2023.06
+## 技能
+Python, SQL
+"""
+
+COMPLEX_RESUME = SIMPLE_RESUME + "\n".join(
+    f"## 项目{index}\n某公司 后端开发 2020.0{index} - 2021.0{index}\n| 模块 | 职责 |\n| --- | --- |"
+    for index in range(1, 7)
+)
+
+
+def test_estimate_complexity():
+    """测试章节、经历条数和表格行数的统计"""
+    complexity = estimate_complexity(COMPLEX_RESUME)
+    assert complexity.sections == 3 + 6
+    assert complexity.entries == 1 + 6
+    assert complexity.table_rows == 12
+    assert complexity.score == 9 + 14 + 2
+
+
+@pytest.mark.asyncio
+async def test_estimate_complexity_on_pipeline_markdown(tmp_path):
+    """测试对PDF转换、清理后的Markdown统计经历条数，以及已去掉分隔符的旧内容"""
+    experience = "\n".join(f"某公司{index} 后端开发 202{index}.03 - 202{index + 1}.06" for index in range(3))
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "张三\n工作经历\n" + experience, fontname="china-s")
+    path = tmp_path / "resume.pdf"
+    doc.save(str(path))
+    doc.close()
+
+    processor = FileProcessor()
+    markdown_content = processor.pages_to_markdown(await processor.pdf_to_pages(str(path)))
+    assert estimate_complexity(markdown_content).entries == 3
+    assert estimate_complexity(experience.replace(" - ", "  ")).entries == 3
+    # 不带月份的两个年份不视为时间段
+    assert estimate_complexity("2019 2023").entries == 0
+
+
+def test_choose_tier():
+    """测试简单简历使用轻量模型，长或复杂的简历使用主模型"""
+    tiering = ModelTiering(strong_model="strong-model", light_model="light-model",
+                           light_max_tokens=500, light_max_complexity=12)
+    assert tiering.choose(SIMPLE_RESUME) == TIER_LIGHT
+    assert tiering.choose(COMPLEX_RESUME) == TIER_STRONG
+    assert tiering.choose("工作经历" * 1000) == TIER_STRONG
+    assert tiering.model_for(TIER_LIGHT) == "light-model"
+
+    stats = tiering.stats()
+    assert stats[TIER_LIGHT]["selected"] == 1
+    assert stats[TIER_STRONG]["selected"] == 2
+
+
+def test_tiering_disabled_without_light_model():
+    """测试未配置轻量模型时总是使用主模型"""
+    tiering = ModelTiering(strong_model="strong-model")
+    assert tiering.choose(SIMPLE_RESUME) == TIER_STRONG
+    assert tiering.model_for(TIER_LIGHT) == "strong-model"
+
+
+@pytest.mark.asyncio
+async def test_extraction_uses_light_tier_and_reasks_with_strong(monkeypatch):
+    """测试提取使用所选级别，缺失字段的重新询问升级到主模型"""
+    tiering = ModelTiering(strong_model="strong-model", light_model="light-model")
+    monkeypatch.setattr(ai_service, "get_model_tiering", lambda: tiering)
+    monkeypatch.setattr(ai_service.settings, "llm_reask_missing_fields", True)
+
+    calls = []
+
+    async def fake_call(prompt: str, prompt_kind: str = "default", tier: str = TIER_STRONG) -> str:
+        calls.append((prompt_kind, tier))
+        if prompt_kind == "extraction":
+            return '{"name": "张三"}'
+        return '{"school_name": "四川大学"}'
+
+    service = AIService()
+    service._call_openai = fake_call
+    info = await service.extract_resume_info(SIMPLE_RESUME)
+
+    assert info["school_name"] == "四川大学"
+    assert calls == [("extraction", TIER_LIGHT), ("extraction_reask", TIER_STRONG)]
+    assert tiering.stats()[TIER_LIGHT]["incomplete"] == 1
@@ -0,0 +1,88 @@
+"""
+PDF解析沙箱测试
+"""
+
+import fitz
+import pytest
+
+from app.utils import file_processor
+from app.utils.file_processor import FileProcessor
+from app.utils.pdf_sandbox import PdfSandboxError, precheck_pdf, run_limited
+
+
+def _make_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_precheck_pdf(tmp_path):
+    """测试文件头和交叉引用表标记检查"""
+    precheck_pdf(_make_pdf(tmp_path / "ok.pdf", ["Zhang San"]))
+
+    not_pdf = tmp_path / "fake.pdf"
+    not_pdf.write_bytes(b"MZ\x90\x00" + b"\x00" * 100)
+    with pytest.raises(PdfSandboxError, match="文件头"):
+        precheck_pdf(str(not_pdf))
+
+    truncated = tmp_path / "truncated.pdf"
+    truncated.write_bytes(b"%PDF-1.7\n" + b"1 0 obj\n" * 2000)
+    with pytest.raises(PdfSandboxError, match="交叉引用表"):
+        precheck_pdf(str(truncated))
+
+
+def test_run_limited_sets_cpu_limit_per_task():
+    """测试每个任务按已用CPU时间重新设置软限制，超出内存限制时转换为沙箱错误"""
+    resource = pytest.importorskip("resource")
+    original = resource.getrlimit(resource.RLIMIT_CPU)
+    try:
+        assert run_limited(20, lambda: resource.getrlimit(resource.RLIMIT_CPU)[0]) >= 20
+
+        def exhausted():
+            raise MemoryError()
+
+        with pytest.raises(PdfSandboxError, match="内存"):
+            run_limited(0, exhausted)
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, original)
+
+
+@pytest.mark.asyncio
+async def test_sandbox_timeout_rebuilds_pool(tmp_path, monkeypatch):
+    """测试超过总耗时上限时终止工作进程，之后的解析使用重建的进程池"""
+    settings = file_processor.get_settings()
+    monkeypatch.setattr(settings, "pdf_sandbox", True)
+    path = _make_pdf(tmp_path / "resume.pdf", ["Page one"])
+
+    # 新建的进程池需要启动工作进程，不可能在总耗时上限内完成
+    file_processor.shutdown_pdf_executor()
+    executor = file_processor.get_pdf_executor()
+    monkeypatch.setattr(settings, "pdf_sandbox_timeout", 0.001)
+    with pytest.raises(PdfSandboxError, match="未完成"):
+        await file_processor._convert_range(path, 0, 1)
+    assert file_processor._pdf_executor is not executor
+
+    monkeypatch.setattr(settings, "pdf_sandbox_timeout", 30)
+    page_count, pages = await file_processor._convert_range(path, 0, 1)
+    assert page_count == 1
+    assert pages[0][1].strip("# ") == "Page one"
+
+
+@pytest.mark.asyncio
+async def test_pdf_to_pages_in_sandbox(tmp_path, monkeypatch):
+    """测试沙箱模式下按页转换，页数超过上限时转换失败"""
+    settings = file_processor.get_settings()
+    monkeypatch.setattr(settings, "pdf_sandbox", True)
+    monkeypatch.setattr(settings, "pdf_pages_per_task", 2)
+    monkeypatch.setattr(settings, "pdf_max_pages", 5)
+    path = _make_pdf(tmp_path / "resume.pdf", ["Page one", "Page two", "Page three"])
+
+    pages = await FileProcessor().pdf_to_pages(path)
+    assert [page.strip("# \n") for page in pages] == ["Page one", "Page two", "Page three"]
+
+    monkeypatch.setattr(settings, "pdf_max_pages", 2)
+    with pytest.raises(Exception, match="超过上限"):
+        await FileProcessor().pdf_to_pages(path)
@@ -0,0 +1,125 @@
+"""
+Redis任务队列测试，使用 fakeredis 模拟Redis
+"""
+
+import time
+
+import pytest
+
+from app.services.task_queue import RedisTaskQueue, ResumeTask
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_task(resume_id: str = "resume-1") -> ResumeTask:
+    """构造测试任务"""
+    return ResumeTask(resume_id=resume_id, file_path=f"/tmp/{resume_id}.pdf", user_id="1")
+
+
+@pytest.fixture
+def queue():
+    """连接到 fakeredis 的任务队列"""
+    queue = RedisTaskQueue("redis://localhost:6379/0", queue_name="test", visibility_timeout=60, max_attempts=2)
+    queue._redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return queue
+
+
+@pytest.mark.asyncio
+async def test_enqueue_dequeue_ack(queue):
+    """测试任务按入队顺序取出，确认后清理处理中列表、租约和任务内容"""
+    first, second = make_task("r1"), make_task("r2")
+    await queue.enqueue(first)
+    await queue.enqueue(second)
+    assert await queue.qsize() == 2
+
+    received = await queue.dequeue(timeout=1)
+    assert received == first
+    assert await queue._redis.lrange(queue._processing_key, 0, -1) == [first.task_id]
+    assert await queue._redis.hexists(queue._leases_key, first.task_id)
+
+    await queue.ack(received)
+    assert await queue._redis.llen(queue._processing_key) == 0
+    assert not await queue._redis.hexists(queue._leases_key, first.task_id)
+    assert not await queue._redis.hexists(queue._jobs_key, first.task_id)
+    assert (await queue.dequeue(timeout=0)) == second
+    assert await queue.dequeue(timeout=0) is None
+
+
+@pytest.mark.asyncio
+async def test_retry_until_dead_letter(queue):
+    """测试失败任务带着尝试次数重新入队，超过最大次数后移入 dead 列表"""
+    await queue.enqueue(make_task())
+
+    task = await queue.dequeue(timeout=0)
+    assert await queue.retry(task) is True
+    task = await queue.dequeue(timeout=0)
+    assert task.attempts == 1
+
+    assert await queue.retry(task) is False
+    assert await queue.qsize() == 0
+    assert await queue._redis.llen(queue._processing_key) == 0
+    assert await queue._redis.hlen(queue._jobs_key) == 0
+    dead = await queue._redis.lrange(queue._dead_key, 0, -1)
+    assert [ResumeTask.model_validate_json(payload).task_id for payload in dead] == [task.task_id]
+
+
+@pytest.mark.asyncio
+async def test_retry_backoff_delays_task(queue, monkeypatch):
+    """测试失败任务先进入 delayed 有序集合，退避时间到期后才移入 pending"""
+    queue.retry_delay = 30
+    await queue.enqueue(make_task())
+    task = await queue.dequeue(timeout=0)
+    now = time.time()
+    assert await queue.retry(task) is True
+
+    assert await queue.qsize() == 0
+    assert await queue._redis.llen(queue._processing_key) == 0
+    assert await queue._redis.zscore(queue._delayed_key, task.task_id) == pytest.approx(now + 30, abs=1)
+    assert await queue.dequeue(timeout=0) is None
+
+    monkeypatch.setattr(time, "time", lambda: now + 31)
+    again = await queue.dequeue(timeout=0)
+    assert again.task_id == task.task_id
+    assert again.attempts == 1
+    assert await queue._redis.zcard(queue._delayed_key) == 0
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_counts_as_attempt(queue):
+    """测试租约过期的任务重新入队并计入尝试次数，反复过期后放弃"""
+    queue.visibility_timeout = 0
+    await queue.enqueue(make_task())
+
+    await queue.dequeue(timeout=0)
+    assert await queue.requeue_expired() == []
+    task = await queue.dequeue(timeout=0)
+    assert task.attempts == 1
+
+    abandoned = await queue.requeue_expired()
+    assert [item.task_id for item in abandoned] == [task.task_id]
+    assert await queue.qsize() == 0
+    assert await queue._redis.llen(queue._dead_key) == 1
+
+
+@pytest.mark.asyncio
+async def test_unexpired_lease_is_kept(queue):
+    """测试租约未过期或被续约的任务不会重新入队"""
+    await queue.enqueue(make_task())
+    task = await queue.dequeue(timeout=0)
+    await queue.touch(task)
+
+    assert await queue.requeue_expired() == []
+    assert await queue.qsize() == 0
+    assert await queue._redis.llen(queue._processing_key) == 1
+
+
+@pytest.mark.asyncio
+async def test_dequeue_batch(queue):
+    """测试一次取出一批任务"""
+    for index in range(3):
+        await queue.enqueue(make_task(f"r{index}"))
+
+    tasks = await queue.dequeue_batch(2, timeout=1, linger=0)
+    assert [task.resume_id for task in tasks] == ["r0", "r1"]
+    assert await queue.qsize() == 1
+    assert await queue._redis.llen(queue._processing_key) == 2
@@ -0,0 +1,107 @@
+"""
+长简历分段提取测试
+"""
+
+import json
+
+import pytest
+
+from app.models.llm_models import EXTRACTION_FIELDS
+from app.services import ai_service
+from app.services.ai_service import AIService
+from app.services.resume_chunking import chunk_markdown, merge_extractions, split_sections
+from app.utils.tokens import estimate_tokens
+from tests.test_scoring_rules import REFERENCE
+
+RESUME = "\n".join([
+    "### 张三",
+    "电话：13800138000",
+    "### 教育经历",
+    "四川大学 软件工程 博士",
+    "### 工作经历",
+    *[f"某公司{i} 研发工程师 负责系统设计与开发" for i in range(12)],
+    "### 项目经历",
+    "简历解析系统 负责后端开发",
+])
+
+
+def test_split_sections():
+    """测试按标题切分章节，标题之前的内容单独成段"""
+    sections = split_sections(RESUME)
+    assert [section[0] for section in sections] == ["### 张三", "### 教育经历", "### 工作经历", "### 项目经历"]
+    assert split_sections("张三\n### 技能\nPython")[0] == ["张三"]
+
+
+def test_chunk_markdown_respects_budget_and_sections():
+    """测试分段不超过上限，超长章节按行切分并重复标题"""
+    chunks = chunk_markdown(RESUME, max_tokens=80)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 80 for chunk in chunks)
+    assert chunks[0].startswith("### 张三")
+    assert sum(chunk.count("### 工作经历") for chunk in chunks) >= 2
+    body = [line for chunk in chunks for line in chunk.splitlines() if line != "### 工作经历"]
+    assert body == [line for line in RESUME.splitlines() if line != "### 工作经历"]
+    assert chunk_markdown(RESUME, max_tokens=10000) == [RESUME]
+
+
+def test_merge_extractions_is_deterministic():
+    """测试标量取第一个非空值、学校城市跟随学校、经历和技能去重"""
+    results = [
+        {"name": "张三", "school_name": None, "school_city": "北京", "skills": ["Python", "Go"],
+         "work_experience": [{"company": "某公司", "position": "工程师", "duration": "2年", "description": ""}],
+         "projects": []},
+        {"name": "李四", "school_name": "四川大学", "school_city": "成都", "skills": ["python", "Rust"],
+         "work_experience": [
+             {"company": "某 公司", "position": "工程师", "duration": "2年", "description": "后端开发"},
+             {"company": "另一公司", "position": "实习生", "duration": "3个月"},
+         ],
+         "projects": [{"name": "简历解析"}, {"name": ""}]},
+    ]
+    merged = merge_extractions(results, EXTRACTION_FIELDS)
+    assert merged["name"] == "张三"
+    assert (merged["school_name"], merged["school_city"]) == ("四川大学", "成都")
+    assert merged["skills"] == ["Python", "Go", "Rust"]
+    assert [item["company"] for item in merged["work_experience"]] == ["某公司", "另一公司"]
+    assert merged["work_experience"][0]["description"] == "后端开发"
+    assert merged["projects"] == [{"name": "简历解析"}]
+
+
+@pytest.mark.asyncio
+async def test_extract_resume_info_in_chunks(monkeypatch):
+    """测试超长简历分段并行提取后合并"""
+    monkeypatch.setattr(ai_service.settings, "local_fast_extraction", False)
+    monkeypatch.setattr(ai_service.settings, "llm_chunked_extraction", True)
+    monkeypatch.setattr(ai_service.settings, "llm_chunk_threshold_tokens", 100)
+    monkeypatch.setattr(ai_service.settings, "llm_chunk_max_tokens", 80)
+
+    service = AIService()
+    service.reference = REFERENCE
+    kinds = []
+
+    async def fake_call(prompt: str, **kwargs) -> str:
+        kinds.append(kwargs.get("prompt_kind"))
+        content = prompt.split("简历内容：", 1)[1].split("请提取以下信息", 1)[0]
+        data = {"work_experience": [
+            {"company": line.split()[0], "position": "研发工程师"}
+            for line in content.splitlines() if line.startswith("某公司")
+        ]}
+        if "张三" in content:
+            data["name"] = "张三"
+        if "四川大学" in content:
+            data.update(school_name="四川大学", school_city="成都", education_level="博士")
+        if "简历解析系统" in content:
+            raise RuntimeError("分段调用失败")
+        return json.dumps(data, ensure_ascii=False)
+
+    service._call_openai = fake_call
+    info = await service.extract_resume_info(RESUME)
+
+    assert len(kinds) > 1
+    assert set(kinds) == {"extraction_chunk"}
+    assert info["name"] == "张三"
+    assert info["school_city"] == "成都"
+    assert [item["company"] for item in info["work_experience"]] == [f"某公司{i}" for i in range(12)]
+    assert info["projects"] == []
+
+    # 单次调用模式不处理超长简历，由调用方回退到分段提取
+    assert await service.extract_and_score(RESUME) is None
@@ -0,0 +1,221 @@
+"""
+简历处理流水线测试
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db_models import Base, ResumeDB, ResumeFormatEnum
+from app.services import resume_pipeline
+from app.services.ai_service import AIService, LLMUnavailableError
+from app.services.resume_worker import ResumeWorker
+from app.services.task_queue import InMemoryTaskQueue, ResumeTask
+from app.utils.file_processor import FileProcessor
+from app.utils.pdf_sandbox import PdfSandboxError
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    """使用内存SQLite数据库，并写入一份处理中的简历"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(ResumeDB(
+        id="r1", filename="r1.pdf", format=ResumeFormatEnum.PDF, content="", file_size=1,
+        user_id="u1", processing_status="processing"
+    ))
+    db.commit()
+    db.close()
+    monkeypatch.setattr(resume_pipeline, "SessionLocal", factory)
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_llm_failure_reaches_worker_without_marking_failed(session_factory, monkeypatch):
+    """测试大模型不可用时异常交给任务队列重试，简历不会被保存为默认信息或标记为失败"""
+    monkeypatch.setattr(resume_pipeline.settings, "incremental_reprocessing", False)
+    monkeypatch.setattr(resume_pipeline.settings, "llm_pipeline_mode", "separate")
+
+    async def fake_pages(self, file_path):
+        return ["张三\n电话：13800138000"]
+
+    async def unavailable(self, prompt, prompt_kind="default", tier=None):
+        raise LLMUnavailableError("AI服务调用失败: Connection error")
+
+    monkeypatch.setattr(FileProcessor, "pdf_to_pages", fake_pages)
+    monkeypatch.setattr(AIService, "_call_openai", unavailable)
+
+    with pytest.raises(LLMUnavailableError):
+        await resume_pipeline.process_resume_async("r1", "/tmp/r1.pdf", "u1")
+
+    db = session_factory()
+    resume = db.get(ResumeDB, "r1")
+    assert resume.processing_status == "processing"
+    assert resume.score is None
+    db.close()
+
+    await resume_pipeline.mark_resume_task_failed(
+        ResumeTask(resume_id="r1", file_path="/tmp/r1.pdf", user_id="u1"), "AI服务调用失败"
+    )
+    db = session_factory()
+    assert db.get(ResumeDB, "r1").processing_status == "failed"
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_forced_reprocess_bypasses_llm_cache(session_factory, monkeypatch):
+    """测试强制重新处理的任务不读取大模型响应缓存"""
+    monkeypatch.setattr(resume_pipeline.settings, "incremental_reprocessing", False)
+    monkeypatch.setattr(resume_pipeline.settings, "llm_pipeline_mode", "separate")
+    monkeypatch.setattr(resume_pipeline.settings, "llm_parallel_scoring", False)
+    use_cache = []
+
+    async def fake_pages(self, file_path):
+        return ["张三\n电话：13800138000"]
+
+    async def unavailable(self, prompt, prompt_kind="default", tier=None):
+        use_cache.append(self.use_cache)
+        raise LLMUnavailableError("AI服务调用失败: Connection error")
+
+    monkeypatch.setattr(FileProcessor, "pdf_to_pages", fake_pages)
+    monkeypatch.setattr(AIService, "_call_openai", unavailable)
+
+    for task_use_cache in (True, False):
+        with pytest.raises(LLMUnavailableError):
+            await resume_pipeline.process_resume_task(
+                ResumeTask(resume_id="r1", file_path="/tmp/r1.pdf", user_id="u1", use_cache=task_use_cache)
+            )
+    assert use_cache == [True, False]
+
+
+@pytest.mark.asyncio
+async def test_sandbox_rejection_fails_without_retry(session_factory, monkeypatch):
+    """测试PDF被沙箱拒绝解析时不重试，简历直接标记为失败并确认任务"""
+    attempts = []
+
+    async def rejected(self, file_path):
+        attempts.append(file_path)
+        raise PdfSandboxError("PDF解析超出内存限制")
+
+    monkeypatch.setattr(FileProcessor, "pdf_to_pages", rejected)
+    queue = InMemoryTaskQueue(visibility_timeout=0, max_attempts=3)
+    worker = ResumeWorker(
+        queue, resume_pipeline.process_resume_task,
+        on_failure=resume_pipeline.mark_resume_task_failed, concurrency=1
+    )
+    worker.start()
+    await queue.enqueue(ResumeTask(resume_id="r1", file_path="/tmp/r1.pdf", user_id="u1"))
+
+    db = session_factory()
+    for _ in range(50):
+        await asyncio.sleep(0.02)
+        db.expire_all()
+        if db.get(ResumeDB, "r1").processing_status == "failed":
+            break
+    await worker.stop()
+
+    resume = db.get(ResumeDB, "r1")
+    assert resume.processing_status == "failed"
+    assert "内存限制" in resume.processing_error
+    db.close()
+    assert attempts == ["/tmp/r1.pdf"]
+    assert await queue.qsize() == 0
+    assert await queue.requeue_expired() == []
+
+
+@pytest.mark.asyncio
+async def test_batch_groups_by_user_and_uses_incremental_versions(monkeypatch):
+    """测试批量处理按用户分组评分，新版本按增量处理单独完成"""
+    monkeypatch.setattr(resume_pipeline.settings, "llm_pipeline_mode", "separate")
+    monkeypatch.setattr(resume_pipeline.settings, "llm_batch_scoring", True)
+    monkeypatch.setattr(resume_pipeline.settings, "incremental_reprocessing", True)
+    saved = {}
+    batches = []
+
+    class FakeDB:
+        def close(self):
+            pass
+
+    async def fake_pages(self, file_path):
+        return [file_path]
+
+    async def fake_new_version(resume_service, file_processor, resume_id, user_id, pages, page_hashes, markdown, use_cache=True):
+        return ({"name": "新版本"}, {"total_score": 7}) if resume_id == "v2" else None
+
+    async def fake_extract(markdown_content, user_id, on_fields=None, resume_id=None, use_cache=True):
+        return {"name": resume_id}
+
+    async def fake_batch(self, items):
+        batches.append((self.user_id, [resume_id for resume_id, _, _ in items]))
+        return {resume_id: {"total_score": 1, "score_details": {}} for resume_id, _, _ in items}
+
+    def fake_save(resume_service, resume_id, markdown_content, extracted_info, scoring_result, page_hashes):
+        saved[resume_id] = scoring_result["total_score"]
+
+    monkeypatch.setattr(resume_pipeline, "SessionLocal", FakeDB)
+    monkeypatch.setattr(FileProcessor, "pdf_to_pages", fake_pages)
+    monkeypatch.setattr(resume_pipeline, "_process_new_version", fake_new_version)
+    monkeypatch.setattr(resume_pipeline, "_extract_info", fake_extract)
+    monkeypatch.setattr(AIService, "score_resumes_batch", fake_batch)
+    monkeypatch.setattr(resume_pipeline, "_save_result", fake_save)
+
+    tasks = [
+        ResumeTask(resume_id=resume_id, file_path=f"/tmp/{resume_id}.pdf", user_id=user_id)
+        for resume_id, user_id in [("a1", "u1"), ("b1", "u2"), ("v2", "u1"), ("a2", "u1")]
+    ]
+    errors = await resume_pipeline.process_resume_batch(tasks)
+
+    assert errors == [None] * 4
+    assert sorted(batches) == [("u1", ["a1", "a2"]), ("u2", ["b1"])]
+    assert saved == {"a1": 1, "b1": 1, "v2": 7, "a2": 1}
+
+
+@pytest.mark.asyncio
+async def test_batch_missing_scores_rescored_or_failed(monkeypatch):
+    """测试批量评分缺少的简历单独评分，单独评分仍失败时返回异常而不是保存默认评分"""
+    monkeypatch.setattr(resume_pipeline.settings, "llm_pipeline_mode", "separate")
+    monkeypatch.setattr(resume_pipeline.settings, "llm_batch_scoring", True)
+    monkeypatch.setattr(resume_pipeline.settings, "incremental_reprocessing", False)
+    saved = {}
+    rescored = []
+
+    class FakeDB:
+        def close(self):
+            pass
+
+    async def fake_pages(self, file_path):
+        return [file_path]
+
+    async def fake_extract(markdown_content, user_id, on_fields=None, resume_id=None, use_cache=True):
+        return {"name": resume_id}
+
+    async def fake_batch(self, items):
+        return {"a": {"total_score": 5, "score_details": {}}}
+
+    async def fake_score(markdown_content, extracted_info, user_id, resume_id=None, use_cache=True):
+        rescored.append(resume_id)
+        if resume_id == "c":
+            raise LLMUnavailableError("AI服务调用失败")
+        return {"total_score": 3, "score_details": {}}
+
+    def fake_save(resume_service, resume_id, markdown_content, extracted_info, scoring_result, page_hashes):
+        saved[resume_id] = scoring_result["total_score"]
+
+    monkeypatch.setattr(resume_pipeline, "SessionLocal", FakeDB)
+    monkeypatch.setattr(FileProcessor, "pdf_to_pages", fake_pages)
+    monkeypatch.setattr(resume_pipeline, "_extract_info", fake_extract)
+    monkeypatch.setattr(resume_pipeline, "_score", fake_score)
+    monkeypatch.setattr(AIService, "score_resumes_batch", fake_batch)
+    monkeypatch.setattr(resume_pipeline, "_save_result", fake_save)
+
+    tasks = [ResumeTask(resume_id=resume_id, file_path=f"/tmp/{resume_id}.pdf", user_id="u1") for resume_id in "abc"]
+    errors = await resume_pipeline.process_resume_batch(tasks)
+
+    assert errors[:2] == [None, None]
+    assert isinstance(errors[2], LLMUnavailableError)
+    assert sorted(rescored) == ["b", "c"]
+    assert saved == {"a": 5, "b": 3}
@@ -0,0 +1,156 @@
+"""
+简历新版本增量处理测试
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db_models import Base, ResumeDB, ResumeFormatEnum
+from app.services import resume_pipeline
+from app.services.resume_service import ResumeService
+from app.services.resume_versions import changed_pages, merge_versions, needs_rescore
+from app.utils.file_processor import FileProcessor
+
+PREVIOUS_INFO = {
+    "name": "张三",
+    "school_name": "四川大学",
+    "school_city": "成都",
+    "education_level": "本科",
+    "major": "软件工程",
+    "phone": "13800138000",
+    "work_experience": [{"company": "甲公司", "position": "实习生"}, {"company": "乙公司", "position": "实习生"}],
+    "projects": [{"name": "简历解析"}],
+    "skills": ["Python", "Go"],
+    "summary": None,
+    "local_fields": ["phone"],
+}
+
+
+def test_hash_pages_ignores_whitespace():
+    """测试页摘要忽略空白差异"""
+    first, second = FileProcessor.hash_pages(["张三 电话\n13800138000", "张三电话13800138000  "])
+    assert first == second
+    assert FileProcessor.hash_pages(["张三"]) != FileProcessor.hash_pages(["李四"])
+
+
+def test_changed_pages_ignores_reordering():
+    """测试只有上一版中不存在的页视为变化"""
+    assert changed_pages(["a", "b", "c"], ["b", "a", "x"]) == [2]
+    assert changed_pages(["a"], ["a"]) == []
+
+
+def test_merge_versions_prefers_changed_pages_and_drops_removed_records():
+    """测试标量优先取变化页的值，已删除的经历和技能被去掉"""
+    changed_info = {
+        "work_experience": [{"company": "丙公司", "position": "工程师"}],
+        "projects": [{"name": "简历解析", "description": "新增描述"}],
+        "skills": ["Rust"],
+        "summary": "热爱编程",
+    }
+    content = "张三 四川大学 甲公司 实习生 丙公司 工程师 简历解析 Python Rust"
+    merged = merge_versions(PREVIOUS_INFO, changed_info, content)
+
+    assert merged["name"] == "张三"
+    assert merged["school_city"] == "成都"
+    assert merged["summary"] == "热爱编程"
+    assert [item["company"] for item in merged["work_experience"]] == ["丙公司", "甲公司"]
+    assert merged["projects"] == [{"name": "简历解析", "description": "新增描述"}]
+    assert merged["skills"] == ["Rust", "Python"]
+    assert merged["local_fields"] == ["phone"]
+
+
+def test_needs_rescore():
+    """测试只有影响评分的字段变化时才重新评分"""
+    assert not needs_rescore(PREVIOUS_INFO, {**PREVIOUS_INFO, "phone": "13900139000", "summary": "新简介"})
+    assert needs_rescore(PREVIOUS_INFO, {**PREVIOUS_INFO, "major": "计算机科学与技术"})
+    assert needs_rescore(PREVIOUS_INFO, {**PREVIOUS_INFO, "projects": []})
+
+
+def _add_resume(db, resume_id, user_id, phone, name, page_hashes, processed_at, status="completed"):
+    db.add(ResumeDB(
+        id=resume_id, filename=f"{resume_id}.pdf", format=ResumeFormatEnum.PDF, content="", file_size=1,
+        user_id=user_id, processing_status=status, phone=phone, name=name,
+        page_hashes=page_hashes, extracted_info={"name": name}, processed_at=processed_at
+    ))
+
+
+def test_find_previous_version():
+    """测试按用户、手机号或邮箱和姓名查找最近的上一版简历"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.now()
+    _add_resume(db, "old", "u1", "13800138000", "张三", ["a"], now - timedelta(days=2))
+    _add_resume(db, "newer", "u1", "13800138000", "张三", ["b"], now - timedelta(days=1))
+    _add_resume(db, "no-hashes", "u1", "13800138000", "张三", None, now)
+    _add_resume(db, "other-user", "u2", "13800138000", "张三", ["c"], now)
+    _add_resume(db, "other-name", "u1", "13800138000", "李四", ["d"], now)
+    _add_resume(db, "current", "u1", "13800138000", None, None, None, status="processing")
+    db.commit()
+    service = ResumeService(db=db)
+
+    previous = service.find_previous_version("u1", "current", phone="13800138000", name="张三")
+    assert previous.id == "newer"
+    assert previous.page_hashes == ["b"]
+    assert service.find_previous_version("u1", "current", name="张三") is None
+    assert service.find_previous_version("u3", "current", phone="13800138000") is None
+
+
+class _FakeResumeService:
+    def __init__(self, previous):
+        self.previous = previous
+
+    def find_previous_version(self, user_id, resume_id, phone=None, email=None, name=None):
+        return self.previous if phone == "13800138000" else None
+
+
+@pytest.mark.asyncio
+async def test_process_new_version_extracts_only_changed_pages(monkeypatch):
+    """测试新版本只对变化的页重新提取，评分字段不变时沿用上一版评分"""
+    monkeypatch.setattr(resume_pipeline.settings, "markdown_compaction", False)
+    monkeypatch.setattr(resume_pipeline.settings, "incremental_max_changed_ratio", 0.5)
+    pages = [
+        "张三\n电话：13800138000\n四川大学 软件工程 本科",
+        "甲公司 实习生\n乙公司 实习生\n简历解析\nPython Go",
+        "自我评价\n热爱编程",
+    ]
+    hashes = FileProcessor.hash_pages(pages)
+    previous = type("Previous", (), {
+        "id": "old",
+        "extracted_info": PREVIOUS_INFO,
+        "page_hashes": hashes[:2] + ["removed"],
+        "score": 80,
+        "score_detail": {"school_score": {"score": 10, "reason": ""}},
+    })()
+    extracted = []
+
+    async def fake_extract(markdown_content, user_id, on_fields=None, resume_id=None, use_cache=True):
+        extracted.append(markdown_content)
+        return {"summary": "热爱编程"}
+
+    async def fake_score(*args, **kwargs):
+        raise AssertionError("评分字段未变化时不应重新评分")
+
+    monkeypatch.setattr(resume_pipeline, "_extract_info", fake_extract)
+    monkeypatch.setattr(resume_pipeline, "_score", fake_score)
+    file_processor = FileProcessor()
+    markdown_content = file_processor.pages_to_markdown(pages)
+
+    extracted_info, scoring_result = await resume_pipeline._process_new_version(
+        _FakeResumeService(previous), file_processor, "new", "u1", pages, hashes, markdown_content
+    )
+
+    assert len(extracted) == 1
+    assert "热爱编程" in extracted[0] and "四川大学" not in extracted[0]
+    assert extracted_info["summary"] == "热爱编程"
+    assert extracted_info["school_name"] == "四川大学"
+    assert scoring_result == {"total_score": 80, "score_details": previous.score_detail}
+
+    # 变化的页过多时交给完整处理
+    previous.page_hashes = ["x"]
+    assert await resume_pipeline._process_new_version(
+        _FakeResumeService(previous), file_processor, "new", "u1", pages, hashes, markdown_content
+    ) is None
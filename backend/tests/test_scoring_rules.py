@@ -0,0 +1,84 @@
+"""
+规则评分测试
+"""
+
+from app.services.reference_data import build_reference_data
+from app.services.scoring_rules import score_objective_dimensions, merge_score_details
+
+REFERENCE = build_reference_data(
+    universities_985=[
+        {"school_name": "四川大学", "city": "成都"},
+        {"school_name": "清华大学", "city": "北京"},
+    ],
+    universities_211=[
+        {"school_name": "四川大学", "city": "成都"},
+        {"school_name": "西南交通大学", "city": "成都"},
+        {"school_name": "北京邮电大学", "city": "北京"},
+    ],
+    major_rules={
+        "专业分类规则": {
+            "计算机类专业": {"核心关键词": ["计算机", "软件工程"], "扩展关键词": ["人工智能"]},
+            "相关理工科专业": {"核心关键词": ["通信", "电子信息"], "扩展关键词": ["电气"]},
+        }
+    },
+)
+
+
+def test_sichuan_985_computer_major():
+    """测试四川省内985计算机专业"""
+    details = score_objective_dimensions(
+        {"school_name": "四川大学", "major": "计算机科学与技术", "education_level": "本科"},
+        REFERENCE
+    )
+    assert details["region_score"]["score"] == 5
+    assert details["school_score"]["score"] == 10
+    assert details["major_score"]["score"] == 8
+
+
+def test_outside_sichuan_211_related_major():
+    """测试四川省外211理工科专业"""
+    details = score_objective_dimensions(
+        {"school_name": "北京邮电大学", "major": "通信工程", "education_level": "硕士"},
+        REFERENCE
+    )
+    assert details["region_score"]["score"] == 3
+    assert details["school_score"]["score"] == 8
+    assert details["major_score"]["score"] == 5
+
+
+def test_ordinary_and_junior_colleges():
+    """测试普通本科与专科院校"""
+    ordinary = score_objective_dimensions(
+        {"school_name": "西华大学", "school_city": "成都", "major": "会计学"}, REFERENCE
+    )
+    assert ordinary["region_score"]["score"] == 5
+    assert ordinary["school_score"]["score"] == 5
+    assert ordinary["major_score"]["score"] == 2
+
+    junior = score_objective_dimensions(
+        {"school_name": "某某职业技术学院", "school_city": "武汉", "major": "软件技术"}, REFERENCE
+    )
+    assert junior["region_score"]["score"] == 0
+    assert junior["school_score"]["score"] == 2
+
+
+def test_missing_fields_score_zero():
+    """测试缺少学校和专业信息时得0分"""
+    details = score_objective_dimensions({"school_name": None, "major": None}, REFERENCE)
+    assert all(detail["score"] == 0 for detail in details.values())
+
+
+def test_merge_clamps_and_recomputes_total():
+    """测试合并时按最高分截断并重新计算总分"""
+    objective = score_objective_dimensions(
+        {"school_name": "四川大学", "major": "软件工程"}, REFERENCE
+    )
+    result = merge_score_details(objective, {
+        "highlight_score": {"score": 9, "reason": "ACM金牌"},
+        "experience_score": {"score": "7", "reason": "公司实习"},
+    })
+    details = result["score_details"]
+    assert details["highlight_score"]["score"] == 6
+    assert details["experience_score"]["score"] == 7
+    assert details["quality_score"] == {"score": 0, "reason": "评分失败"}
+    assert result["total_score"] == 5 + 10 + 8 + 6 + 7
@@ -0,0 +1,213 @@
+"""
+任务队列与Worker测试
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.task_queue import InMemoryTaskQueue, ResumeTask
+from app.services.resume_worker import ResumeWorker
+
+
+def make_task(resume_id: str = "resume-1") -> ResumeTask:
+    """构造测试任务"""
+    return ResumeTask(resume_id=resume_id, file_path=f"/tmp/{resume_id}.pdf", user_id="1")
+
+
+@pytest.mark.asyncio
+async def test_dequeue_ack_removes_task():
+    """测试任务取出并确认后不会再次出现"""
+    queue = InMemoryTaskQueue(visibility_timeout=60)
+    task = make_task()
+    await queue.enqueue(task)
+
+    assert await queue.qsize() == 1
+    received = await queue.dequeue(timeout=0.1)
+    assert received.task_id == task.task_id
+    assert await queue.qsize() == 0
+
+    await queue.ack(received)
+    assert await queue.requeue_expired() == []
+    assert await queue.dequeue(timeout=0.05) is None
+
+
+@pytest.mark.asyncio
+async def test_unacked_task_is_requeued_after_lease_expires():
+    """测试未确认的任务在租约过期后重新入队"""
+    queue = InMemoryTaskQueue(visibility_timeout=0)
+    await queue.enqueue(make_task())
+
+    received = await queue.dequeue(timeout=0.1)
+    assert await queue.requeue_expired() == []
+    assert await queue.qsize() == 1
+
+    again = await queue.dequeue(timeout=0.1)
+    assert again.task_id == received.task_id
+    assert again.attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_repeatedly_expired_task_is_abandoned():
+    """测试租约过期计入尝试次数，超过最大次数后放弃而不是无限重新入队"""
+    queue = InMemoryTaskQueue(visibility_timeout=0, max_attempts=2)
+    await queue.enqueue(make_task())
+
+    await queue.dequeue(timeout=0.1)
+    assert await queue.requeue_expired() == []
+    await queue.dequeue(timeout=0.1)
+    abandoned = await queue.requeue_expired()
+    assert [task.resume_id for task in abandoned] == ["resume-1"]
+    assert await queue.qsize() == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_waits_with_exponential_backoff():
+    """测试失败任务按指数退避延迟后才能取出，等待中的消费者在到期时被唤醒"""
+    queue = InMemoryTaskQueue(max_attempts=4, retry_delay=0.1, max_retry_delay=0.15)
+    assert [queue._retry_delay(attempts) for attempts in (1, 2, 3)] == [0.1, 0.15, 0.15]
+    await queue.enqueue(make_task())
+
+    task = await queue.dequeue(timeout=0.1)
+    assert await queue.retry(task) is True
+    assert await queue.qsize() == 0
+    assert await queue.dequeue(timeout=0) is None
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    again = await queue.dequeue(timeout=1.0)
+    assert again.task_id == task.task_id
+    assert again.attempts == 1
+    assert loop.time() - started >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_worker_retries_then_reports_failure():
+    """测试Worker在处理失败时重试，超过次数后回调失败处理"""
+    queue = InMemoryTaskQueue(max_attempts=2)
+    attempts = []
+    failures = []
+
+    async def handler(task):
+        attempts.append(task.attempts)
+        raise RuntimeError("boom")
+
+    async def on_failure(task, error):
+        failures.append((task.resume_id, error))
+
+    worker = ResumeWorker(queue, handler, on_failure=on_failure, concurrency=1)
+    worker.start()
+    await queue.enqueue(make_task())
+
+    for _ in range(50):
+        if failures:
+            break
+        await asyncio.sleep(0.02)
+    await worker.stop()
+
+    assert attempts == [0, 1]
+    assert failures == [("resume-1", "boom")]
+
+
+@pytest.mark.asyncio
+async def test_worker_processes_tasks_concurrently():
+    """测试Worker按并发数同时处理多个任务"""
+    queue = InMemoryTaskQueue()
+    running = 0
+    peak = 0
+    done = []
+
+    async def handler(task):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        done.append(task.resume_id)
+
+    worker = ResumeWorker(queue, handler, concurrency=3)
+    worker.start()
+    for index in range(6):
+        await queue.enqueue(make_task(f"resume-{index}"))
+
+    for _ in range(100):
+        if len(done) == 6:
+            break
+        await asyncio.sleep(0.02)
+    await worker.stop()
+
+    assert sorted(done) == [f"resume-{index}" for index in range(6)]
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_dequeue_batch():
+    """测试一次取出一批任务"""
+    queue = InMemoryTaskQueue()
+    for index in range(5):
+        await queue.enqueue(make_task(f"r{index}"))
+
+    tasks = await queue.dequeue_batch(3, timeout=0.1, linger=0)
+    assert [task.resume_id for task in tasks] == ["r0", "r1", "r2"]
+    assert await queue.qsize() == 2
+    assert await queue.dequeue_batch(3, timeout=0.1, linger=0.05) != []
+    assert await queue.dequeue_batch(3, timeout=0.05) == []
+
+
+@pytest.mark.asyncio
+async def test_worker_batch_handler_acks_and_retries():
+    """测试批量处理时逐个确认成功任务、重试失败任务"""
+    queue = InMemoryTaskQueue(max_attempts=2)
+    for index in range(3):
+        await queue.enqueue(make_task(f"r{index}"))
+
+    batches = []
+
+    async def batch_handler(tasks):
+        batches.append([task.resume_id for task in tasks])
+        return [RuntimeError("boom") if task.resume_id == "r1" and task.attempts == 0 else None for task in tasks]
+
+    async def handler(task):
+        batches.append([task.resume_id])
+
+    worker = ResumeWorker(
+        queue, handler, concurrency=1, batch_handler=batch_handler, batch_size=3, batch_linger=0
+    )
+    worker.start()
+    await asyncio.sleep(0.3)
+    await worker.stop()
+
+    assert batches == [["r0", "r1", "r2"], ["r1"]]
+    assert await queue.qsize() == 0
+    assert queue._processing == {}
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_queue_errors():
+    """测试确认或重新入队时队列出错只记录日志，Worker继续处理后续任务"""
+    queue = InMemoryTaskQueue()
+    done = []
+
+    async def broken(task):
+        raise ConnectionError("redis down")
+
+    async def handler(task):
+        done.append(task.resume_id)
+        if task.resume_id == "r1":
+            raise RuntimeError("boom")
+
+    queue.ack = broken
+    queue.retry = broken
+    worker = ResumeWorker(queue, handler, concurrency=1)
+    runner = worker.start()
+    for index in range(3):
+        await queue.enqueue(make_task(f"r{index}"))
+
+    for _ in range(50):
+        if len(done) == 3:
+            break
+        await asyncio.sleep(0.02)
+    await worker.stop()
+
+    assert done == ["r0", "r1", "r2"]
+    assert runner.done() and runner.exception() is None
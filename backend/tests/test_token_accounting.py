@@ -0,0 +1,98 @@
+"""
+token用量统计测试
+"""
+
+import pytest
+
+from app.services import ai_service
+from app.services.ai_service import AIService
+from app.services.token_accounting import TokenAccountant, percentile
+from tests.test_ai_service import fake_router
+
+
+def test_percentile():
+    """测试最近秩法百分位"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7], 90) == 7
+    assert percentile([], 50) is None
+
+
+def test_max_tokens_follows_p99():
+    """测试样本足够后按p99和余量系数确定max_tokens"""
+    accountant = TokenAccountant(max_tokens=20000, min_max_tokens=512, headroom=1.5, min_samples=10)
+    for _ in range(9):
+        accountant.record("extraction", 1000, 800)
+    assert accountant.max_tokens_for("extraction") == 20000
+
+    accountant.record("extraction", 1000, 1000)
+    assert accountant.max_tokens_for("extraction") == 1500
+    # 其他调用类型互不影响
+    assert accountant.max_tokens_for("scoring") == 20000
+
+    for _ in range(10):
+        accountant.record("scoring", 1000, 10)
+    assert accountant.max_tokens_for("scoring") == 512
+
+    stats = accountant.stats()["extraction"]
+    assert stats["calls"] == 10
+    assert stats["completion_p50"] == 800
+    assert stats["total_prompt_tokens"] == 10000
+    assert stats["max_tokens"] == 1500
+
+
+def test_truncation_raises_cap():
+    """测试输出被截断时提高max_tokens"""
+    accountant = TokenAccountant(max_tokens=20000, headroom=1.0, min_samples=1)
+    accountant.record("extraction", 1000, 1000)
+    assert accountant.max_tokens_for("extraction") == 1000
+
+    accountant.record("extraction", 1000, 1000, truncated=True)
+    assert accountant.max_tokens_for("extraction") == 2000
+    assert accountant.stats()["extraction"]["truncated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_call_openai_records_usage(monkeypatch):
+    """测试调用后按调用类型统计并按简历记录用量"""
+    accountant = TokenAccountant(max_tokens=3000, min_samples=100)
+    monkeypatch.setattr(ai_service, "get_token_accountant", lambda: accountant)
+    monkeypatch.setattr(ai_service.settings, "llm_streaming", False)
+    monkeypatch.setattr(ai_service.settings, "llm_cache_enabled", False)
+    monkeypatch.setattr(ai_service.settings, "llm_usage_tracking", True)
+
+    requests = []
+    recorded = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        choice = type("Choice", (), {
+            "message": type("Message", (), {"content": '{"name": "张三"}'})(),
+            "finish_reason": "stop",
+        })()
+        usage = type("Usage", (), {"prompt_tokens": 120, "completion_tokens": 30, "total_tokens": 150})()
+        return type("Response", (), {"choices": [choice], "usage": usage})()
+
+    completions = type("Completions", (), {"create": staticmethod(create)})()
+    client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})()
+    monkeypatch.setattr(ai_service, "get_llm_router", lambda: fake_router(client))
+    monkeypatch.setattr(ai_service, "record_llm_usage", lambda **kwargs: recorded.append(kwargs))
+
+    service = AIService(user_id="u1", resume_id="r1")
+    assert await service._call_openai("prompt", prompt_kind="extraction") == '{"name": "张三"}'
+
+    assert requests[0]["max_tokens"] == 3000
+    assert requests[0]["model"] == "test-model"
+    stats = accountant.stats()["extraction"]
+    assert stats["total_prompt_tokens"] == 120
+    assert stats["total_completion_tokens"] == 30
+    assert recorded == [{
+        "call_type": "extraction",
+        "model": "test-model",
+        "prompt_tokens": 120,
+        "completion_tokens": 30,
+        "resume_id": "r1",
+        "user_id": "u1",
+        "estimated": False,
+    }]
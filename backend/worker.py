@@ -0,0 +1,88 @@
+"""
+简历处理Worker入口
+从Redis任务队列消费简历处理任务，可在多台机器上启动多个实例
+
+用法:
+    python worker.py [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import signal
+
+from app.config.settings import get_settings
+from app.services.resume_pipeline import process_resume_task, process_resume_batch, mark_resume_task_failed
+from app.services.resume_worker import ResumeWorker
+from app.services.task_queue import get_task_queue, close_task_queue
+from app.utils.file_processor import shutdown_pdf_executor
+from app.services.llm_router import close_llm_router
+from app.services.llm_cache import close_llm_cache
+from app.services.metrics import collect_metrics
+from app.utils.logger import get_logger, setup_logging
+
+settings = get_settings()
+
+setup_logging(level=settings.log_level, log_file=settings.log_file)
+logger = get_logger(__name__)
+
+
+async def report_metrics(interval: int):
+    """定期输出运行指标"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            logger.info(f"运行指标: {await collect_metrics()}")
+        except Exception as e:
+            logger.warning(f"收集运行指标失败: {str(e)}")
+
+
+async def run_worker(concurrency: int):
+    """运行Worker直到收到退出信号"""
+    worker = ResumeWorker(
+        queue=get_task_queue(),
+        handler=process_resume_task,
+        on_failure=mark_resume_task_failed,
+        concurrency=concurrency,
+        batch_handler=process_resume_batch if settings.llm_batch_scoring else None,
+        batch_size=settings.llm_batch_max_size,
+        batch_linger=settings.task_batch_linger
+    )
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: asyncio.create_task(worker.stop()))
+
+    reporter = None
+    if settings.metrics_log_interval > 0:
+        reporter = asyncio.create_task(report_metrics(settings.metrics_log_interval))
+
+    try:
+        await worker.run()
+    finally:
+        if reporter:
+            reporter.cancel()
+        await close_task_queue()
+        shutdown_pdf_executor()
+        await close_llm_router()
+        close_llm_cache()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="简历处理Worker")
+    parser.add_argument(
+        "--concurrency", "-c",
+        type=int,
+        default=settings.worker_concurrency,
+        help="同时处理的任务数"
+    )
+    args = parser.parse_args()
+
+    if settings.task_queue_backend != "redis":
+        logger.error("独立Worker需要 TASK_QUEUE_BACKEND=redis，memory 队列只能在API进程内消费")
+        raise SystemExit(1)
+
+    asyncio.run(run_worker(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()